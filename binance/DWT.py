@@ -33,6 +33,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 import pywt
 import scipy
@@ -80,6 +81,9 @@ class DWT(IStrategy):
 
     custom_trade_info = {}
 
+    # cache of rolling model results (live/dry-run only)
+    model_cache = rm.RollingModelCache()
+
     ###################################
 
     # Strategy Specific Variable Storage
@@ -143,7 +147,13 @@ class DWT(IStrategy):
 
         # DWT
 
-        informative['dwt_model'] = informative['close'].rolling(window=self.dwt_window).apply(self.model)
+        if self.dp.runmode.value in ('live', 'dry_run'):
+            # only calculate the model for new candles
+            informative['dwt_model'] = self.model_cache.rolling(curr_pair, self.inf_timeframe, 'dwt_model',
+                                                                informative['date'], informative['close'],
+                                                                self.dwt_window, rm.dwt_model)
+        else:
+            informative['dwt_model'] = rm.rolling_dwt(informative['close'], self.dwt_window)
         # informative['dwt_predict'] = informative['dwt_model'].rolling(window=self.dwt_window).apply(self.predict)
         # informative['stddev'] = informative['close'].rolling(window=self.dwt_window).std()
 
@@ -33,6 +33,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 
 
@@ -77,6 +78,9 @@ class FFT(IStrategy):
 
     custom_trade_info = {}
 
+    # cache of rolling model results (live/dry-run only)
+    model_cache = rm.RollingModelCache()
+
     ###################################
 
     # Strategy Specific Variable Storage
@@ -143,7 +147,13 @@ class FFT(IStrategy):
 
         # FFT
 
-        informative['fft_predict'] = informative['close'].rolling(window=self.fft_window).apply(self.model)
+        if self.dp.runmode.value in ('live', 'dry_run'):
+            # only calculate the model for new candles
+            informative['fft_predict'] = self.model_cache.rolling(curr_pair, self.inf_timeframe, 'fft_predict',
+                                                                  informative['date'], informative['close'],
+                                                                  self.fft_window, rm.fft_model)
+        else:
+            informative['fft_predict'] = rm.rolling_fft(informative['close'], self.fft_window)
 
         # merge into normal timeframe
         dataframe = merge_informative_pair(dataframe, informative, self.timeframe, self.inf_timeframe, ffill=True)
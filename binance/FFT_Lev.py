@@ -33,6 +33,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 
 
@@ -162,7 +163,7 @@ class FFT_Lev(IStrategy):
 
         # FFT
 
-        informative['fft_predict'] = informative['close'].rolling(window=self.fft_window).apply(self.model)
+        informative['fft_predict'] = rm.rolling_fft(informative['close'], self.fft_window)
 
         # merge into normal timeframe
         dataframe = merge_informative_pair(dataframe, informative, self.timeframe, self.inf_timeframe, ffill=True)
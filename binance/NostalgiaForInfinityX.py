@@ -1,5 +1,10 @@
+import ast
+import bisect
 import copy
+import inspect
+import itertools
 import logging
+import operator
 import pathlib
 import rapidjson
 import freqtrade.vendor.qtpylib.indicators as qtpylib
@@ -20,6 +25,7 @@ from technical.indicators import RMI, zema, VIDYA, ichimoku
 import time
 import warnings
 import re
+import textwrap
 
 log = logging.getLogger(__name__)
 leverage_pattern = ".*(_PREMIUM|BEAR|BULL|DOWN|HALF|HEDGE|UP|[1235][SL]|-PERP|BVOL|IBVOL)/.*"
@@ -158,13 +164,17 @@ class NostalgiaForInfinityX(IStrategy):
     coin_metrics['top_traded_enabled'] = False
     coin_metrics['top_traded_updated'] = False
     coin_metrics['top_traded_len'] = 10
-    coin_metrics['tt_dataframe'] = DataFrame()
+    coin_metrics['tt_metrics'] = None
     coin_metrics['top_grossing_enabled'] = False
     coin_metrics['top_grossing_updated'] = False
     coin_metrics['top_grossing_len'] = 20
-    coin_metrics['tg_dataframe'] = DataFrame()
+    coin_metrics['tg_metrics'] = None
     coin_metrics['current_whitelist'] = []
 
+    # Exit signals precomputed at populate time (see ExitSignals)
+    exit_signal_functions = ['sell_long_signals', 'sell_quick_mode', 'sell_signals', 'sell_over_main', 'sell_under_main', 'sell_r', 'sell_dec_main', 'sell_pump_main', 'sell_pivot']
+    exit_signals = None
+
     # Rebuy feature
     position_adjustment_enable = True
     max_rebuy_orders = 7
@@ -2137,113 +2147,45 @@ class NostalgiaForInfinityX(IStrategy):
             self.coin_metrics['current_whitelist'].insert(0, self.coin_metrics['current_whitelist'].pop(self.coin_metrics['current_whitelist'].index(f"BTC/{self.config['stake_currency']}")))
 
     def top_traded_list(self):
-        log.info("Updating top traded pairlist...")
         tik = time.perf_counter()
 
-        self.coin_metrics['tt_dataframe'] = DataFrame()
-
-        # Build traded volume dataframe
-        for coin_pair in self.coin_metrics['current_whitelist']:
-            coin = coin_pair.split('/')[0]
-
-            # Get the volume for the daily informative timeframe and name the column for the coin
-            pair_dataframe = self.dp.get_pair_dataframe(pair=coin_pair, timeframe=self.info_timeframe_1d)
-            pair_dataframe.set_index('date')
-
-            if self.config['runmode'].value in ('live', 'dry_run'):
-                pair_dataframe = pair_dataframe.iloc[-7:,:]
-
-            # Set the date index of the self.coin_metrics['tt_dataframe'] once
-            if not 'date' in self.coin_metrics['tt_dataframe']:
-                self.coin_metrics['tt_dataframe']['date'] = pair_dataframe['date']
-                self.coin_metrics['tt_dataframe'].set_index('date')
-
-            # Calculate daily traded volume
-            pair_dataframe[coin] = pair_dataframe['volume'] * qtpylib.typical_price(pair_dataframe)
-
-            # Drop the columns we don't need
-            pair_dataframe.drop(columns=['open', 'high', 'low', 'close', 'volume'], inplace=True)
+        if self.coin_metrics['tt_metrics'] is None:
+            self.coin_metrics['tt_metrics'] = CoinMetrics(traded_volume, self.coin_metrics['top_traded_len'])
 
-            # Merge it in on the date key
-            self.coin_metrics['tt_dataframe'] = self.coin_metrics['tt_dataframe'].merge(pair_dataframe, on='date', how='left')
-
-        # Forward fill empty cells (due to different df shapes)
-        self.coin_metrics['tt_dataframe'].fillna(0, inplace=True)
-
-        # Store and drop date column for value sorting
-        pair_dates = self.coin_metrics['tt_dataframe']['date']
-        self.coin_metrics['tt_dataframe'].drop(columns=['date'], inplace=True)
-
-        # Build columns and top traded coins
-        column_names = [f"Coin #{i}" for i in range(1, self.coin_metrics['top_traded_len'] + 1)]
-        self.coin_metrics['tt_dataframe'][column_names] = self.coin_metrics['tt_dataframe'].apply(lambda x: x.nlargest(self.coin_metrics['top_traded_len']).index.values, axis=1, result_type='expand')
-        self.coin_metrics['tt_dataframe'].drop(columns=[col for col in self.coin_metrics['tt_dataframe'] if col not in column_names], inplace=True)
-
-        # Re-add stored date column
-        self.coin_metrics['tt_dataframe'].insert(loc = 0, column = 'date', value = pair_dates)
-        self.coin_metrics['tt_dataframe'].set_index('date')
+        # Only the rows for new daily candles (or changed pairs) are recalculated
+        max_rows = 7 if self.config['runmode'].value in ('live', 'dry_run') else None
+        updated = self.coin_metrics['tt_metrics'].update(self.dp, self.coin_metrics['current_whitelist'], self.info_timeframe_1d, max_rows)
         self.coin_metrics['top_traded_updated'] = True
-        log.info("Updated top traded pairlist (tail-5):")
-        log.info(f"\n{self.coin_metrics['tt_dataframe'].tail(5)}")
 
-        tok = time.perf_counter()
-        log.info(f"Updating top traded pairlist took {tok - tik:0.4f} seconds...")
+        if updated:
+            log.info("Updated top traded pairlist (tail-5):")
+            log.info(f"\n{self.coin_metrics['tt_metrics'].top_dataframe(5)}")
+
+            tok = time.perf_counter()
+            log.info(f"Updating top traded pairlist took {tok - tik:0.4f} seconds...")
 
     def top_grossing_list(self):
-        log.info("Updating top grossing pairlist...")
         tik = time.perf_counter()
 
-        self.coin_metrics['tg_dataframe'] = DataFrame()
+        if self.coin_metrics['tg_metrics'] is None:
+            self.coin_metrics['tg_metrics'] = CoinMetrics(grossing_rate, self.coin_metrics['top_grossing_len'])
 
-        # Build grossing volume dataframe
-        for coin_pair in self.coin_metrics['current_whitelist']:
-            coin = coin_pair.split('/')[0]
-
-            # Get the volume for the daily informative timeframe and name the column for the coin
-            pair_dataframe = self.dp.get_pair_dataframe(pair=coin_pair, timeframe=self.info_timeframe_1d)
-            pair_dataframe.set_index('date')
-
-            if self.config['runmode'].value in ('live', 'dry_run'):
-                pair_dataframe = pair_dataframe.iloc[-7:,:]
-
-            # Set the date index of the self.coin_metrics['tg_dataframe'] once
-            if not 'date' in self.coin_metrics['tg_dataframe']:
-                self.coin_metrics['tg_dataframe']['date'] = pair_dataframe['date']
-                self.coin_metrics['tg_dataframe'].set_index('date')
-
-            # Calculate daily grossing rate
-            pair_dataframe[coin] = pair_dataframe['close'].pct_change() * 100
-
-            # Drop the columns we don't need
-            pair_dataframe.drop(columns=['open', 'high', 'low', 'close', 'volume'], inplace=True)
-
-            # Merge it in on the date key
-            self.coin_metrics['tg_dataframe'] = self.coin_metrics['tg_dataframe'].merge(pair_dataframe, on='date', how='left')
-
-        # Forward fill empty cells (due to different df shapes)
-        self.coin_metrics['tg_dataframe'].fillna(0, inplace=True)
-
-        # Store and drop date column for value sorting
-        pair_dates = self.coin_metrics['tg_dataframe']['date']
-        self.coin_metrics['tg_dataframe'].drop(columns=['date'], inplace=True)
-
-        # Build columns and top grossing coins
-        column_names = [f"Coin #{i}" for i in range(1, self.coin_metrics['top_grossing_len'] + 1)]
-        self.coin_metrics['tg_dataframe'][column_names] = self.coin_metrics['tg_dataframe'].apply(lambda x: x.nlargest(self.coin_metrics['top_grossing_len']).index.values, axis=1, result_type='expand')
-        self.coin_metrics['tg_dataframe'].drop(columns=[col for col in self.coin_metrics['tg_dataframe'] if col not in column_names], inplace=True)
-
-        # Re-add stored date column
-        self.coin_metrics['tg_dataframe'].insert(loc = 0, column = 'date', value = pair_dates)
-        self.coin_metrics['tg_dataframe'].set_index('date')
+        # Only the rows for new daily candles (or changed pairs) are recalculated
+        max_rows = 7 if self.config['runmode'].value in ('live', 'dry_run') else None
+        updated = self.coin_metrics['tg_metrics'].update(self.dp, self.coin_metrics['current_whitelist'], self.info_timeframe_1d, max_rows)
         self.coin_metrics['top_grossing_updated'] = True
-        log.info("Updated top grossing pairlist (tail-5):")
-        log.info(f"\n{self.coin_metrics['tg_dataframe'].tail(5)}")
 
-        tok = time.perf_counter()
-        log.info(f"Updating top grossing pairlist took {tok - tik:0.4f} seconds...")
+        if updated:
+            log.info("Updated top grossing pairlist (tail-5):")
+            log.info(f"\n{self.coin_metrics['tg_metrics'].top_dataframe(5)}")
+
+            tok = time.perf_counter()
+            log.info(f"Updating top grossing pairlist took {tok - tik:0.4f} seconds...")
 
-    def is_top_coin(self, coin_pair, row_data, top_length) -> bool:
-        return coin_pair.split('/')[0] in row_data.loc['Coin #1':f"Coin #{top_length}"].values
+    def is_top_coin(self, coin_pair, dates, coin_metrics) -> np.ndarray:
+        if coin_metrics is None:
+            return np.zeros(len(dates), dtype=bool)
+        return coin_metrics.is_top(coin_pair, dates)
 
 
     def bot_loop_start(self, **kwargs) -> None:
@@ -2257,9 +2199,10 @@ class NostalgiaForInfinityX(IStrategy):
         # Coin metrics mechanism
         if self.coin_metrics['top_traded_enabled'] or self.coin_metrics['top_grossing_enabled']:
             self.whitelist_tracker()
-        if self.coin_metrics['top_traded_enabled'] and not self.coin_metrics['top_traded_updated']:
+        # (cheap if there are no new daily candles, so checked on every loop)
+        if self.coin_metrics['top_traded_enabled']:
             self.top_traded_list()
-        if self.coin_metrics['top_grossing_enabled'] and not self.coin_metrics['top_grossing_updated']:
+        if self.coin_metrics['top_grossing_enabled']:
             self.top_grossing_list()
 
         if self.config["runmode"].value not in ("live", "dry_run"):
@@ -8859,7 +8802,7 @@ class NostalgiaForInfinityX(IStrategy):
 
     def sell_long_mode(self, current_profit: float, max_profit:float, max_loss:float, last_candle, previous_candle_1, previous_candle_2, previous_candle_3, previous_candle_4, previous_candle_5, trade: 'Trade', current_time: 'datetime', buy_tag) -> tuple:
         # Original sell signals
-        sell, signal_name = self.sell_long_signals(current_profit, max_profit, max_loss, last_candle, previous_candle_1, previous_candle_2, previous_candle_3, previous_candle_4, previous_candle_5, trade, current_time, buy_tag)
+        sell, signal_name = self.exit_signal('sell_long_signals', last_candle, current_profit, max_profit, max_loss) or self.sell_long_signals(current_profit, max_profit, max_loss, last_candle, previous_candle_1, previous_candle_2, previous_candle_3, previous_candle_4, previous_candle_5, trade, current_time, buy_tag)
         if sell and (signal_name is not None):
             return True, signal_name
 
@@ -8973,6 +8916,42 @@ class NostalgiaForInfinityX(IStrategy):
 
         return False, None
 
+    def get_exit_signals(self) -> dict:
+        if self.exit_signals is None:
+            self.exit_signals = {}
+            for name in self.exit_signal_functions:
+                try:
+                    self.exit_signals[name] = ExitSignals(getattr(self, name))
+                except (OSError, TypeError, ValueError, SyntaxError) as e:
+                    log.warning(f"Exit signals of {name} can't be precomputed, using the function instead ({e})")
+        return self.exit_signals
+
+    def populate_exit_signals(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        # only the last candle is used in live/dry runs
+        num_rows = 1 if self.config['runmode'].value in ('live', 'dry_run') else None
+        columns = {}
+        for name, exit_signals in self.get_exit_signals().items():
+            missing = exit_signals.columns.difference(dataframe.columns)
+            if len(missing) > 0:
+                log.debug(f"[{metadata['pair']}] Exit signals of {name} not precomputed, missing columns: {sorted(missing)}")
+                continue
+            columns.update(exit_signals.populate(dataframe, num_rows))
+        if len(columns) == 0:
+            return dataframe
+        dataframe = dataframe.drop(columns=dataframe.columns.intersection(list(columns.keys())))
+        return concat([dataframe, DataFrame(columns, index=dataframe.index)], axis=1)
+
+    def exit_signal(self, name, last_candle, current_profit: float, max_profit: float, max_loss: float):
+        # the precomputed result of the exit signal function, or None if it has to be called
+        exit_signals = self.get_exit_signals().get(name)
+        if exit_signals is None:
+            return None
+        return exit_signals.lookup(last_candle, {'current_profit': current_profit, 'max_profit': max_profit, 'max_loss': max_loss})
+
+    def exit_signals_available(self, last_candle) -> bool:
+        exit_signals = self.get_exit_signals()
+        return all((name in exit_signals) and exit_signals[name].available(last_candle) for name in self.exit_signal_functions)
+
     def custom_exit(self, pair: str, trade: 'Trade', current_time: 'datetime', current_rate: float,
                     current_profit: float, **kwargs):
         dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
@@ -8980,10 +8959,14 @@ class NostalgiaForInfinityX(IStrategy):
             return None
         last_candle = dataframe.iloc[-1]
         previous_candle_1 = dataframe.iloc[-2]
-        previous_candle_2 = dataframe.iloc[-3]
-        previous_candle_3 = dataframe.iloc[-4]
-        previous_candle_4 = dataframe.iloc[-5]
-        previous_candle_5 = dataframe.iloc[-6]
+        if self.exit_signals_available(last_candle):
+            # only the precomputed exit signals use the older candles
+            previous_candle_2 = previous_candle_3 = previous_candle_4 = previous_candle_5 = None
+        else:
+            previous_candle_2 = dataframe.iloc[-3]
+            previous_candle_3 = dataframe.iloc[-4]
+            previous_candle_4 = dataframe.iloc[-5]
+            previous_candle_5 = dataframe.iloc[-6]
 
         buy_tag = 'empty'
         if hasattr(trade, 'buy_tag') and trade.buy_tag is not None:
@@ -9017,12 +9000,12 @@ class NostalgiaForInfinityX(IStrategy):
 
         # Quick sell mode
         if all(c in ['empty', '58', '59', '60', '61', '62', '63', '64', '65'] for c in buy_tags):
-            sell, signal_name = self.sell_quick_mode(current_profit, max_profit, last_candle, previous_candle_1)
+            sell, signal_name = self.exit_signal('sell_quick_mode', last_candle, current_profit, max_profit, max_loss) or self.sell_quick_mode(current_profit, max_profit, last_candle, previous_candle_1)
             if sell and (signal_name is not None):
                 return f"{signal_name} ( {buy_tag})"
 
         # Original sell signals
-        sell, signal_name = self.sell_signals(current_profit, max_profit, max_loss, last_candle, previous_candle_1, previous_candle_2, previous_candle_3, previous_candle_4, previous_candle_5, trade, current_time, buy_tag)
+        sell, signal_name = self.exit_signal('sell_signals', last_candle, current_profit, max_profit, max_loss) or self.sell_signals(current_profit, max_profit, max_loss, last_candle, previous_candle_1, previous_candle_2, previous_candle_3, previous_candle_4, previous_candle_5, trade, current_time, buy_tag)
         if sell and (signal_name is not None):
             return f"{signal_name} ( {buy_tag})"
 
@@ -9032,12 +9015,12 @@ class NostalgiaForInfinityX(IStrategy):
             return f"{signal_name} ( {buy_tag})"
 
         # Over EMA200, main profit targets
-        sell, signal_name = self.sell_over_main(current_profit, last_candle)
+        sell, signal_name = self.exit_signal('sell_over_main', last_candle, current_profit, max_profit, max_loss) or self.sell_over_main(current_profit, last_candle)
         if sell and (signal_name is not None):
             return f"{signal_name} ( {buy_tag})"
 
         # Under EMA200, main profit targets
-        sell, signal_name = self.sell_under_main(current_profit, last_candle)
+        sell, signal_name = self.exit_signal('sell_under_main', last_candle, current_profit, max_profit, max_loss) or self.sell_under_main(current_profit, last_candle)
         if sell and (signal_name is not None):
             return f"{signal_name} ( {buy_tag})"
 
@@ -9047,7 +9030,7 @@ class NostalgiaForInfinityX(IStrategy):
             return f"{signal_name} ( {buy_tag})"
 
         # Williams %R based sells
-        sell, signal_name = self.sell_r(current_profit, max_profit, max_loss, last_candle, previous_candle_1, trade, current_time)
+        sell, signal_name = self.exit_signal('sell_r', last_candle, current_profit, max_profit, max_loss) or self.sell_r(current_profit, max_profit, max_loss, last_candle, previous_candle_1, trade, current_time)
         if sell and (signal_name is not None):
             return f"{signal_name} ( {buy_tag})"
 
@@ -9057,12 +9040,12 @@ class NostalgiaForInfinityX(IStrategy):
             return f"{signal_name} ( {buy_tag})"
 
         # The pair is descending
-        sell, signal_name = self.sell_dec_main(current_profit, last_candle)
+        sell, signal_name = self.exit_signal('sell_dec_main', last_candle, current_profit, max_profit, max_loss) or self.sell_dec_main(current_profit, last_candle)
         if sell and (signal_name is not None):
             return f"{signal_name} ( {buy_tag})"
 
         # Sell logic for pumped pairs
-        sell, signal_name = self.sell_pump_main(current_profit, last_candle)
+        sell, signal_name = self.exit_signal('sell_pump_main', last_candle, current_profit, max_profit, max_loss) or self.sell_pump_main(current_profit, last_candle)
         if sell and (signal_name is not None):
             return f"{signal_name} ( {buy_tag})"
 
@@ -9072,7 +9055,7 @@ class NostalgiaForInfinityX(IStrategy):
             return f"{signal_name} ( {buy_tag})"
 
         # Pivot points based sells
-        sell, signal_name = self.sell_pivot(current_profit, max_profit, max_loss, last_candle, previous_candle_1, trade, current_time)
+        sell, signal_name = self.exit_signal('sell_pivot', last_candle, current_profit, max_profit, max_loss) or self.sell_pivot(current_profit, max_profit, max_loss, last_candle, previous_candle_1, trade, current_time)
         if sell and (signal_name is not None):
             return f"{signal_name} ( {buy_tag})"
 
@@ -9132,16 +9115,10 @@ class NostalgiaForInfinityX(IStrategy):
 
         # Top traded coins
         if self.coin_metrics['top_traded_enabled']:
-            informative_1d = informative_1d.merge(self.coin_metrics['tt_dataframe'], on='date', how='left')
-            informative_1d['is_top_traded'] = informative_1d.apply(lambda row: self.is_top_coin(metadata['pair'], row, self.coin_metrics['top_traded_len']), axis=1)
-            column_names = [f"Coin #{i}" for i in range(1, self.coin_metrics['top_traded_len'] + 1)]
-            informative_1d.drop(columns = column_names, inplace=True)
+            informative_1d['is_top_traded'] = self.is_top_coin(metadata['pair'], informative_1d['date'], self.coin_metrics['tt_metrics'])
         # Top grossing coins
         if self.coin_metrics['top_grossing_enabled']:
-            informative_1d = informative_1d.merge(self.coin_metrics['tg_dataframe'], on='date', how='left')
-            informative_1d['is_top_grossing'] = informative_1d.apply(lambda row: self.is_top_coin(metadata['pair'], row, self.coin_metrics['top_grossing_len']), axis=1)
-            column_names = [f"Coin #{i}" for i in range(1, self.coin_metrics['top_grossing_len'] + 1)]
-            informative_1d.drop(columns = column_names, inplace=True)
+            informative_1d['is_top_grossing'] = self.is_top_coin(metadata['pair'], informative_1d['date'], self.coin_metrics['tg_metrics'])
 
         # Pivots
         informative_1d['pivot'], informative_1d['res1'], informative_1d['res2'], informative_1d['res3'], informative_1d['sup1'], informative_1d['sup2'], informative_1d['sup3'] = pivot_points(informative_1d, mode='fibonacci')
@@ -9616,6 +9593,12 @@ class NostalgiaForInfinityX(IStrategy):
         '''
         dataframe = self.normal_tf_indicators(dataframe, metadata)
 
+        '''
+        --> Exit signals, for custom_exit()
+        ___________________________________________________________________________________________
+        '''
+        dataframe = self.populate_exit_signals(dataframe, metadata)
+
         tok = time.perf_counter()
         log.debug(f"[{metadata['pair']}] Populate indicators took a total of: {tok - tik:0.4f} seconds.")
 
@@ -9623,8 +9606,15 @@ class NostalgiaForInfinityX(IStrategy):
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         conditions = []
+        condition_indexes = []
         dataframe.loc[:, 'buy_tag'] = ''
 
+        # The conditions are written on a ConditionFrame standing in for the dataframe, so that the sub-expressions they
+        # share (protections, shifts etc.) are only calculated once, when all the conditions are evaluated at the end
+        entry_dataframe = dataframe
+        condition_frame = ConditionFrame(entry_dataframe)
+        dataframe = condition_frame
+
         for index in self.buy_protection_params:
             item_buy_protection_list = [True]
             global_buy_protection_params = self.buy_protection_params[index]
@@ -10476,7 +10466,7 @@ class NostalgiaForInfinityX(IStrategy):
 
                     # Logic
                     item_buy_logic.append(dataframe['open'] < dataframe['ema_8'] * 1.147)
-                    item_buy_logic.append(qtpylib.crossed_above(dataframe['fastk'], dataframe['fastd']))
+                    item_buy_logic.append((dataframe['fastk'] > dataframe['fastd']) & (dataframe['fastk'].shift(1) <= dataframe['fastd'].shift(1)))
                     item_buy_logic.append(dataframe['fastk'] < 39.0)
                     item_buy_logic.append(dataframe['fastd'] < 28.0)
                     item_buy_logic.append(dataframe['adx'] > 13.0)
@@ -10550,11 +10540,19 @@ class NostalgiaForInfinityX(IStrategy):
 
                 item_buy_logic.append(dataframe['volume'] > 0)
                 item_buy = reduce(lambda x, y: x & y, item_buy_logic)
-                dataframe.loc[item_buy, 'buy_tag'] += f"{index} "
                 conditions.append(item_buy)
+                condition_indexes.append(index)
 
+        dataframe = entry_dataframe
         if conditions:
-            dataframe.loc[:, 'buy'] = reduce(lambda x, y: x | y, conditions)
+            conditions = np.vstack(condition_frame.evaluate(conditions))
+            buy = conditions.any(axis=0)
+            buy_rows = np.flatnonzero(buy)
+            buy_tags = np.full(len(buy_rows), '', dtype=object)
+            for index, item_buy in zip(condition_indexes, conditions[:, buy_rows]):
+                buy_tags[item_buy] += f"{index} "
+            dataframe.loc[dataframe.index[buy_rows], 'buy_tag'] = buy_tags
+            dataframe.loc[:, 'buy'] = buy
 
         return dataframe
 
@@ -10863,6 +10861,547 @@ def is_resistance(row_data) -> bool:
     result = reduce(lambda x, y: x & y, conditions)
     return result
 
+# Daily traded volume (in stake currency)
+def traded_volume(dataframe: DataFrame) -> Series:
+    return dataframe['volume'] * qtpylib.typical_price(dataframe)
+
+# Daily grossing rate (%)
+def grossing_rate(dataframe: DataFrame) -> Series:
+    return dataframe['close'].pct_change() * 100
+
+
+class CoinMetrics:
+    """
+    Cross-pair daily metric (e.g. traded volume), ranked to find the top coins on each day.
+    The metric for every whitelisted coin is held in one matrix (dates x coins), aligned to the dates of the first
+    pair in the whitelist, with missing values set to 0. Each row is ranked in one pass across all dates, giving the
+    same coins as nlargest(top_length), with ties going to the coin that comes first in the whitelist.
+    update() only recalculates the pairs that have new candles, and only re-ranks the rows that changed. If the first
+    pair has no new candle, only the pairs that are still behind it are checked.
+    """
+
+    def __init__(self, metric, top_length):
+        self.metric = metric
+        self.top_length = top_length
+        self.coins = []
+        self.coin_index = {}
+        self.dates = np.zeros(0, dtype=np.int64)
+        self.values = np.zeros((0, 0))
+        self.top = np.zeros((0, 0), dtype=bool)
+        self.last_dates = {}
+        self.pending = set()
+
+    @staticmethod
+    def to_ns(dates) -> np.ndarray:
+        # UTC nanoseconds, whatever the resolution of the dates
+        return pd.DatetimeIndex(pd.to_datetime(dates, utc=True)).values.astype('datetime64[ns]').view(np.int64)
+
+    @staticmethod
+    def rank_top(values, top_length) -> np.ndarray:
+        num_cols = values.shape[1]
+        if num_cols <= top_length:
+            return np.ones(values.shape, dtype=bool)
+
+        # value of the top_length'th largest coin in each row
+        kth = np.partition(values, num_cols - top_length, axis=1)[:, num_cols - top_length]
+        above = values > kth[:, None]
+        equal = values == kth[:, None]
+        # remaining places go to the first coins that are equal to the threshold
+        places = top_length - above.sum(axis=1)
+        return above | (equal & (np.cumsum(equal, axis=1) <= places[:, None]))
+
+    def update(self, dp, whitelist, timeframe, max_rows=None) -> bool:
+        coins = [pair.split('/')[0] for pair in whitelist]
+        dates = self.to_ns(dp.get_pair_dataframe(pair=whitelist[0], timeframe=timeframe)['date']) if whitelist else np.zeros(0, dtype=np.int64)
+        if max_rows:
+            dates = dates[-max_rows:]
+
+        reshaped = (coins != self.coins) or not np.array_equal(dates, self.dates)
+        if reshaped:
+            # Carry over the rows and columns that we already have
+            values = np.zeros((len(dates), len(coins)))
+            rows = np.searchsorted(self.dates, dates)
+            found = (rows < len(self.dates))
+            found[found] = self.dates[rows[found]] == dates[found]
+            for col, coin in enumerate(coins):
+                if coin in self.coin_index:
+                    values[found, col] = self.values[rows[found], self.coin_index[coin]]
+                else:
+                    self.last_dates.pop(whitelist[col], None)
+            # New rows need the latest candles of every pair
+            if not found.all():
+                self.last_dates = {}
+            pairs = whitelist
+        else:
+            values = self.values
+            # Only the pairs that were behind the first pair can have new candles
+            pairs = [pair for pair in whitelist if pair in self.pending]
+
+        columns = {pair: col for col, pair in enumerate(whitelist)}
+        changed = np.zeros(len(dates), dtype=bool)
+        for pair in pairs:
+            pair_dataframe = dp.get_pair_dataframe(pair=pair, timeframe=timeframe)
+            if pair_dataframe.empty:
+                self.pending.add(pair)
+                continue
+
+            pair_dates = self.to_ns(pair_dataframe['date'])
+            if (len(dates) == 0) or (pair_dates[-1] < dates[-1]):
+                self.pending.add(pair)
+            else:
+                self.pending.discard(pair)
+            if self.last_dates.get(pair, None) == pair_dates[-1]:
+                continue
+            self.last_dates[pair] = pair_dates[-1]
+
+            # Recalculate the pair's column, only the rows that changed need to be re-ranked
+            pair_values = self.metric(pair_dataframe).to_numpy(dtype=np.float64)
+            pair_values = np.where(np.isnan(pair_values), 0.0, pair_values)
+            rows = np.searchsorted(dates, pair_dates)
+            found = (rows < len(dates))
+            found[found] = dates[rows[found]] == pair_dates[found]
+            column = np.zeros(len(dates))
+            column[rows[found]] = pair_values[found]
+            col = columns[pair]
+            changed |= (column != values[:, col])
+            values[:, col] = column
+
+        if not reshaped and not changed.any():
+            return False
+
+        self.coins = coins
+        self.coin_index = {coin: col for col, coin in enumerate(coins)}
+        if reshaped:
+            self.dates = dates
+            self.values = values
+            self.top = self.rank_top(values, self.top_length)
+        else:
+            self.top[changed] = self.rank_top(values[changed], self.top_length)
+        return True
+
+    # True for each of the dates on which the coin was in the top_length coins
+    def is_top(self, pair, dates) -> np.ndarray:
+        dates = self.to_ns(dates)
+        result = np.zeros(len(dates), dtype=bool)
+        col = self.coin_index.get(pair.split('/')[0], None)
+        if (col is None) or (len(self.dates) == 0):
+            return result
+
+        rows = np.minimum(np.searchsorted(self.dates, dates), len(self.dates) - 1)
+        found = self.dates[rows] == dates
+        result[found] = self.top[rows[found], col]
+        return result
+
+    # Top coins for the last num_rows dates, in the same format as the (old) top traded/grossing dataframes
+    def top_dataframe(self, num_rows=5) -> DataFrame:
+        values = self.values[-num_rows:]
+        top_length = min(self.top_length, len(self.coins))
+        order = np.argsort(-values, axis=1, kind='stable')[:, :top_length]
+        top_dataframe = DataFrame(np.array(self.coins, dtype=object)[order], columns=[f"Coin #{i}" for i in range(1, top_length + 1)])
+        top_dataframe.insert(loc = 0, column = 'date', value = pd.to_datetime(self.dates[-num_rows:], unit='ns', utc=True))
+        return top_dataframe
+
+
+class ExitSignals:
+    """
+    Precomputed version of one of the exit signal functions (sell_over_main() etc.), evaluated for every candle at
+    populate time instead of for every trade on every loop.
+    The functions are cascades of if/elif conditions on the candles (last_candle, previous_candle_1..5) and the trade
+    values (current_profit, max_profit, max_loss), that return (True, signal name) or (False, None). The trade values are
+    only compared to constants, so between those constants (a 'region') the result only depends on the candles.
+    The function's own source is compiled once, then for each region the conditions are evaluated over whole columns,
+    with masks standing in for the branches. This gives one column of signal codes per region (0: no signal,
+    -1: not calculated), and custom_exit() only has to find the trade's region and read the code from the last candle.
+    Functions that use anything else (trade, current_time, calls etc.) are rejected, and run as before.
+    """
+
+    candle_names = {'last_candle': 0, 'previous_candle_1': 1, 'previous_candle_2': 2, 'previous_candle_3': 3, 'previous_candle_4': 4, 'previous_candle_5': 5}
+    trade_names = ('current_profit', 'max_profit', 'max_loss')
+
+    compare_ops = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne}
+    binary_ops = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+
+    def __init__(self, function):
+        self.name = function.__name__
+        self.body = ast.parse(textwrap.dedent(inspect.getsource(function))).body[0].body
+        self.signals = [None]
+        self.columns = set()
+        self.lookback = 0
+        self.trade_compares = []
+        self.thresholds = {name: set() for name in self.trade_names}
+        for stmt in self.body:
+            self.check_statement(stmt)
+        self.thresholds = {name: sorted(values) for name, values in self.thresholds.items() if values}
+        self.dtype = np.int8 if len(self.signals) < 128 else np.int16
+
+        # Regions are combinations of each trade value being below, at or between the thresholds, or NaN. Regions where
+        # all the trade value comparisons give the same results are the same, so they share a column
+        self.region_index = []
+        self.region_values = []
+        truth_regions = {}
+        for values in itertools.product(*[self.representative_values(t) for t in self.thresholds.values()]):
+            values = dict(zip(self.thresholds.keys(), values))
+            truth = tuple(bool(self.evaluate(node, values, None, {})) for node in self.trade_compares)
+            if truth not in truth_regions:
+                truth_regions[truth] = len(self.region_values)
+                self.region_values.append(values)
+            self.region_index.append(truth_regions[truth])
+        self.column_names = [f"exit_{self.name}_{i}" for i in range(len(self.region_values))]
+
+    @staticmethod
+    def representative_values(thresholds) -> list:
+        values = [thresholds[0] - 1.0]
+        for i, threshold in enumerate(thresholds):
+            values.append(threshold)
+            values.append((threshold + thresholds[i + 1]) / 2.0 if i + 1 < len(thresholds) else threshold + 1.0)
+        values.append(np.nan)
+        return values
+
+    # validation of the function source
+
+    def check_statement(self, stmt):
+        if isinstance(stmt, ast.If):
+            self.check_expression(stmt.test)
+            for child in stmt.body + stmt.orelse:
+                self.check_statement(child)
+        elif isinstance(stmt, ast.Return):
+            result = ast.literal_eval(stmt.value) if stmt.value is not None else None
+            if result == (False, None):
+                stmt.exit_code = 0
+            elif isinstance(result, tuple) and (len(result) == 2) and (result[0] is True) and isinstance(result[1], str):
+                stmt.exit_code = len(self.signals)
+                self.signals.append(result[1])
+            else:
+                raise ValueError(f"unsupported return value: line {stmt.lineno}")
+        elif not (isinstance(stmt, ast.Pass) or (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant))):
+            raise ValueError(f"unsupported statement: line {stmt.lineno}")
+
+    # returns True if the expression depends on the trade values
+    def check_expression(self, node) -> bool:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            uses_trade = False
+        elif isinstance(node, ast.Name) and (node.id in self.trade_names):
+            uses_trade = True
+        elif isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and (node.value.id in self.candle_names):
+            key = node.slice.value if isinstance(node.slice, getattr(ast, 'Index', ())) else node.slice
+            if not (isinstance(key, ast.Constant) and isinstance(key.value, str)):
+                raise ValueError(f"unsupported column: line {node.lineno}")
+            node.candle_key = (self.candle_names[node.value.id], key.value)
+            self.columns.add(key.value)
+            self.lookback = max(self.lookback, node.candle_key[0])
+            uses_trade = False
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd, ast.Not)):
+            uses_trade = self.check_expression(node.operand)
+        elif isinstance(node, ast.BinOp) and (type(node.op) in self.binary_ops):
+            uses_trade = self.check_expression(node.left) or self.check_expression(node.right)
+            if uses_trade:
+                raise ValueError(f"unsupported use of trade values: line {node.lineno}")
+        elif isinstance(node, ast.BoolOp):
+            uses_trade = any([self.check_expression(value) for value in node.values])
+        elif isinstance(node, ast.Compare) and all(type(op) in self.compare_ops for op in node.ops):
+            operands = [node.left] + node.comparators
+            trade_operands = [self.check_expression(operand) for operand in operands]
+            uses_trade = any(trade_operands)
+            if uses_trade:
+                # trade values can only be compared to constants
+                for operand, is_trade in zip(operands, trade_operands):
+                    if is_trade and not isinstance(operand, ast.Name):
+                        raise ValueError(f"unsupported use of trade values: line {node.lineno}")
+                    if not is_trade:
+                        self.constant_value(operand, node)
+                for operand in operands:
+                    if isinstance(operand, ast.Name):
+                        self.thresholds[operand.id].update(self.constant_value(other, node) for other in operands if not isinstance(other, ast.Name))
+                self.trade_compares.append(node)
+        else:
+            raise ValueError(f"unsupported expression: line {node.lineno}")
+
+        node.candle_only = not uses_trade
+        return uses_trade
+
+    @staticmethod
+    def constant_value(operand, node) -> float:
+        try:
+            return float(ast.literal_eval(operand))
+        except ValueError:
+            raise ValueError(f"trade values can only be compared to constants: line {node.lineno}")
+
+    # evaluation over columns
+
+    @staticmethod
+    def truth(value):
+        # same as bool() for each value (so NaN is True)
+        if np.ndim(value) == 0:
+            return bool(value)
+        if value.dtype == bool:
+            return value
+        return np.asarray(value != 0, dtype=bool)
+
+    def evaluate(self, node, values, candles, cache):
+        if node.candle_only and (id(node) in cache):
+            return cache[id(node)]
+
+        if isinstance(node, ast.Constant):
+            result = node.value
+        elif isinstance(node, ast.Name):
+            result = values[node.id]
+        elif isinstance(node, ast.Subscript):
+            result = candles(*node.candle_key)
+        elif isinstance(node, ast.UnaryOp):
+            operand = self.evaluate(node.operand, values, candles, cache)
+            if isinstance(node.op, ast.Not):
+                result = np.logical_not(self.truth(operand))
+            else:
+                result = -operand if isinstance(node.op, ast.USub) else +operand
+        elif isinstance(node, ast.BinOp):
+            result = self.binary_ops[type(node.op)](self.evaluate(node.left, values, candles, cache), self.evaluate(node.right, values, candles, cache))
+        elif isinstance(node, ast.BoolOp):
+            # the trade value conditions are scalars, so check those first
+            is_and = isinstance(node.op, ast.And)
+            result = is_and
+            for operand in sorted(node.values, key=lambda v: v.candle_only):
+                value = self.truth(self.evaluate(operand, values, candles, cache))
+                result = np.logical_and(result, value) if is_and else np.logical_or(result, value)
+                if (np.ndim(result) == 0) and (bool(result) != is_and):
+                    break
+        else:
+            left = self.evaluate(node.left, values, candles, cache)
+            result = True
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self.evaluate(comparator, values, candles, cache)
+                result = np.logical_and(result, self.compare_ops[type(op)](left, right))
+                left = right
+
+        if node.candle_only:
+            cache[id(node)] = result
+        return result
+
+    def run(self, stmts, active, values, candles, cache, codes, done):
+        for stmt in stmts:
+            active = active & ~done
+            if not active.any():
+                return
+            if isinstance(stmt, ast.If):
+                test = self.truth(self.evaluate(stmt.test, values, candles, cache))
+                if np.ndim(test) == 0:
+                    self.run(stmt.body if test else stmt.orelse, active, values, candles, cache, codes, done)
+                else:
+                    orelse = active & ~test
+                    self.run(stmt.body, active & test, values, candles, cache, codes, done)
+                    self.run(stmt.orelse, orelse, values, candles, cache, codes, done)
+            elif isinstance(stmt, ast.Return):
+                codes[active] = stmt.exit_code
+                done |= active
+
+    # returns the code columns for the dataframe. If num_rows is set, only the last num_rows candles are calculated
+    def populate(self, dataframe: DataFrame, num_rows=None) -> dict:
+        length = len(dataframe)
+        first = max(self.lookback, 0 if num_rows is None else length - num_rows)
+        columns = {name: np.full(length, -1, dtype=self.dtype) for name in self.column_names}
+        if first >= length:
+            return columns
+
+        data = {col: dataframe[col].to_numpy() for col in self.columns}
+        candles = lambda offset, col: data[col][first - offset:length - offset]
+        cache = {}
+        with np.errstate(all='ignore'):
+            for name, values in zip(self.column_names, self.region_values):
+                codes = np.zeros(length - first, dtype=self.dtype)
+                self.run(self.body, np.ones(length - first, dtype=bool), values, candles, cache, codes, np.zeros(length - first, dtype=bool))
+                columns[name][first:] = codes
+        return columns
+
+    def region(self, values: dict) -> int:
+        index = 0
+        for name, thresholds in self.thresholds.items():
+            value = values[name]
+            if value != value:
+                position = 2 * len(thresholds) + 1
+            else:
+                position = 2 * bisect.bisect_left(thresholds, value)
+                if (position // 2 < len(thresholds)) and (thresholds[position // 2] == value):
+                    position += 1
+            index = index * (2 * len(thresholds) + 2) + position
+        return self.region_index[index]
+
+    def available(self, candle) -> bool:
+        return candle.get(self.column_names[0], -1) >= 0
+
+    # the precomputed result for the candle, in the same format as the function, or None if it wasn't calculated
+    def lookup(self, candle, values: dict):
+        code = candle.get(self.column_names[self.region(values)], -1)
+        if not code >= 0:
+            return None
+        return bool(code > 0), self.signals[int(code)]
+
+
+class ConditionSeries:
+    """
+    A column or expression of a ConditionFrame, used in place of a pandas Series when writing the entry conditions.
+    Only records the operation, the values are calculated by ConditionFrame.evaluate()
+    """
+
+    def __init__(self, frame, op, args):
+        self.frame = frame
+        self.op = op
+        self.args = args
+        self.uses = 0
+
+    def __add__(self, other): return self.frame.node('add', self, other)
+    def __radd__(self, other): return self.frame.node('add', other, self)
+    def __sub__(self, other): return self.frame.node('sub', self, other)
+    def __rsub__(self, other): return self.frame.node('sub', other, self)
+    def __mul__(self, other): return self.frame.node('mul', self, other)
+    def __rmul__(self, other): return self.frame.node('mul', other, self)
+    def __truediv__(self, other): return self.frame.node('truediv', self, other)
+    def __rtruediv__(self, other): return self.frame.node('truediv', other, self)
+    def __neg__(self): return self.frame.node('neg', self)
+    def __lt__(self, other): return self.frame.node('lt', self, other)
+    def __le__(self, other): return self.frame.node('le', self, other)
+    def __gt__(self, other): return self.frame.node('gt', self, other)
+    def __ge__(self, other): return self.frame.node('ge', self, other)
+    def __eq__(self, other): return self.frame.node('eq', self, other)
+    def __ne__(self, other): return self.frame.node('ne', self, other)
+    def __and__(self, other): return self.frame.node('and', self, other)
+    def __rand__(self, other): return self.frame.node('and', other, self)
+    def __or__(self, other): return self.frame.node('or', self, other)
+    def __ror__(self, other): return self.frame.node('or', other, self)
+    def __invert__(self): return self.frame.node('invert', self)
+
+    __hash__ = object.__hash__
+
+    def __bool__(self):
+        raise ValueError("The truth value of a ConditionSeries is ambiguous")
+
+    def lt(self, other): return self < other
+    def le(self, other): return self <= other
+    def gt(self, other): return self > other
+    def ge(self, other): return self >= other
+
+    def shift(self, periods=1):
+        return self.frame.node('shift', self, int(periods))
+
+    def rolling(self, window):
+        return ConditionRolling(self, int(window))
+
+
+class ConditionRolling:
+
+    def __init__(self, series, window):
+        self.series = series
+        self.window = window
+
+    def min(self):
+        return self.series.frame.node('rolling_min', self.series, self.window)
+
+    def max(self):
+        return self.series.frame.node('rolling_max', self.series, self.window)
+
+
+class ConditionFrame:
+    """
+    Stands in for the dataframe while the entry conditions are written, so that the sub-expressions they have in common
+    (columns, shifts, rollings, protections etc.) are only calculated once.
+    Each operation is interned in a table, so writing the same expression again gives the same node, and nothing is
+    calculated until evaluate() is called with all the conditions. The nodes are then calculated as numpy arrays, each
+    value being kept until its last use.
+    """
+
+    binary_ops = {'add': operator.add, 'sub': operator.sub, 'mul': operator.mul, 'truediv': operator.truediv,
+                  'lt': operator.lt, 'le': operator.le, 'gt': operator.gt, 'ge': operator.ge, 'eq': operator.eq, 'ne': operator.ne}
+
+    def __init__(self, dataframe: DataFrame):
+        self.dataframe = dataframe
+        self.nodes = {}
+
+    def __getitem__(self, column):
+        return self.node('column', column)
+
+    # operands that aren't hashable (Series, arrays) are interned by id, they are kept alive by the node's args
+    @staticmethod
+    def operand_key(arg):
+        if isinstance(arg, ConditionSeries):
+            return id(arg)
+        try:
+            hash(arg)
+            return (type(arg), arg)
+        except TypeError:
+            return ('id', id(arg))
+
+    def node(self, op, *args) -> ConditionSeries:
+        key = (op,) + tuple(self.operand_key(arg) for arg in args)
+        node = self.nodes.get(key)
+        if node is None:
+            node = ConditionSeries(self, op, args)
+            self.nodes[key] = node
+            for arg in args:
+                if isinstance(arg, ConditionSeries):
+                    arg.uses += 1
+        return node
+
+    # same as pandas for the logical operators (NaN is False)
+    @staticmethod
+    def to_bool(values):
+        if np.ndim(values) == 0:
+            return bool(values) and not pd.isna(values)
+        if values.dtype == bool:
+            return values
+        return values.astype(bool) & ~pd.isna(values)
+
+    def calculate(self, op, args):
+        if op == 'column':
+            return self.dataframe[args[0]].to_numpy()
+        if op == 'shift':
+            values, periods = args
+            result = np.full(len(values), np.nan, dtype=float if values.dtype.kind in 'biuf' else object)
+            if periods > 0:
+                result[periods:] = values[:-periods]
+            elif periods < 0:
+                result[:periods] = values[-periods:]
+            else:
+                result[:] = values
+            return result
+        if op == 'rolling_min':
+            return Series(args[0]).rolling(args[1]).min().to_numpy()
+        if op == 'rolling_max':
+            return Series(args[0]).rolling(args[1]).max().to_numpy()
+        if op == 'and':
+            return np.logical_and(self.to_bool(args[0]), self.to_bool(args[1]))
+        if op == 'or':
+            return np.logical_or(self.to_bool(args[0]), self.to_bool(args[1]))
+        if op == 'invert':
+            return np.logical_not(self.to_bool(args[0]))
+        if op == 'neg':
+            return -args[0]
+        return self.binary_ops[op](*args)
+
+    def value(self, node, values):
+        if id(node) in values:
+            return values[id(node)]
+        args = [self.value(arg, values) if isinstance(arg, ConditionSeries) else arg for arg in node.args]
+        result = self.calculate(node.op, args)
+        values[id(node)] = result
+        # the arguments aren't needed anymore once all the nodes using them have been calculated
+        for arg in node.args:
+            if isinstance(arg, ConditionSeries):
+                arg.uses -= 1
+                if arg.uses == 0:
+                    del values[id(arg)]
+        return result
+
+    # returns the conditions as boolean numpy arrays
+    def evaluate(self, conditions) -> list:
+        values = {}
+        results = []
+        with np.errstate(all='ignore'):
+            for condition in conditions:
+                if isinstance(condition, ConditionSeries):
+                    condition.uses += 1
+                    results.append(self.to_bool(self.value(condition, values)))
+                else:
+                    results.append(np.full(len(self.dataframe), self.to_bool(condition)))
+        return results
+
 
 class Cache:
 
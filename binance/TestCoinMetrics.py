@@ -0,0 +1,160 @@
+# Checks that CoinMetrics (NostalgiaForInfinityX) finds the same top traded/grossing coins as the original
+# merge/nlargest implementation, including after incremental updates (new daily candles, whitelist changes), and
+# shows the speedup
+# Usage: python TestCoinMetrics.py [num_pairs] [num_days]
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from NostalgiaForInfinityX import CoinMetrics, traded_volume, grossing_rate
+
+
+class TestDataProvider():
+    # minimal version of the freqtrade DataProvider, daily candles only
+
+    def __init__(self, dataframes):
+        self.dataframes = dataframes
+
+    def get_pair_dataframe(self, pair, timeframe):
+        return self.dataframes[pair].copy()
+
+
+def get_dataframes(num_pairs, num_days):
+    rng = np.random.default_rng(42)
+    dates = pd.date_range("2020-01-01", periods=num_days, freq="1D", tz='UTC')
+    dataframes = {}
+    for i in range(num_pairs):
+        # BTC has the full history, other coins are listed at different times
+        start = 0 if i == 0 else int(rng.integers(0, num_days // 2))
+        close = 10.0 * np.exp(np.cumsum(rng.normal(0.0, 0.05, num_days - start)))
+        # some days with no volume (and no price change), so that there are ties
+        volume = rng.uniform(1e3, 1e6, num_days - start) * (rng.uniform(size=num_days - start) > 0.1)
+        close[1:][volume[1:] == 0.0] = close[:-1][volume[1:] == 0.0]
+        pair = "BTC/USDT" if i == 0 else f"C{i}/USDT"
+        dataframes[pair] = DataFrame({'date': dates[start:], 'open': close, 'high': close * 1.01,
+                                      'low': close * 0.99, 'close': close, 'volume': volume})
+    return dataframes
+
+
+def add_day(dataframes, rng, pairs=None):
+    # add a new daily candle to every pair (or just to pairs)
+    for pair in (pairs if pairs is not None else list(dataframes.keys())):
+        df = dataframes[pair]
+        close = df['close'].iloc[-1] * np.exp(rng.normal(0.0, 0.05))
+        row = DataFrame({'date': [df['date'].iloc[-1] + pd.Timedelta(days=1)], 'open': [close],
+                         'high': [close * 1.01], 'low': [close * 0.99], 'close': [close],
+                         'volume': [rng.uniform(1e3, 1e6)]})
+        dataframes[pair] = pd.concat([df, row], ignore_index=True)
+
+
+# reference implementation, copied from the original top_traded_list(), top_grossing_list() and is_top_coin()
+def reference_top_list(dp, whitelist, metric, top_len) -> DataFrame:
+    top_dataframe = DataFrame()
+    for coin_pair in whitelist:
+        coin = coin_pair.split('/')[0]
+        pair_dataframe = dp.get_pair_dataframe(pair=coin_pair, timeframe='1d')
+        if not 'date' in top_dataframe:
+            top_dataframe['date'] = pair_dataframe['date']
+        pair_dataframe[coin] = metric(pair_dataframe)
+        pair_dataframe.drop(columns=['open', 'high', 'low', 'close', 'volume'], inplace=True)
+        top_dataframe = top_dataframe.merge(pair_dataframe, on='date', how='left')
+
+    top_dataframe.fillna(0, inplace=True)
+    pair_dates = top_dataframe['date']
+    top_dataframe.drop(columns=['date'], inplace=True)
+    column_names = [f"Coin #{i}" for i in range(1, top_len + 1)]
+    top_dataframe[column_names] = top_dataframe.apply(lambda x: x.nlargest(top_len).index.values, axis=1, result_type='expand')
+    top_dataframe.drop(columns=[col for col in top_dataframe if col not in column_names], inplace=True)
+    top_dataframe.insert(loc=0, column='date', value=pair_dates)
+    return top_dataframe
+
+
+def reference_is_top(top_dataframe, dp, pair, top_len) -> np.ndarray:
+    informative_1d = dp.get_pair_dataframe(pair=pair, timeframe='1d')
+    informative_1d = informative_1d.merge(top_dataframe, on='date', how='left')
+    return informative_1d.apply(lambda row: pair.split('/')[0] in row.loc['Coin #1':f"Coin #{top_len}"].values,
+                                axis=1).to_numpy()
+
+
+def check(name, dp, whitelist, metric, top_len, coin_metrics) -> bool:
+    expected = reference_top_list(dp, whitelist, metric, top_len)
+    ok = True
+    for pair in whitelist:
+        dates = dp.get_pair_dataframe(pair, '1d')['date']
+        ok = ok and np.array_equal(reference_is_top(expected, dp, pair, top_len), coin_metrics.is_top(pair, dates))
+    print("{:<48} {}".format(name, "OK" if ok else "FAIL"))
+    return ok
+
+
+def main():
+    num_pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    num_days = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = np.random.default_rng(0)
+    all_ok = True
+
+    for metric, top_len in [(traded_volume, 10), (grossing_rate, 20)]:
+        dataframes = get_dataframes(num_pairs, num_days)
+        dp = TestDataProvider(dataframes)
+        whitelist = list(dataframes.keys())
+        print(f"{metric.__name__}, top {top_len}:")
+
+        coin_metrics = CoinMetrics(metric, top_len)
+        coin_metrics.update(dp, whitelist, '1d')
+        all_ok = check("  full history", dp, whitelist, metric, top_len, coin_metrics) and all_ok
+
+        ok = not coin_metrics.update(dp, whitelist, '1d')
+        print("{:<48} {}".format("  no update without new candles", "OK" if ok else "FAIL"))
+        all_ok = all_ok and ok
+
+        add_day(dataframes, rng)
+        coin_metrics.update(dp, whitelist, '1d')
+        all_ok = check("  new daily candle", dp, whitelist, metric, top_len, coin_metrics) and all_ok
+
+        # one pair's candle arrives on a later loop than the others
+        add_day(dataframes, rng, [pair for pair in whitelist if pair != "C7/USDT"])
+        coin_metrics.update(dp, whitelist, '1d')
+        add_day(dataframes, rng, ["C7/USDT"])
+        coin_metrics.update(dp, whitelist, '1d')
+        all_ok = check("  late daily candle", dp, whitelist, metric, top_len, coin_metrics) and all_ok
+
+        whitelist = [pair for pair in whitelist if pair != "C3/USDT"]
+        whitelist.insert(5, whitelist.pop(10))
+        coin_metrics.update(dp, whitelist, '1d')
+        all_ok = check("  whitelist change (removed & reordered)", dp, whitelist, metric, top_len,
+                       coin_metrics) and all_ok
+
+        whitelist.append("C3/USDT")
+        coin_metrics.update(dp, whitelist, '1d')
+        all_ok = check("  whitelist change (added)", dp, whitelist, metric, top_len, coin_metrics) and all_ok
+
+        # timing: original rebuild vs. CoinMetrics rebuild and incremental update
+        start = time.perf_counter()
+        reference_top_list(dp, whitelist, metric, top_len)
+        t_orig = time.perf_counter() - start
+
+        start = time.perf_counter()
+        CoinMetrics(metric, top_len).update(dp, whitelist, '1d')
+        t_new = time.perf_counter() - start
+
+        add_day(dataframes, rng)
+        start = time.perf_counter()
+        coin_metrics.update(dp, whitelist, '1d')
+        t_incr = time.perf_counter() - start
+
+        start = time.perf_counter()
+        coin_metrics.update(dp, whitelist, '1d')
+        t_none = time.perf_counter() - start
+
+        print(f"  {num_pairs} pairs, {num_days} days: original:{1000.0 * t_orig:.1f}ms "
+              f"new:{1000.0 * t_new:.1f}ms new candle:{1000.0 * t_incr:.1f}ms no new candle:{1000.0 * t_none:.2f}ms")
+        print("")
+
+    print("PASSED" if all_ok else "FAILED")
+
+
+if __name__ == '__main__':
+    main()
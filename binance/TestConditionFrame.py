@@ -0,0 +1,294 @@
+# Checks that the entry conditions of NostalgiaForInfinityX give the same results when evaluated with ConditionFrame as
+# with plain pandas (the original code), including the buy tags, and shows the time taken by each
+# Usage: python TestConditionFrame.py [num_candles]
+
+import operator
+import re
+import sys
+import time
+import types
+
+import numpy as np
+from pandas import DataFrame, Series
+
+import NostalgiaForInfinityX as nfix
+
+
+class PandasFrame():
+    # evaluates the conditions directly on the dataframe, as in the original code
+
+    evaluated = []
+
+    def __init__(self, dataframe):
+        self.dataframe = dataframe
+
+    def __getitem__(self, column):
+        return self.dataframe[column]
+
+    def evaluate(self, conditions) -> list:
+        results = []
+        for condition in conditions:
+            if isinstance(condition, Series):
+                results.append(condition.to_numpy(dtype=bool))
+            else:
+                results.append(np.full(len(self.dataframe), bool(condition)))
+        PandasFrame.evaluated = results
+        return results
+
+
+def get_strategy(runmode='backtest'):
+    strategy = nfix.NostalgiaForInfinityX.__new__(nfix.NostalgiaForInfinityX)
+    strategy.config = {'runmode': types.SimpleNamespace(value=runmode)}
+    strategy.buy_params = {name: True if name.endswith('_enable') else value for name, value in strategy.buy_params.items()}
+    strategy.has_bt_agefilter = True
+    return strategy
+
+
+def get_dataframe(strategy, num_candles, rng) -> DataFrame:
+    # values around the constants each column is compared to in the source, so that the conditions are sometimes met
+    source = open(nfix.__file__).read()
+    constants = {}
+    for column, value in re.findall(r"dataframe\['(\w+)'\] *[<>]=? *\(?(-?[0-9.]+)\)?(?![0-9.]* *\*)", source):
+        constants.setdefault(column, []).append(float(value))
+
+    dataframe = DataFrame({'close': 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, num_candles)))})
+    nfix.ConditionFrame, condition_frame = PandasFrame, nfix.ConditionFrame
+    try:
+        while True:
+            try:
+                strategy.populate_entry_trend(dataframe.copy(), {'pair': 'TEST/USDT'})
+                break
+            except KeyError as e:
+                column = e.args[0]
+                if column.endswith('_ok') or column.endswith('downtrend_1h'):
+                    values = rng.uniform(size=num_candles) > 0.2
+                elif constants.get(column):
+                    values = rng.choice(constants[column], num_candles)
+                    values = values + rng.normal(0.0, 0.05, num_candles) * np.maximum(np.abs(values), 1.0)
+                else:
+                    values = dataframe['close'].to_numpy() * np.exp(rng.normal(0.0, 0.04, num_candles))
+                    if column.startswith('volume'):
+                        values = values * (rng.uniform(size=num_candles) > 0.05)
+                if values.dtype != bool:
+                    values[rng.uniform(size=num_candles) < 0.01] = np.nan
+                dataframe[column] = values
+    finally:
+        nfix.ConditionFrame = condition_frame
+    return dataframe
+
+
+# sets the column(s) an expression depends on at a candle so that it has the given value, returns False if not possible
+def assign(dataframe, node, row, target) -> bool:
+    if not isinstance(node, nfix.ConditionSeries) or np.isnan(target):
+        return False
+    arg = node.args[0]
+    other = node.args[1] if len(node.args) > 1 else None
+    constant = isinstance(other, (int, float)) and not isinstance(other, bool)
+    if node.op == 'column':
+        if dataframe[arg].dtype == bool:
+            return False
+        dataframe.loc[row, arg] = target
+        return True
+    if node.op == 'shift':
+        return row - other >= 0 and assign(dataframe, arg, row - other, target)
+    if node.op in ('rolling_min', 'rolling_max'):
+        # the whole window at the same value
+        return all([assign(dataframe, arg, i, target) for i in range(row - other + 1, row + 1)])
+    if node.op == 'neg':
+        return assign(dataframe, arg, row, -target)
+    if node.op == 'mul':
+        if constant and other != 0:
+            return assign(dataframe, arg, row, target / other)
+        return isinstance(arg, (int, float)) and arg != 0 and assign(dataframe, other, row, target / arg)
+    if node.op == 'truediv':
+        return constant and assign(dataframe, arg, row, target * other)
+    if node.op == 'add':
+        if constant:
+            return assign(dataframe, arg, row, target - other)
+        return isinstance(arg, (int, float)) and assign(dataframe, other, row, target - arg)
+    if node.op == 'sub':
+        if constant:
+            return assign(dataframe, arg, row, target + other)
+        return isinstance(arg, (int, float)) and assign(dataframe, other, row, arg - target)
+    return False
+
+
+# changes the columns at a candle so that the expression is True (or False) there, returns False if not possible
+def satisfy(dataframe, node, row, values, rng, want=True) -> bool:
+    if not isinstance(node, nfix.ConditionSeries):
+        return bool(node) == want
+    value = lambda arg: values[id(arg)][row] if isinstance(arg, nfix.ConditionSeries) else arg
+    if node.op == 'column' and dataframe[node.args[0]].dtype == bool:
+        dataframe.loc[row, node.args[0]] = want
+        return True
+    if node.op == 'invert':
+        return satisfy(dataframe, node.args[0], row, values, rng, not want)
+    if node.op in ('and', 'or'):
+        if (node.op == 'and') == want:
+            return all([satisfy(dataframe, arg, row, values, rng, want) for arg in node.args])
+        if values[id(node)][row] == want:
+            return True
+        return any(satisfy(dataframe, arg, row, values, rng, want) for arg in rng.permutation(np.array(node.args, dtype=object)))
+    ops = {'lt': 'ge', 'le': 'gt', 'gt': 'le', 'ge': 'lt'}
+    if node.op not in ops:
+        return False
+    op = node.op if want else ops[node.op]
+    lhs, rhs = value(node.args[0]), value(node.args[1])
+    # just inside the threshold
+    margin = 1e-3 * max(abs(rhs), abs(lhs), 1e-3) if not (np.isnan(lhs) or np.isnan(rhs)) else 0.0
+    if assign(dataframe, node.args[0], row, rhs + (margin if op in ('gt', 'ge') else -margin)):
+        return True
+    return assign(dataframe, node.args[1], row, lhs + (margin if op in ('lt', 'le') else -margin))
+
+
+# the entry conditions are rarely met with random data, so the columns are changed at one candle per condition to
+# meet it (the conditions have thresholds in common, so a few passes are needed)
+def meet_conditions(strategy, dataframe, num_conditions, rng, num_passes=10) -> DataFrame:
+    recorded = {}
+    class GraphFrame(nfix.ConditionFrame):
+        def evaluate(self, conditions) -> list:
+            recorded['frame'], recorded['conditions'] = self, conditions
+            return super().evaluate(conditions)
+
+    lookback = 300
+    rows = np.linspace(lookback, len(dataframe) - 1, num_conditions, dtype=int)
+    for _ in range(num_passes):
+        run(strategy, dataframe, GraphFrame)
+        frame = recorded['frame']
+        values = dict(zip([id(node) for node in frame.nodes.values()], frame_values(frame)))
+        for row, condition in zip(rows, recorded['conditions']):
+            if isinstance(condition, nfix.ConditionSeries) and not nfix.ConditionFrame.to_bool(values[id(condition)][row]):
+                satisfy(dataframe, condition, row, values, rng)
+    return dataframe
+
+
+# the value of each expression of the frame with pandas, in the order they were created (arguments first)
+def pandas_values(frame) -> list:
+    ops = {'add': operator.add, 'sub': operator.sub, 'mul': operator.mul, 'truediv': operator.truediv,
+           'lt': operator.lt, 'le': operator.le, 'gt': operator.gt, 'ge': operator.ge, 'eq': operator.eq,
+           'ne': operator.ne, 'and': operator.and_, 'or': operator.or_}
+    values = {}
+    for node in frame.nodes.values():
+        args = [values[id(arg)] if isinstance(arg, nfix.ConditionSeries) else arg for arg in node.args]
+        if node.op == 'column':
+            value = frame.dataframe[args[0]]
+        elif node.op == 'shift':
+            value = args[0].shift(args[1])
+        elif node.op in ('rolling_min', 'rolling_max'):
+            value = getattr(args[0].rolling(args[1]), node.op[8:])()
+        elif node.op == 'invert':
+            value = ~args[0]
+        elif node.op == 'neg':
+            value = -args[0]
+        else:
+            value = ops[node.op](*args)
+        values[id(node)] = value
+    return [values[id(node)] for node in frame.nodes.values()]
+
+
+def frame_values(frame) -> list:
+    values = {}
+    with np.errstate(all='ignore'):
+        for node in frame.nodes.values():
+            args = [values[id(arg)] if isinstance(arg, nfix.ConditionSeries) else arg for arg in node.args]
+            values[id(node)] = frame.calculate(node.op, args)
+    return [values[id(node)] for node in frame.nodes.values()]
+
+
+def run(strategy, dataframe, frame_class):
+    nfix.ConditionFrame, condition_frame = frame_class, nfix.ConditionFrame
+    try:
+        start = time.perf_counter()
+        result = strategy.populate_entry_trend(dataframe.copy(), {'pair': 'TEST/USDT'})
+        return result, time.perf_counter() - start
+    finally:
+        nfix.ConditionFrame = condition_frame
+
+
+def main():
+    num_candles = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = np.random.default_rng(42)
+    strategy = get_strategy()
+    dataframe = get_dataframe(strategy, num_candles, rng)
+    indexes = [index for index in strategy.buy_protection_params if strategy.buy_params[f"buy_condition_{index}_enable"]]
+    dataframe = meet_conditions(strategy, dataframe, len(indexes), rng)
+    print(f"{len(indexes)} conditions, {len(dataframe.columns)} columns, {num_candles} candles")
+
+    expected, t_pandas = run(strategy, dataframe, PandasFrame)
+    expected_conditions = PandasFrame.evaluated
+
+    # the buy tags as set by the original code
+    expected_tags = dataframe[['close']].copy()
+    expected_tags['buy_tag'] = ''
+    for index, item_buy in zip(indexes, expected_conditions):
+        expected_tags.loc[item_buy, 'buy_tag'] += f"{index} "
+
+    frame = {}
+    class RecordingFrame(nfix.ConditionFrame):
+        def __init__(self, dataframe):
+            super().__init__(dataframe)
+            frame['frame'] = self
+        def evaluate(self, conditions) -> list:
+            frame['conditions'] = super().evaluate(conditions)
+            return frame['conditions']
+
+    result, t_frame = run(strategy, dataframe, RecordingFrame)
+
+    all_ok = True
+    for index, expected_item, item in zip(indexes, expected_conditions, frame['conditions']):
+        if not np.array_equal(expected_item, item):
+            print(f"condition {index}: {np.sum(expected_item != item)} candles differ")
+            all_ok = False
+    ok = np.array_equal(expected['buy'].to_numpy(), result['buy'].to_numpy()) and \
+         (expected['buy_tag'].tolist() == result['buy_tag'].tolist() == expected_tags['buy_tag'].tolist())
+    print("{:<40} {}".format("buy & buy_tag columns", "OK" if ok else "FAIL"))
+    all_ok = all_ok and ok
+
+    # every sub-expression, not only the conditions (few conditions are met with random data)
+    num_diff = 0
+    for node, expected_value, value in zip(frame['frame'].nodes.values(), pandas_values(frame['frame']), frame_values(frame['frame'])):
+        expected_value = expected_value.to_numpy().astype(float)
+        if not np.array_equal(expected_value, value.astype(float), equal_nan=True):
+            if num_diff < 5:
+                print(f"expression {node.op} {node.args}: values differ")
+            num_diff += 1
+    print("{:<40} {}".format(f"{len(frame['frame'].nodes)} expressions", "OK" if num_diff == 0 else "FAIL"))
+    all_ok = all_ok and (num_diff == 0)
+
+    # buy tags, with random conditions
+    random_conditions = [rng.uniform(size=num_candles) > 0.9 for _ in indexes]
+    random_tags = dataframe[['close']].copy()
+    random_tags['buy_tag'] = ''
+    for index, item_buy in zip(indexes, random_conditions):
+        random_tags.loc[item_buy, 'buy_tag'] += f"{index} "
+    class RandomFrame(nfix.ConditionFrame):
+        def evaluate(self, conditions) -> list:
+            return random_conditions
+    result, _ = run(strategy, dataframe, RandomFrame)
+    ok = (result['buy_tag'].tolist() == random_tags['buy_tag'].tolist()) and \
+         np.array_equal(result['buy'].to_numpy(), np.any(random_conditions, axis=0))
+    print("{:<40} {}".format("buy & buy_tag with random conditions", "OK" if ok else "FAIL"))
+    all_ok = all_ok and ok
+
+    # arrays and Series as operands (not hashable, interned by id)
+    condition_frame = nfix.ConditionFrame(dataframe)
+    values = dataframe['close'].to_numpy() * 0.99
+    conditions = [condition_frame['close'] > values, condition_frame['close'] > values, condition_frame['close'] > Series(values)]
+    ok = (conditions[0] is conditions[1]) and (conditions[0] is not conditions[2]) and \
+         all(np.array_equal(item, dataframe['close'].to_numpy() > values) for item in condition_frame.evaluate(conditions))
+    print("{:<40} {}".format("array & Series operands", "OK" if ok else "FAIL"))
+    all_ok = all_ok and ok
+
+    num_met = sum(1 for item in expected_conditions if item.any())
+    ok = (num_met > 0)
+    print("{:<40} {}".format(f"conditions met at least once: {num_met}", "OK" if ok else "FAIL"))
+    all_ok = all_ok and ok
+    print(f"candles with a buy: {int(expected['buy'].sum())}")
+    print(f"pandas:{1000.0 * t_pandas:.1f}ms ConditionFrame:{1000.0 * t_frame:.1f}ms")
+
+    print("")
+    print("PASSED" if all_ok else "FAILED")
+
+
+if __name__ == '__main__':
+    main()
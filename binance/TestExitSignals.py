@@ -0,0 +1,143 @@
+# Checks that the exit signals precomputed by ExitSignals (NostalgiaForInfinityX) are the same as calling the exit
+# signal functions for each candle, for random candles and trade values, and shows the time taken by each
+# Usage: python TestExitSignals.py [num_candles] [num_trades]
+
+import ast
+import inspect
+import sys
+import time
+
+import numpy as np
+from pandas import DataFrame
+
+from NostalgiaForInfinityX import NostalgiaForInfinityX, ExitSignals
+
+
+# random columns, with values around the constants each column is compared to (so that all the branches are used)
+def get_dataframe(exit_signals_list, num_candles, rng) -> DataFrame:
+    constants = {}
+    for exit_signals in exit_signals_list:
+        for node in ast.walk(ast.Module(body=exit_signals.body, type_ignores=[])):
+            if isinstance(node, ast.Compare):
+                operands = [node.left] + node.comparators
+                for operand in operands:
+                    if isinstance(operand, ast.Subscript):
+                        column = operand.candle_key[1]
+                        constants.setdefault(column, [])
+                        for other in operands:
+                            if not isinstance(other, (ast.Subscript, ast.Name, ast.BinOp)):
+                                constants[column].append(float(ast.literal_eval(other)))
+
+    columns = {}
+    for exit_signals in exit_signals_list:
+        for column in exit_signals.columns:
+            if column in columns:
+                continue
+            if constants.get(column):
+                values = rng.choice(constants[column], num_candles)
+                values = values + rng.normal(0.0, 0.02, num_candles) * np.maximum(np.abs(values), 1.0) * (rng.uniform(size=num_candles) > 0.1)
+            else:
+                # prices and other indicators compared to each other
+                values = 100.0 * np.exp(rng.normal(0.0, 0.03, num_candles))
+            values[rng.uniform(size=num_candles) < 0.02] = np.nan
+            columns[column] = values
+    dataframe = DataFrame(columns)
+    if 'crossed_below_ema_12_26' in dataframe:
+        dataframe['crossed_below_ema_12_26'] = rng.uniform(size=num_candles) > 0.5
+    return dataframe
+
+
+def get_trade_values(exit_signals, rng) -> dict:
+    values = {}
+    for name in ExitSignals.trade_names:
+        thresholds = exit_signals.thresholds.get(name, [0.0])
+        value = rng.choice(thresholds)
+        choice = rng.uniform()
+        if choice < 0.02:
+            value = np.nan
+        elif choice < 0.7:
+            value += rng.normal(0.0, 0.01)
+        values[name] = float(value)
+    return values
+
+
+def call_function(name, values, rows, i):
+    function = getattr(NostalgiaForInfinityX, name)
+    args = dict(values)
+    args['last_candle'] = rows[i]
+    for k in range(1, 6):
+        args[f'previous_candle_{k}'] = rows[i - k]
+    args.update({'trade': None, 'current_time': None, 'buy_tag': 'empty'})
+    parameters = list(inspect.signature(function).parameters.keys())[1:]
+    return function(None, *[args[p] for p in parameters])
+
+
+def main():
+    num_candles = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    num_trades = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    rng = np.random.default_rng(42)
+    all_ok = True
+
+    # functions that aren't just conditions on the candles are rejected
+    for name in ['sell_stoploss', 'sell_recover', 'sell_trail', 'sell_pump_stoploss', 'sell_long_mode']:
+        try:
+            ExitSignals(getattr(NostalgiaForInfinityX, name))
+            ok = False
+        except ValueError:
+            ok = True
+        print("{:<48} {}".format(f"{name} rejected", "OK" if ok else "FAIL"))
+        all_ok = all_ok and ok
+    print("")
+
+    start = time.perf_counter()
+    exit_signals_list = [ExitSignals(getattr(NostalgiaForInfinityX, name)) for name in NostalgiaForInfinityX.exit_signal_functions]
+    print(f"compiled {len(exit_signals_list)} functions in {1000.0 * (time.perf_counter() - start):.0f}ms")
+
+    dataframe = get_dataframe(exit_signals_list, num_candles, rng)
+    rows = dataframe.to_dict('records')
+
+    print("{:<20} {:>8} {:>8} {:>12} {:>14} {:>14} {:>10} {:>6}".format("function", "signals", "regions", "populate (ms)",
+                                                                      "lookup (us)", "function (us)", "signals", "match"))
+    for exit_signals in exit_signals_list:
+        start = time.perf_counter()
+        columns = exit_signals.populate(dataframe)
+        t_populate = time.perf_counter() - start
+        candles = DataFrame(columns).to_dict('records')
+
+        # the last candle only (live/dry runs)
+        last = exit_signals.populate(dataframe, 1)
+        ok = all(np.array_equal(last[name][-1:], columns[name][-1:]) and np.all(last[name][:-1] == -1) for name in columns)
+        ok = ok and all(np.all(columns[name][:exit_signals.lookback] == -1) for name in columns)
+
+        t_lookup = 0.0
+        t_function = 0.0
+        num_signals = 0
+        for _ in range(num_trades):
+            i = int(rng.integers(exit_signals.lookback, num_candles))
+            values = get_trade_values(exit_signals, rng)
+
+            start = time.perf_counter()
+            result = exit_signals.lookup(candles[i], values)
+            t_lookup += time.perf_counter() - start
+
+            start = time.perf_counter()
+            expected = call_function(exit_signals.name, values, rows, i)
+            t_function += time.perf_counter() - start
+
+            if result != expected:
+                if ok:
+                    print(f"  {exit_signals.name} candle {i} {values}: {result} != {expected}")
+                ok = False
+            num_signals += expected[0]
+
+        print("{:<20} {:>8} {:>8} {:>12.1f} {:>14.2f} {:>14.2f} {:>10} {:>6}".format(
+            exit_signals.name, len(exit_signals.signals) - 1, len(exit_signals.column_names), 1000.0 * t_populate,
+            1e6 * t_lookup / num_trades, 1e6 * t_function / num_trades, num_signals, "OK" if ok else "FAIL"))
+        all_ok = all_ok and ok
+
+    print("")
+    print("PASSED" if all_ok else "FAILED")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+
+# Checks that the batched models in rolling_models.py give the same results as the per-window (rolling().apply())
+# versions used in the strategies, and shows the speedup
+# Usage: python TestRollingModels.py
+
+import time
+
+import numpy as np
+import pandas as pd
+import pywt
+import scipy.fft
+from scipy.ndimage import gaussian_filter1d
+
+import rolling_models as rm
+from simdkalman import KalmanFilter
+
+
+# reference implementation, copied from DWT.py
+def madev(d, axis=None):
+    """ Mean absolute deviation of a signal """
+    return np.mean(np.absolute(d - np.mean(d, axis)), axis)
+
+
+def dwtModel(data, wavelet='haar'):
+    level = 1
+    wmode = "smooth"
+    length = len(data)
+
+    # np.array() because newer versions of pandas pass read-only buffers, which pywt rejects
+    coeff = pywt.wavedec(np.array(data), wavelet, mode=wmode)
+
+    # remove higher harmonics
+    sigma = (1 / 0.6745) * madev(coeff[-level])
+    uthresh = sigma * np.sqrt(2 * np.log(length))
+    coeff[1:] = (pywt.threshold(i, value=uthresh, mode='hard') for i in coeff[1:])
+
+    # inverse transform
+    model = pywt.waverec(coeff, wavelet, mode=wmode)
+
+    return model
+
+
+def model(a: np.ndarray, wavelet='haar') -> float:
+    # de-trend the data
+    w_mean = a.mean()
+    w_std = a.std()
+    x_notrend = (a - w_mean) / w_std
+
+    # get DWT model of data
+    restored_sig = dwtModel(x_notrend, wavelet=wavelet)
+
+    # re-trend
+    model = (restored_sig * w_std) + w_mean
+
+    length = len(model)
+    return model[length - 1]
+
+
+# reference implementation, copied from KalmanSIMD.py (with the filter passed in)
+def kalman_model(a, kfilter):
+    # scale the data
+    standardized = a.copy()
+    w_mean = np.mean(standardized)
+    w_std = np.std(standardized)
+    scaled = (standardized - w_mean) / w_std
+    scaled.fillna(0, inplace=True)
+
+    x = np.array(scaled)
+    smoothed = kfilter.smooth(x)
+    pr_mean = smoothed.observations.mean
+    restored_sig = pr_mean.squeeze()
+    ldiff = len(restored_sig) - len(x)
+    restored_sig = restored_sig[ldiff:]
+
+    # re-trend
+    model = (restored_sig * w_std) + w_mean
+
+    length = len(model)
+    return model[length - 1]
+
+
+# reference implementations, copied from FFT.py and FBB_FFT.py
+def fourierModel(x):
+    n = len(x)
+    xa = np.array(x)
+
+    # compute the fft
+    fft = scipy.fft.fft(xa, n)
+
+    # compute power spectrum density
+    # squared magnitude of each fft coefficient
+    psd = fft * np.conj(fft) / n
+    threshold = 20
+    fft = np.where(psd < threshold, 0, fft)
+
+    # inverse fourier transform
+    ifft = scipy.fft.ifft(fft)
+
+    ifft = ifft.real
+
+    ldiff = len(ifft) - len(xa)
+    model = ifft[ldiff:]
+
+    return model
+
+
+def fft_model(a):
+    # scale the data
+    standardized = a.copy()
+    w_mean = np.mean(standardized)
+    w_std = np.std(standardized)
+    scaled = (standardized - w_mean) / w_std
+
+    ys = fourierModel(scaled)
+
+    # restore the data
+    model = (ys * w_std) + w_mean
+
+    length = len(model)
+    return model[length - 1]
+
+
+def fft_scaled_model(a):
+    # scale the data
+    standardized = a.copy()
+    w_mean = np.mean(standardized)
+    w_std = np.std(standardized)
+    scaled = (standardized - w_mean) / w_std
+    scaled = scaled.fillna(0)
+
+    # get the Fourier model
+    model = fourierModel(scaled)
+
+    length = len(model)
+    return model[length - 1]
+
+
+def scaled_data(a):
+    # scale the data
+    standardized = a.copy()
+    w_mean = np.mean(standardized)
+    w_std = np.std(standardized)
+    scaled = (standardized - w_mean) / w_std
+    scaled = scaled.fillna(0)
+
+    length = len(scaled)
+    return np.ravel(scaled)[length - 1]
+
+
+def fft_lowpass_model(x, cutoff):
+    x = np.array(x)
+    n = x.size
+    t = np.arange(0, n)
+    p = np.polyfit(t, x, 1)  # find linear trend in x
+    x_notrend = x - p[0] * t  # detrended x
+    yf = scipy.fft.rfft(x_notrend)  # detrended x in frequency domain
+
+    # zero out frequencies beyond 'cutoff'
+    cutoff: int = int(len(yf) * cutoff)
+    yf[(cutoff - 1):] = 0
+
+    # inverse transform
+    restored_sig = scipy.fft.irfft(yf)
+    model = restored_sig + p[0] * t
+
+    return model[-1]
+
+
+# reference implementation, copied from Predict_LSTM.py (roll_smooth uses sigma=4, roll_strong_smooth uses 24)
+def roll_smooth(col, sigma=4):
+    smooth = gaussian_filter1d(col, sigma)
+
+    length = len(smooth)
+    if length > 0:
+        return smooth[length - 1]
+    else:
+        return col[len(col) - 1]
+
+
+def get_prices(nrows):
+    # random walk, with a few gaps
+    rng = np.random.default_rng(42)
+    prices = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, nrows)))
+    prices[nrows // 3] = np.nan
+    return pd.Series(prices)
+
+
+def compare(name, expected, actual):
+    ok = np.allclose(expected, actual, rtol=1e-9, atol=1e-9, equal_nan=True)
+    print("{:<24} {}".format(name, "OK" if ok else "*** MISMATCH ***"))
+    if not ok:
+        diff = np.abs(np.nan_to_num(expected) - np.nan_to_num(actual))
+        print("    max diff: {} at {}".format(diff.max(), diff.argmax()))
+    return ok
+
+
+def test_dwt(nrows=5000):
+    prices = get_prices(nrows)
+    all_ok = True
+
+    for window in [128, 64, 37]:
+        start = time.perf_counter()
+        expected = prices.rolling(window=window).apply(model)
+        t_apply = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = rm.rolling_dwt(prices, window)
+        t_batch = time.perf_counter() - start
+
+        all_ok = compare("dwt (window={})".format(window), expected, actual) and all_ok
+        print("    apply: {:.3f}s  batch: {:.3f}s  ({:.0f}x)".format(t_apply, t_batch, t_apply / t_batch))
+
+    # other wavelets
+    all_ok = compare("dwt (db8)", prices.rolling(window=128).apply(lambda a: model(a, wavelet='db8')),
+                     rm.rolling_dwt(prices, 128, wavelet='db8')) and all_ok
+
+    # chunk boundaries must not change anything
+    all_ok = compare("dwt (chunked)", rm.rolling_dwt(prices, 128),
+                     rm.rolling_dwt(prices, 128, chunk_size=100)) and all_ok
+
+    # short data
+    all_ok = compare("dwt (short)", prices[:10].rolling(window=128).apply(model),
+                     rm.rolling_dwt(prices[:10], 128)) and all_ok
+
+    return all_ok
+
+
+def test_fft(nrows=5000, window=128):
+    prices = get_prices(nrows)
+    all_ok = True
+
+    start = time.perf_counter()
+    expected = prices.rolling(window=window).apply(fft_model)
+    t_apply = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = rm.rolling_fft(prices, window)
+    t_batch = time.perf_counter() - start
+
+    all_ok = compare("fft", expected, actual) and all_ok
+    print("    apply: {:.3f}s  batch: {:.3f}s  ({:.0f}x)".format(t_apply, t_batch, t_apply / t_batch))
+
+    all_ok = compare("fft (scaled)", prices.rolling(window=window).apply(fft_scaled_model),
+                     rm.rolling_last(prices, window, lambda w: rm.fft_model(w, retrend=False))) and all_ok
+
+    all_ok = compare("fft (lowpass)", prices.rolling(window=window).apply(lambda a: fft_lowpass_model(a, 0.2)),
+                     rm.rolling_last(prices, window, lambda w: rm.fft_lowpass_model(w, 0.2))) and all_ok
+
+    all_ok = compare("scaled data", prices.rolling(window=window).apply(scaled_data),
+                     rm.rolling_last(prices, window, rm.scaled_last)) and all_ok
+
+    # flat prices (zero std): NaN for model(), 0 for scaledModel()
+    flat = prices.copy()
+    flat[1000:1000 + 2 * window] = 64.0
+    expected = flat.rolling(window=window).apply(fft_model)
+    all_ok = compare("fft (flat)", expected, rm.rolling_fft(flat, window)) and all_ok
+    all_ok = compare("fft (flat, scaled)", flat.rolling(window=window).apply(fft_scaled_model),
+                     rm.rolling_last(flat, window, lambda w: rm.fft_model(w, retrend=False))) and all_ok
+
+    return all_ok
+
+
+def test_kalman(nrows=1000, window=128):
+    prices = get_prices(nrows)
+    kfilter = KalmanFilter(
+        state_transition=1.0,
+        process_noise=2.0,
+        observation_model=1.0,
+        observation_noise=0.5
+    )
+
+    start = time.perf_counter()
+    expected = prices.rolling(window=window).apply(lambda a: kalman_model(a, kfilter))
+    t_apply = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = rm.rolling_last(prices, window, lambda w: rm.kalman_model(w, kfilter), chunk_size=1000)
+    t_batch = time.perf_counter() - start
+
+    ok = compare("kalman", expected, actual)
+    print("    apply: {:.3f}s  batch: {:.3f}s  ({:.0f}x)".format(t_apply, t_batch, t_apply / t_batch))
+    return ok
+
+
+def test_gaussian(nrows=5000):
+    prices = get_prices(nrows)
+    all_ok = True
+
+    # includes windows shorter than the filter radius (4 * sigma), where the reflected samples wrap around
+    for window, sigma in [(128, 24), (32, 4), (12, 24)]:
+        start = time.perf_counter()
+        expected = prices.rolling(window=window).apply(lambda a: roll_smooth(a, sigma))
+        t_apply = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = rm.rolling_gaussian(prices, window, sigma)
+        t_batch = time.perf_counter() - start
+
+        all_ok = compare("gaussian ({}, {})".format(window, sigma), expected, actual) and all_ok
+        print("    apply: {:.3f}s  batch: {:.3f}s  ({:.0f}x)".format(t_apply, t_batch, t_apply / t_batch))
+
+    # other boundary modes
+    expected = prices.rolling(window=64).apply(lambda a: gaussian_filter1d(a, 4, mode='nearest')[-1])
+    all_ok = compare("gaussian (nearest)", expected, rm.rolling_gaussian(prices, 64, 4, mode='nearest')) and all_ok
+
+    return all_ok
+
+
+def test_cache(nrows=2000, nframe=1000, window=128):
+    # simulate a live run: a fixed length dataframe that gains a candle (and drops the oldest) each time
+    prices = get_prices(nrows)
+    dates = pd.Series(pd.date_range("2022-01-01", periods=nrows, freq="15min"))
+    cache = rm.RollingModelCache()
+    all_ok = True
+
+    ncalls = []
+
+    def counted(windows):
+        ncalls.append(windows.shape[0])
+        return rm.dwt_model(windows)
+
+    for end in range(nframe, nframe + 50):
+        frame = prices[end - nframe:end]
+        actual = cache.rolling("BTC/USDT", "15m", "dwt_model", dates[end - nframe:end], frame, window, counted)
+        expected = rm.rolling_dwt(frame, window)
+        if not np.allclose(expected, actual, equal_nan=True):
+            all_ok = compare("cache (row {})".format(end), expected, actual)
+            break
+
+    print("{:<24} {}".format("cache", "OK" if all_ok else "*** MISMATCH ***"))
+    print("    windows calculated: first call: {}  later calls: {}".format(ncalls[0], max(ncalls[1:])))
+
+    # per-window (legacy) functions give the same answer through the wrapper
+    expected = prices[:500].rolling(window=window).apply(model)
+    actual = rm.rolling_last(prices[:500], window, rm.per_window(model))
+    all_ok = compare("per_window", expected, actual) and all_ok
+
+    return all_ok
+
+
+def main():
+    ok = test_dwt()
+    ok = test_fft() and ok
+    ok = test_kalman() and ok
+    ok = test_gaussian() and ok
+    ok = test_cache() and ok
+    print("")
+    print("PASSED" if ok else "FAILED")
+
+
+if __name__ == '__main__':
+    main()
@@ -76,26 +76,32 @@ np.random.seed(seed)
 
 # tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.WARN)
 
-import keras
-from keras import layers
 from tqdm import tqdm
 
-from CompressionAutoEncoder import CompressionAutoEncoder
+# the detectors (most of which use tensorflow/keras) are only loaded when one is created
+from lazy_imports import lazy_import, lazy_attr
 
-from AnomalyDetector_AEnc import AnomalyDetector_AEnc
-from AnomalyDetector_LOF import AnomalyDetector_LOF
-from AnomalyDetector_KMeans import AnomalyDetector_KMeans
-from AnomalyDetector_IFOR import AnomalyDetector_IFOR
-from AnomalyDetector_EE import AnomalyDetector_EE
-from AnomalyDetector_SVM import AnomalyDetector_SVM
-from AnomalyDetector_LSTM import AnomalyDetector_LSTM
-from AnomalyDetector_PCA import AnomalyDetector_PCA
-from AnomalyDetector_GMix import AnomalyDetector_GMix
-from AnomalyDetector_DBSCAN import AnomalyDetector_DBSCAN
-from AnomalyDetector_Ensemble import AnomalyDetector_Ensemble
+keras = lazy_import("keras")
+layers = lazy_import("keras.layers")
+
+CompressionAutoEncoder = lazy_attr("CompressionAutoEncoder", "CompressionAutoEncoder")
+
+AnomalyDetector_AEnc = lazy_attr("AnomalyDetector_AEnc", "AnomalyDetector_AEnc")
+AnomalyDetector_LOF = lazy_attr("AnomalyDetector_LOF", "AnomalyDetector_LOF")
+AnomalyDetector_KMeans = lazy_attr("AnomalyDetector_KMeans", "AnomalyDetector_KMeans")
+AnomalyDetector_IFOR = lazy_attr("AnomalyDetector_IFOR", "AnomalyDetector_IFOR")
+AnomalyDetector_EE = lazy_attr("AnomalyDetector_EE", "AnomalyDetector_EE")
+AnomalyDetector_SVM = lazy_attr("AnomalyDetector_SVM", "AnomalyDetector_SVM")
+AnomalyDetector_LSTM = lazy_attr("AnomalyDetector_LSTM", "AnomalyDetector_LSTM")
+AnomalyDetector_PCA = lazy_attr("AnomalyDetector_PCA", "AnomalyDetector_PCA")
+AnomalyDetector_GMix = lazy_attr("AnomalyDetector_GMix", "AnomalyDetector_GMix")
+AnomalyDetector_DBSCAN = lazy_attr("AnomalyDetector_DBSCAN", "AnomalyDetector_DBSCAN")
+AnomalyDetector_Ensemble = lazy_attr("AnomalyDetector_Ensemble", "AnomalyDetector_Ensemble")
 
 from DataframeUtils import DataframeUtils, ScalerType
 from DataframePopulator import DataframePopulator
+from LabelCache import LabelCache
+import profiler
 
 """
 ####################################################################################
@@ -197,6 +203,9 @@ class Anomaly(IStrategy):
 
     dataframeUtils = None
     dataframePopulator = None
+    indicator_columns = None  # set to a list of indicator columns to only calculate those (plus dependencies)
+    label_cache = None
+    use_label_cache = True  # re-use the training labels if the data has not changed (or only has new candles)
 
     num_pairs = 0
     buy_classifier = None
@@ -211,6 +220,7 @@ class Anomaly(IStrategy):
     dbg_scan_classifiers = False  # if True, scan all viable classifiers and choose the best. Very slow!
     dbg_test_classifier = True  # test clasifiers after fitting
     dbg_verbose = True  # controls debug output
+    dbg_log_memory = False  # if true, log process memory (current/peak RSS) after each processing stage
     dbg_curr_df: DataFrame = None  # for debugging of current dataframe
 
     # variables to track state
@@ -397,9 +407,12 @@ class Anomaly(IStrategy):
             self.dataframePopulator.startup_win = self.startup_candle_count
             self.dataframePopulator.n_loss_stddevs = self.n_loss_stddevs
             self.dataframePopulator.n_profit_stddevs = self.n_profit_stddevs
+            self.dataframePopulator.required_columns = self.indicator_columns
 
         # populate the normal dataframe
-        dataframe = self.dataframePopulator.add_indicators(dataframe)
+        dataframe = self.dataframePopulator.add_indicators(dataframe, self.curr_pair, self.timeframe)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "indicators")
         # dataframe = self.add_indicators(dataframe)
 
         if Anomaly.first_time:
@@ -419,6 +432,8 @@ class Anomaly(IStrategy):
 
         # create labels used for training
         buys, sells = self.create_training_data(dataframe)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "labels")
 
         # # drop last group (because there cannot be a prediction)
         # df = dataframe.iloc[:-self.curr_lookahead]
@@ -429,6 +444,8 @@ class Anomaly(IStrategy):
         if self.dbg_verbose:
             print("    training models...")
         df = self.train_models(curr_pair, dataframe, buys, sells)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "training")
 
         # add predictions
 
@@ -448,6 +465,8 @@ class Anomaly(IStrategy):
         if self.dbg_verbose:
             print("    updating stoploss data...")
         self.add_stoploss_indicators(dataframe, curr_pair)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "predictions")
 
         return dataframe
 
@@ -469,31 +488,11 @@ class Anomaly(IStrategy):
     ################################
 
     # creates the buy/sell labels absed on looking ahead into the supplied dataframe
+    # The labels (and debug columns) are cached, so they are only recalculated when the data changes (see LabelCache)
     def create_training_data(self, dataframe: DataFrame):
-
-        # future_df = self.add_future_data(dataframe.copy())
-        future_df = self.dataframePopulator.add_hidden_indicators(dataframe.copy())
-        future_df = self.dataframePopulator.add_future_data(future_df, self.curr_lookahead)
-
-        future_df['train_buy'] = 0.0
-        future_df['train_sell'] = 0.0
-
-        # use sequence trends as criteria
-        future_df['train_buy'] = self.get_train_buy_signals(future_df)
-        future_df['train_sell'] = self.get_train_sell_signals(future_df)
-
-        buys = future_df['train_buy'].copy()
-        if buys.sum() < 3:
-            print("OOPS! <3 ({:.0f}) buy signals generated. Check training criteria".format(buys.sum()))
-
-        sells = future_df['train_sell'].copy()
-        if buys.sum() < 3:
-            print("OOPS! <3 ({:.0f}) sell signals generated. Check training criteria".format(sells.sum()))
-
-        self.save_debug_data(future_df)
-        self.save_debug_indicators(future_df)
-
-        return buys, sells
+        if self.label_cache is None:
+            self.label_cache = LabelCache()
+        return self.label_cache.get_training_data(self, dataframe, use_cache=self.use_label_cache)
 
     def save_debug_data(self, future_df: DataFrame):
 
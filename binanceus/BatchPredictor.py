@@ -0,0 +1,87 @@
+#
+# Cross-pair batching of model predictions, used by NNPredict and NNBC in live/dry runs
+#
+# When all pairs share the same model (model_per_pair = False), running the predictions from populate_indicators()
+# means one call into the ML framework per pair per candle, and each call pays the fixed overhead of converting the
+# data and dispatching the model. Instead, the strategy collects the input data for every pair in bot_loop_start()
+# (which freqtrade calls once per loop, after refreshing the candles and before analysing each pair), runs it through
+# the model with a single call, and saves the results here. populate_indicators() then just looks up the result for
+# its pair.
+#
+# Results are keyed by the model and the pair, and are tagged with the date of the latest candle that they were
+# calculated for. A result is only returned if that date matches, so anything stale (pair not in the batch, candles
+# changed etc.) is ignored and the caller falls back to running the prediction itself.
+#
+
+import time
+
+import numpy as np
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class BatchPredictor():
+
+    # latest results, shared across all instances. key: (model key, pair), value: {'date', 'predictions'}
+    results = {}
+
+    hits = 0
+    misses = 0
+    batches = 0
+    last_batch_size = 0
+    last_batch_time = 0.0
+
+    def __init__(self):
+        super().__init__()
+
+    # identifies the model used by a classifier. Pairs that share a model file share a key
+    def get_model_key(self, classifier) -> str:
+        model_path = getattr(classifier, 'model_path', "")
+        return model_path if model_path else classifier.__class__.__name__
+
+    # run the inputs for all pairs through the classifier in one batch and save the results.
+    # inputs: {pair: (date of latest candle, data)}
+    def run(self, classifier, inputs: dict):
+
+        if len(inputs) == 0:
+            return
+
+        pairs = list(inputs.keys())
+        data_list = [inputs[pair][1] for pair in pairs]
+
+        start = time.perf_counter()
+        if hasattr(classifier, 'predict_batch'):
+            predictions = classifier.predict_batch(data_list)
+        else:
+            predictions = [classifier.predict(data) for data in data_list]
+        elapsed = time.perf_counter() - start
+
+        model_key = self.get_model_key(classifier)
+        for pair, preds in zip(pairs, predictions):
+            BatchPredictor.results[(model_key, pair)] = {'date': inputs[pair][0], 'predictions': np.asarray(preds)}
+
+        BatchPredictor.batches += 1
+        BatchPredictor.last_batch_size = len(pairs)
+        BatchPredictor.last_batch_time = elapsed
+        log.debug(f"batch predictions: {len(pairs)} pairs in {elapsed:.3f}s ({model_key})")
+
+    # True if the predictions for pair have already been calculated for the candle at date. Used to only run each
+    # pair once per candle, since bot_loop_start() is called much more often than that
+    def has_result(self, classifier, pair: str, date) -> bool:
+        entry = BatchPredictor.results.get((self.get_model_key(classifier), pair), None)
+        return (entry is not None) and (entry['date'] == date)
+
+    # returns the predictions for pair that were calculated for the candle at date, or None if there are none
+    def get(self, classifier, pair: str, date):
+        entry = BatchPredictor.results.get((self.get_model_key(classifier), pair), None)
+        if (entry is None) or (entry['date'] != date):
+            BatchPredictor.misses += 1
+            return None
+
+        BatchPredictor.hits += 1
+        return entry['predictions']
+
+    def clear(self):
+        BatchPredictor.results.clear()
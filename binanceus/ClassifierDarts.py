@@ -16,23 +16,12 @@
 # run: "pip install darts" to get the darts library
 import multiprocessing
 
-import torch
-
-import darts
-import pytorch_lightning
-
-from pytorch_lightning import Trainer
 import numpy as np
 import numpy
-from darts.dataprocessing.transformers import Scaler
-from darts.metrics import mase
-from darts.models import NBEATSModel, TFTModel
 from pandas import DataFrame, Series
 import pandas as pd
 
-from pytorch_lightning.callbacks import EarlyStopping, ModelCheckpoint
 from sklearn.preprocessing import RobustScaler, RobustScaler
-from torchmetrics import MeanAbsolutePercentageError
 
 # from torchinfo import summary
 
@@ -53,15 +42,12 @@ warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 logging.getLogger("lightning").setLevel(logging.WARN)
 logging.getLogger("pytorch_lightning").setLevel(logging.ERROR)
-from pytorch_lightning.utilities.warnings import PossibleUserWarning
 
-warnings.filterwarnings("ignore", category=PossibleUserWarning)
 warnings.filterwarnings("ignore", ".*MPS available but not used.*")
 
 import random
 
 import os
-import multiprocess
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '1'
 os.environ['TF_DETERMINISTIC_OPS'] = '1'
@@ -74,7 +60,31 @@ os.environ['PYTHONHASHSEED'] = str(seed)
 random.seed(seed)
 np.random.seed(seed)
 
+from lazy_imports import lazy_import, lazy_attr, LazyAttribute
+
+
+def init_lightning(module):
+    from pytorch_lightning.utilities.warnings import PossibleUserWarning
+    warnings.filterwarnings("ignore", category=PossibleUserWarning)
+
+
+# torch, darts and lightning are only loaded when a classifier actually uses them
+torch = lazy_import("torch")
+darts = lazy_import("darts")
+pytorch_lightning = lazy_import("pytorch_lightning", on_load=init_lightning)
+multiprocess = lazy_import("multiprocess")
+
+Trainer = LazyAttribute(pytorch_lightning, "Trainer")
+EarlyStopping = lazy_attr("pytorch_lightning.callbacks", "EarlyStopping")
+ModelCheckpoint = lazy_attr("pytorch_lightning.callbacks", "ModelCheckpoint")
+Scaler = lazy_attr("darts.dataprocessing.transformers", "Scaler")
+mase = lazy_attr("darts.metrics", "mase")
+NBEATSModel = lazy_attr("darts.models", "NBEATSModel")
+TFTModel = lazy_attr("darts.models", "TFTModel")
+MeanAbsolutePercentageError = lazy_attr("torchmetrics", "MeanAbsolutePercentageError")
+
 from DataframeUtils import DataframeUtils
+from DartsBacktester import DartsBacktester
 
 
 # ---------------------------
@@ -102,6 +112,7 @@ class ClassifierDarts():
     new_model = False  # May not wrok for darts-based strats, so leave at False
 
     dataframeUtils = None
+    backtester = None
     requires_dataframes = True  # set to True if classifier takes dataframes rather than tensors
     prescale_dataframe = False  # set to True if algorithms need dataframes to be pre-scaled
     single_prediction = False  # True if algorithm only produces 1 prediction (not entire data array)
@@ -150,6 +161,9 @@ class ClassifierDarts():
         if self.dataframeUtils is None:
             self.dataframeUtils = DataframeUtils()
 
+        if self.backtester is None:
+            self.backtester = DartsBacktester(batch_size=self.batch_size)
+
         # # the following should turn on hardware acceleration, if suported
         # torch.device("mps")
         # self.trainer = Trainer(accelerator='mps', devices=1)
@@ -266,6 +280,23 @@ class ClassifierDarts():
                                            verbose=True)
         return preds
 
+    # forecasts (last points only) for every candle that has enough history. Uses the batched backtester if it
+    # supports the model, otherwise falls back to model_historical_forecasts()
+    def model_backtest_forecasts(self, model, target_series, covariate_series):
+
+        min_len = model.input_chunk_length + self.lookahead
+        if self.backtester.supports(model, self.lookahead) and (target_series.n_timesteps >= min_len):
+            preds, start = self.backtester.backtest(model, target_series.values(), covariate_series.values(),
+                                                    self.lookahead)
+            return darts.TimeSeries.from_times_and_values(target_series.time_index[start:], preds,
+                                                          columns=target_series.columns)
+
+        time_est = target_series.n_timesteps / (200.0 * 60.0)  # ~200 it/sec
+        print(f"    backtesting {target_series.n_timesteps} samples. Estimated time:{time_est:.2f} (mins)")
+        with torch.inference_mode():
+            preds = self.model_historical_forecasts(model, target_series, covariate_series)
+        return preds
+
     def model_predict(self, model, target_series, covariate_series):
 
         preds = model.predict(n=self.lookahead,
@@ -353,10 +384,10 @@ class ClassifierDarts():
         # convert to 32-bit (allows use of GPU)
         if self.is_gpu_available():
             print("    Converting to 32-bit to allow GPU usage...")
-            train_time_series = train_time_series.astype(np.float32)
-            test_time_series = test_time_series.astype(np.float32)
-            train_price_series = train_price_series.astype(np.float32)
-            test_price_series = test_price_series.astype(np.float32)
+            train_time_series = train_time_series.astype(self.dataframeUtils.data_dtype)
+            test_time_series = test_time_series.astype(self.dataframeUtils.data_dtype)
+            train_price_series = train_price_series.astype(self.dataframeUtils.data_dtype)
+            test_price_series = test_price_series.astype(self.dataframeUtils.data_dtype)
 
         # scale the dataframes
         df_scaler = Scaler(RobustScaler())
@@ -419,8 +450,8 @@ class ClassifierDarts():
 
         # convert to 32-bit (allows use of GPU)
         if self.is_gpu_available():
-            price_series = price_series.astype(np.float32)
-            df_time_series = df_time_series.astype(np.float32)
+            price_series = price_series.astype(self.dataframeUtils.data_dtype)
+            df_time_series = df_time_series.astype(self.dataframeUtils.data_dtype)
 
         # scale the dataframe
         df_scaler = Scaler(RobustScaler())
@@ -430,12 +461,8 @@ class ClassifierDarts():
         # print(f'    covariate_series:{covariate_series.n_samples}, {covariate_series.n_timesteps}, {covariate_series.n_components}')
         # print(f'    price_series:{price_series.n_samples}, {price_series.n_timesteps}, {price_series.n_components}')
 
-        time_est = dataframe.shape[0] / (200.0 * 60.0)  # ~200 it/sec
-        print(f"    backtesting {dataframe.shape[0]} samples. Estimated time:{time_est:.2f} (mins)")
         # run backtesting
-
-        with torch.inference_mode():
-            preds = self.model_historical_forecasts(self.model, price_series, covariate_series)
+        preds = self.model_backtest_forecasts(self.model, price_series, covariate_series)
 
         # reverse scaling
         preds2 = price_scaler.inverse_transform(preds)
@@ -494,12 +521,12 @@ class ClassifierDarts():
 
         # # convert to 32-bit (allows use of GPU)
         # if self.is_gpu_available():
-        #     price_series = price_series.astype(np.float32)
-        #     df_time_series = df_time_series.astype(np.float32)
+        #     price_series = price_series.astype(self.dataframeUtils.data_dtype)
+        #     df_time_series = df_time_series.astype(self.dataframeUtils.data_dtype)
 
         # workaround for GPU bug: always convert to 32-bit
-        price_series = price_series.astype(np.float32)
-        df_time_series = df_time_series.astype(np.float32)
+        price_series = price_series.astype(self.dataframeUtils.data_dtype)
+        df_time_series = df_time_series.astype(self.dataframeUtils.data_dtype)
 
         # scale the dataframe
         df_scaler = Scaler(RobustScaler())
@@ -530,6 +557,38 @@ class ClassifierDarts():
 
     # ---------------------------
 
+    # get predictions for a list of (equal length) dataframe windows, using a single call to the model.
+    # Each window is scaled independently (same as predict()), but the windows are batched by darts rather than being
+    # run through the model one at a time. Returns the last prediction for each window
+    def predict_windows(self, windows: list) -> np.ndarray:
+
+        if self.model is None:
+            print("    ERR: no model")
+            return np.zeros(len(windows))
+
+        price_list = []
+        covariate_list = []
+        for window in windows:
+            df = window.copy()
+            df['date'] = pd.to_datetime(df.date).dt.tz_localize(None)
+            price_list.append(darts.TimeSeries.from_dataframe(df, time_col='date', value_cols=self.target_column))
+            covariate_list.append(darts.TimeSeries.from_dataframe(df, time_col='date').astype(self.dataframeUtils.data_dtype))
+
+        # when given a list, Scaler fits a separate scaler to each series
+        price_scaler = Scaler(RobustScaler())
+        price_list = [s.astype(self.dataframeUtils.data_dtype) for s in price_scaler.fit_transform(price_list)]
+        df_scaler = Scaler(RobustScaler())
+        covariate_list = df_scaler.fit_transform(covariate_list)
+
+        with torch.inference_mode():
+            preds = self.model_predict(self.model, price_list, covariate_list)
+
+        # reverse scaling (per series) and keep the last value of each forecast
+        preds = price_scaler.inverse_transform(preds)
+        return np.array([p.values()[-1, 0] for p in preds])
+
+    # ---------------------------
+
     # evaluate model using the supplied (normalised) dataframe as test data.
     def evaluate(self, df_norm: DataFrame):
 
@@ -35,20 +35,35 @@ os.environ['TF_DETERMINISTIC_OPS'] = '1'
 # workaround for memory leak in tensorflow 2.10
 os.environ['TF_RUN_EAGER_OP_AS_FUNCTION'] = '0'
 
-import tensorflow as tf
+from lazy_imports import lazy_import
 
 seed = 42
 os.environ['PYTHONHASHSEED'] = str(seed)
 random.seed(seed)
-tf.random.set_seed(seed)
 np.random.seed(seed)
 
-tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.WARN)
 
-import keras
-from keras import layers
+tf_initialised = False
 
-import h5py
+
+# tensorflow setup. Runs once, when tensorflow or keras is first used
+def init_tensorflow(module):
+    global tf_initialised
+    if tf_initialised:
+        return
+    tf_initialised = True
+
+    import tensorflow
+    tensorflow.random.set_seed(seed)
+    tensorflow.compat.v1.logging.set_verbosity(tensorflow.compat.v1.logging.WARN)
+
+
+# tensorflow/keras are only loaded when a classifier actually uses them
+tf = lazy_import("tensorflow", on_load=init_tensorflow)
+keras = lazy_import("keras", on_load=init_tensorflow)
+layers = lazy_import("keras.layers", on_load=init_tensorflow)
+
+h5py = lazy_import("h5py")
 
 from DataframeUtils import DataframeUtils
 
@@ -73,6 +88,7 @@ class ClassifierKeras():
     requires_dataframes = False # set to True if classifier takes dataframes rather than tensors
     prescale_dataframe = True # set to True if algorithms need dataframes to be pre-scaled
     single_prediction = False # True if algorithm only produces 1 prediction (not entire data array)
+    batch_predictions = False # True if predictions can be run for several inputs at once (see predict_batch())
 
     # ---------------------------
 
@@ -203,8 +219,8 @@ class ClassifierKeras():
             test_tensor = self.dataframeUtils.df_to_tensor(df_test, self.seq_len)
         else:
             # already in tensor format
-            train_tensor = df_train_norm.copy()
-            test_tensor = df_test_norm.copy()
+            train_tensor = self.dataframeUtils.to_dtype(df_train_norm)
+            test_tensor = self.dataframeUtils.to_dtype(df_test_norm)
 
         monitor_field = 'loss'
         monitor_mode = "min"
@@ -284,7 +300,7 @@ class ClassifierKeras():
             # convert dataframe to tensor
             tensor = self.dataframeUtils.df_to_tensor(data, self.seq_len)
         else:
-            tensor = data
+            tensor = self.dataframeUtils.to_dtype(data)
 
 
         predict_tensor = self.model.predict(tensor, verbose=1)
@@ -326,6 +342,38 @@ class ClassifierKeras():
 
     # ---------------------------
 
+    # run predictions for several inputs (e.g. one per pair) with a single call to the model, which avoids paying the
+    # per-call overhead for each input. Returns a list with the predictions for each input, the same as calling
+    # predict() on each one. Batching needs batch_predictions to be set, and process_predictions(preds, tensor) to
+    # convert the raw model output for each input (otherwise, the inputs are just passed to predict() one at a time)
+    def predict_batch(self, data_list: list) -> list:
+
+        if not (self.batch_predictions and hasattr(self, 'process_predictions')):
+            return [self.predict(data) for data in data_list]
+
+        if self.model is None:
+            self.model = self.load()
+
+        tensors = []
+        for data in data_list:
+            if self.dataframeUtils.is_dataframe(data):
+                tensors.append(self.dataframeUtils.df_to_tensor(data, self.seq_len))
+            else:
+                tensors.append(self.dataframeUtils.to_dtype(data))
+
+        if self.model is None:
+            print("    ERR: no model for predictions")
+            return [np.zeros(np.shape(tensor)[0], dtype=float) for tensor in tensors]
+
+        preds = self.model.predict(np.concatenate(tensors), verbose=0)
+
+        # split back into the individual inputs, and post-process each one separately (results can depend on the
+        # rest of the input, e.g. thresholds)
+        splits = np.cumsum([np.shape(tensor)[0] for tensor in tensors])[:-1]
+        return [self.process_predictions(p, t) for p, t in zip(np.split(preds, splits), tensors)]
+
+    # ---------------------------
+
     # evaluate model using the supplied (normalised) dataframe as test data.
     def evaluate(self, data):
 
@@ -51,6 +51,7 @@ from ClassifierKeras import ClassifierKeras
 class ClassifierKerasBinary(ClassifierKeras):
 
     clean_data_required = False
+    batch_predictions = True
 
     # create model - subclasses should overide this
     def create_model(self, seq_len, num_features):
@@ -129,8 +130,8 @@ class ClassifierKerasBinary(ClassifierKeras):
             test_tensor = self.dataframeUtils.df_to_tensor(df_test, self.seq_len)
         else:
             # already in tensor format
-            train_tensor = df_train_norm.copy()
-            test_tensor = df_test_norm.copy()
+            train_tensor = self.dataframeUtils.to_dtype(df_train_norm)
+            test_tensor = self.dataframeUtils.to_dtype(df_test_norm)
 
         monitor_field = 'loss'
         monitor_mode = "min"
@@ -200,7 +201,7 @@ class ClassifierKerasBinary(ClassifierKeras):
             # convert dataframe to tensor
             df_tensor = self.dataframeUtils.df_to_tensor(data, self.seq_len)
         else:
-            df_tensor = data
+            df_tensor = self.dataframeUtils.to_dtype(data)
 
         if self.model == None:
             print("    ERR: no model for predictions")
@@ -210,6 +211,10 @@ class ClassifierKerasBinary(ClassifierKeras):
         # run the prediction
         preds = self.model.predict(df_tensor, verbose=0)
 
+        return self.process_predictions(preds, df_tensor)
+
+    def process_predictions(self, preds, tensor):
+
         # re-shape into a vector
         preds = np.array(preds[:, 0]).reshape(-1, 1)
         preds = preds[:, 0]
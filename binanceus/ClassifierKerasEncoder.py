@@ -121,8 +121,8 @@ class ClassifierKerasEncoder(ClassifierKeras):
             test_tensor = self.dataframeUtils.df_to_tensor(df_test, self.seq_len)
         else:
             # already in tensor format
-            train_tensor = df_train_norm.copy()
-            test_tensor = df_test_norm.copy()
+            train_tensor = self.dataframeUtils.to_dtype(df_train_norm)
+            test_tensor = self.dataframeUtils.to_dtype(df_test_norm)
 
         monitor_field = 'loss'
         monitor_mode = "min"
@@ -51,6 +51,7 @@ from ClassifierKeras import ClassifierKeras
 
 class ClassifierKerasLinear(ClassifierKeras):
     clean_data_required = False
+    batch_predictions = True
 
     # create model - subclasses should overide this
     def create_model(self, seq_len, num_features):
@@ -121,8 +122,8 @@ class ClassifierKerasLinear(ClassifierKeras):
             test_tensor = self.dataframeUtils.df_to_tensor(df_test, self.seq_len)
         else:
             # already in tensor format
-            train_tensor = df_train_norm.copy()
-            test_tensor = df_test_norm.copy()
+            train_tensor = self.dataframeUtils.to_dtype(df_train_norm)
+            test_tensor = self.dataframeUtils.to_dtype(df_test_norm)
 
         # set up callbacks
         monitor_field = 'loss'
@@ -194,7 +195,7 @@ class ClassifierKerasLinear(ClassifierKeras):
             # convert dataframe to tensor
             df_tensor = self.dataframeUtils.df_to_tensor(data, self.seq_len)
         else:
-            df_tensor = data
+            df_tensor = self.dataframeUtils.to_dtype(data)
 
         if self.model == None:
             print("    ERR: no model for predictions")
@@ -204,6 +205,10 @@ class ClassifierKerasLinear(ClassifierKeras):
         # run the prediction
         preds = self.model.predict(df_tensor, verbose=0)
 
+        return self.process_predictions(preds, df_tensor)
+
+    def process_predictions(self, preds, tensor):
+
         # reshape so that we return just a straight array of predictions
         preds = np.array(preds[:, 0]).reshape(-1, 1)
         predictions = preds[:, 0]
@@ -142,8 +142,8 @@ class ClassifierKerasTrinary(ClassifierKeras):
             test_tensor = self.dataframeUtils.df_to_tensor(df_test, self.seq_len)
         else:
             # already in tensor format
-            train_tensor = df_train_norm.copy()
-            test_tensor = df_test_norm.copy()
+            train_tensor = self.dataframeUtils.to_dtype(df_train_norm)
+            test_tensor = self.dataframeUtils.to_dtype(df_test_norm)
 
         monitor_field = 'loss'
         monitor_mode = "min"
@@ -215,7 +215,7 @@ class ClassifierKerasTrinary(ClassifierKeras):
             # convert dataframe to tensor
             df_tensor = self.dataframeUtils.df_to_tensor(data, self.seq_len)
         else:
-            df_tensor = data
+            df_tensor = self.dataframeUtils.to_dtype(data)
 
         if self.model == None:
             print("    ERR: no model for predictions")
@@ -16,17 +16,11 @@
 #     conda install pytorch torchvision -c pytorch
 import multiprocessing
 
-import torch
-import pytorch_lightning
-
-from pytorch_lightning import Trainer
 import numpy as np
 from pandas import DataFrame, Series
 import pandas as pd
 
-from pytorch_lightning.callbacks import EarlyStopping
 from sklearn.preprocessing import RobustScaler
-from torchmetrics import MeanAbsolutePercentageError
 
 pd.options.mode.chained_assignment = None  # default='warn'
 
@@ -45,8 +39,6 @@ warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 logging.getLogger("lightning").setLevel(logging.WARN)
 logging.getLogger("pytorch_lightning").setLevel(logging.ERROR)
-from pytorch_lightning.utilities.warnings import PossibleUserWarning
-warnings.filterwarnings("ignore", category=PossibleUserWarning)
 warnings.filterwarnings("ignore", ".*MPS available but not used.*")
 
 import random
@@ -64,7 +56,27 @@ os.environ['PYTHONHASHSEED'] = str(seed)
 random.seed(seed)
 np.random.seed(seed)
 
+from lazy_imports import lazy_import, lazy_attr, LazyAttribute
+
+
+def init_lightning(module):
+    from pytorch_lightning.utilities.warnings import PossibleUserWarning
+    warnings.filterwarnings("ignore", category=PossibleUserWarning)
+
+
+# torch, darts and lightning are only loaded when a classifier actually uses them
+torch = lazy_import("torch")
+darts = lazy_import("darts")
+pytorch_lightning = lazy_import("pytorch_lightning", on_load=init_lightning)
+
+Trainer = LazyAttribute(pytorch_lightning, "Trainer")
+EarlyStopping = lazy_attr("pytorch_lightning.callbacks", "EarlyStopping")
+Scaler = lazy_attr("darts.dataprocessing.transformers", "Scaler")
+MeanAbsolutePercentageError = lazy_attr("torchmetrics", "MeanAbsolutePercentageError")
+PastCovariatesTorchModel = lazy_attr("darts.models.forecasting.torch_forecasting_model", "PastCovariatesTorchModel")
+
 from DataframeUtils import DataframeUtils
+from DartsBacktester import DartsBacktester
 
 
 # ---------------------------
@@ -91,6 +103,7 @@ class ClassifierPyTorch():
     new_model = False  # True if a new model was created this run
 
     dataframeUtils = None
+    backtester = None
     requires_dataframes = True  # set to True if classifier takes dataframes rather than tensors
     prescale_dataframe = False  # set to True if algorithms need dataframes to be pre-scaled
     single_prediction = True  # True if algorithm only produces 1 prediction (not entire data array)
@@ -136,6 +149,9 @@ class ClassifierPyTorch():
         if self.dataframeUtils is None:
             self.dataframeUtils = DataframeUtils()
 
+        if self.backtester is None:
+            self.backtester = DartsBacktester(batch_size=self.batch_size)
+
         # the following should turn on hardware acceleration, if suported
         torch.device("mps")
         self.num_cpus = multiprocessing.cpu_count()
@@ -262,10 +278,10 @@ class ClassifierPyTorch():
         # convert to 32-bit (allows use of GPU)
         if self.is_gpu_available():
             print("    Converting to 32-bit to allow GPU usage...")
-            train_time_series = train_time_series.astype(np.float32)
-            test_time_series = test_time_series.astype(np.float32)
-            train_price_series = train_price_series.astype(np.float32)
-            test_price_series = test_price_series.astype(np.float32)
+            train_time_series = train_time_series.astype(self.dataframeUtils.data_dtype)
+            test_time_series = test_time_series.astype(self.dataframeUtils.data_dtype)
+            train_price_series = train_price_series.astype(self.dataframeUtils.data_dtype)
+            test_price_series = test_price_series.astype(self.dataframeUtils.data_dtype)
 
         # scale the dataframes
         df_scaler = Scaler(RobustScaler())
@@ -346,24 +362,32 @@ class ClassifierPyTorch():
 
         # convert to 32-bit (allows use of GPU)
         if self.is_gpu_available():
-            price_series = price_series.astype(np.float32)
-            df_time_series = df_time_series.astype(np.float32)
+            price_series = price_series.astype(self.dataframeUtils.data_dtype)
+            df_time_series = df_time_series.astype(self.dataframeUtils.data_dtype)
 
         # scale the dataframe
         df_scaler = Scaler(RobustScaler())
         covariate_series = df_scaler.fit_transform(df_time_series)
 
-        time_est = dataframe.shape[0] / 600.0 # ~10 it/sec
-        print(f"    backtesting {dataframe.shape[0]} samples. Estimated time:{time_est:.2f} (mins)")
         # run backtesting
-        # with torch.no_grad():
-        with torch.inference_mode():
-            preds = self.model.historical_forecasts(price_series,
-                                                    past_covariates=covariate_series,
-                                                    forecast_horizon=self.lookahead,
-                                                    last_points_only=True,
-                                                    retrain=False,
-                                                    verbose=False)
+        min_len = self.model.input_chunk_length + self.lookahead
+        if self.backtester.supports(self.model, self.lookahead) and (price_series.n_timesteps >= min_len):
+            # batched forecasts for every candle, same results as historical_forecasts() (see DartsBacktester)
+            scaled_preds, start = self.backtester.backtest(self.model, price_series.values(),
+                                                           covariate_series.values(), self.lookahead)
+            preds = darts.TimeSeries.from_times_and_values(price_series.time_index[start:], scaled_preds,
+                                                           columns=price_series.columns)
+        else:
+            time_est = dataframe.shape[0] / 600.0 # ~10 it/sec
+            print(f"    backtesting {dataframe.shape[0]} samples. Estimated time:{time_est:.2f} (mins)")
+            # with torch.no_grad():
+            with torch.inference_mode():
+                preds = self.model.historical_forecasts(price_series,
+                                                        past_covariates=covariate_series,
+                                                        forecast_horizon=self.lookahead,
+                                                        last_points_only=True,
+                                                        retrain=False,
+                                                        verbose=False)
 
         # reverse scaling
         preds2 = price_scaler.inverse_transform(preds)
@@ -423,12 +447,12 @@ class ClassifierPyTorch():
 
         # # convert to 32-bit (allows use of GPU)
         # if self.is_gpu_available():
-        #     price_series = price_series.astype(np.float32)
-        #     df_time_series = df_time_series.astype(np.float32)
+        #     price_series = price_series.astype(self.dataframeUtils.data_dtype)
+        #     df_time_series = df_time_series.astype(self.dataframeUtils.data_dtype)
 
         # workaround for GPU bug: always convert to 32-bit
-        price_series = price_series.astype(np.float32)
-        df_time_series = df_time_series.astype(np.float32)
+        price_series = price_series.astype(self.dataframeUtils.data_dtype)
+        df_time_series = df_time_series.astype(self.dataframeUtils.data_dtype)
 
         # scale the dataframe
         df_scaler = Scaler(RobustScaler())
@@ -464,6 +488,42 @@ class ClassifierPyTorch():
 
     # ---------------------------
 
+    # get predictions for a list of (equal length) dataframe windows, using a single call to the model.
+    # Each window is scaled independently (same as predict()), but the windows are batched by darts rather than being
+    # run through the model one at a time. Returns the last prediction for each window
+    def predict_windows(self, windows: list) -> np.ndarray:
+
+        if self.model is None:
+            print("    ERR: no model")
+            return np.zeros(len(windows))
+
+        price_list = []
+        covariate_list = []
+        for window in windows:
+            df = window.copy()
+            df['date'] = pd.to_datetime(df.date).dt.tz_localize(None)
+            price_list.append(darts.TimeSeries.from_dataframe(df, time_col='date', value_cols='close'))
+            covariate_list.append(darts.TimeSeries.from_dataframe(df, time_col='date').astype(self.dataframeUtils.data_dtype))
+
+        # when given a list, Scaler fits a separate scaler to each series
+        price_scaler = Scaler(RobustScaler())
+        price_list = [s.astype(self.dataframeUtils.data_dtype) for s in price_scaler.fit_transform(price_list)]
+        df_scaler = Scaler(RobustScaler())
+        covariate_list = df_scaler.fit_transform(covariate_list)
+
+        with torch.inference_mode():
+            preds = self.model.predict(n=self.lookahead,
+                                       series=price_list,
+                                       past_covariates=covariate_list,
+                                       batch_size=self.batch_size,
+                                       verbose=False)
+
+        # reverse scaling (per series) and keep the last value of each forecast
+        preds = price_scaler.inverse_transform(preds)
+        return np.array([p.values()[-1, 0] for p in preds])
+
+    # ---------------------------
+
     # evaluate model using the supplied (normalised) dataframe as test data.
     def evaluate(self, df_norm: DataFrame):
 
@@ -598,7 +658,7 @@ class ClassifierPyTorch():
 
     # subclasses should override this, because data format is calss-specific in darts/pytorch
     def load_from_file(self, model_path):
-        return darts.models.forecasting.torch_forecasting_model.PastCovariatesTorchModel.load(model_path)
+        return PastCovariatesTorchModel.load(model_path)
 
     # ---------------------------
 
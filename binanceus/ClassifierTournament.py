@@ -0,0 +1,180 @@
+#
+# Runs a 'tournament' of (sklearn-style) classifiers in parallel, and returns the macro F1 score of each one
+#
+# Used by PCA.find_best_classifier(). Each candidate is fitted in a separate process. The train/test data is written
+# once to a temporary file and memory-mapped (read-only) by the worker processes, so it is not copied for each one.
+#
+# Options:
+#   time_budget: max time (secs) allowed for each candidate, counted from when its fit starts. Candidates that run
+#                over are stopped (the worker process is terminated) and dropped. Candidates waiting for a free
+#                worker are not affected
+#   halving:     if True, all candidates are first fitted on a subsample of the training data, and only the best
+#                (keep_ratio) of them go on to be fitted on the full training data (successive halving).
+#                This is faster, but it is possible that a candidate that would have won gets eliminated early
+#
+
+import math
+import multiprocessing
+import multiprocessing.connection
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.metrics import f1_score
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+# fit a candidate classifier and score it against the test data. Runs in a worker process
+def fit_candidate(name, clf, data_path, train_rows=None):
+    data = joblib.load(data_path, mmap_mode='r')
+    x_train, y_train = data['x_train'], data['y_train']
+    if train_rows is not None:
+        x_train, y_train = x_train[train_rows], y_train[train_rows]
+
+    start = time.perf_counter()
+    try:
+        clf = clf.fit(x_train, y_train)
+        pred_test = clf.predict(data['x_test'])
+        score = f1_score(data['y_test'], pred_test, average='macro')
+    except Exception as e:
+        log.warning(f"    {name}: fit failed ({e})")
+        clf = None
+        score = -1.0
+
+    return name, clf, score, time.perf_counter() - start
+
+
+# worker process entry point: fit the candidate and send the result back to the parent
+def run_candidate(name, clf, data_path, train_rows, conn):
+    try:
+        result = fit_candidate(name, clf, data_path, train_rows)
+        try:
+            conn.send(result)
+        except Exception as e:
+            # e.g. the fitted classifier cannot be pickled
+            log.warning(f"    {name}: could not return result ({e})")
+            conn.send((name, None, -1.0, result[3]))
+    finally:
+        conn.close()
+
+
+class ClassifierTournament():
+
+    max_workers = 0  # 0 means use all CPUs
+    time_budget = 300.0
+    halving = False
+    subsample = 0.33
+    keep_ratio = 0.5
+    random_state = 27
+
+    def __init__(self, max_workers=0, time_budget=300.0, halving=False, subsample=0.33, keep_ratio=0.5):
+        super().__init__()
+        self.max_workers = max_workers if max_workers > 0 else multiprocessing.cpu_count()
+        self.time_budget = time_budget
+        self.halving = halving
+        self.subsample = subsample
+        self.keep_ratio = keep_ratio
+
+    # runs the tournament. candidates is a dict of name:(unfitted) classifier
+    # Returns a dict of name:(fitted classifier, score) for each candidate that finished (in the order supplied)
+    def run(self, candidates: dict, x_train, y_train, x_test, y_test) -> dict:
+
+        tmp_dir = tempfile.mkdtemp(prefix="tournament_")
+        data_path = os.path.join(tmp_dir, "data.joblib")
+        joblib.dump({'x_train': np.asarray(x_train), 'y_train': np.asarray(y_train),
+                     'x_test': np.asarray(x_test), 'y_test': np.asarray(y_test)}, data_path)
+
+        try:
+            names = list(candidates.keys())
+
+            if self.halving and len(names) > 2:
+                # fit everything on a subsample, and keep the best
+                rng = np.random.default_rng(self.random_state)
+                nrows = max(int(len(y_train) * self.subsample), 2)
+                train_rows = np.sort(rng.choice(len(y_train), size=nrows, replace=False))
+                results = self.run_round(candidates, names, data_path, train_rows)
+
+                nkeep = max(int(math.ceil(len(names) * self.keep_ratio)), 1)
+                ranked = sorted(results.keys(), key=lambda n: results[n][1], reverse=True)
+                names = [name for name in names if name in ranked[:nkeep]]
+                log.info(f"    halving: kept {names}")
+
+            results = self.run_round(candidates, names, data_path)
+
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return {name: results[name] for name in names if name in results}
+
+    # fit the named candidates in parallel, at most max_workers at a time. Each candidate has time_budget seconds
+    # from when it starts, anything still running after that is terminated and dropped
+    def run_round(self, candidates: dict, names: list, data_path, train_rows=None) -> dict:
+
+        results = {}
+
+        # single worker: just run in this process (useful for debugging). The time budget is not enforced
+        if self.max_workers <= 1:
+            for name in names:
+                _, clf, score, _ = fit_candidate(name, candidates[name], data_path, train_rows)
+                if clf is not None:
+                    results[name] = (clf, score)
+            return results
+
+        ctx = multiprocessing.get_context()
+        pending = list(names)
+        running = {}  # name: (process, connection, start time)
+        dropped = []
+        try:
+            while (len(pending) > 0) or (len(running) > 0):
+
+                # start candidates as workers become free
+                while (len(pending) > 0) and (len(running) < self.max_workers):
+                    name = pending.pop(0)
+                    recv_conn, send_conn = ctx.Pipe(duplex=False)
+                    # Note: names are not sent to the workers (they may be types that the workers cannot import)
+                    process = ctx.Process(target=run_candidate,
+                                          args=(str(name), candidates[name], data_path, train_rows, send_conn))
+                    process.start()
+                    send_conn.close()
+                    running[name] = (process, recv_conn, time.perf_counter())
+
+                # wait for a result, or until the next deadline
+                next_deadline = min(start + self.time_budget for _, _, start in running.values())
+                ready = multiprocessing.connection.wait([conn for _, conn, _ in running.values()],
+                                                        timeout=max(next_deadline - time.perf_counter(), 0.0))
+
+                for name, (process, conn, start) in list(running.items()):
+                    if conn in ready:
+                        try:
+                            _, clf, score, _ = conn.recv()
+                        except (EOFError, OSError) as e:
+                            log.warning(f"    {name} failed: worker exited without a result ({e})")
+                            clf = None
+                        if clf is not None:
+                            results[name] = (clf, score)
+                    elif time.perf_counter() - start >= self.time_budget:
+                        process.terminate()
+                        dropped.append(name)
+                    else:
+                        continue
+                    process.join()
+                    conn.close()
+                    del running[name]
+
+        finally:
+            # only reached with workers still running if something went wrong
+            for process, conn, _ in running.values():
+                process.terminate()
+                process.join()
+                conn.close()
+
+        if len(dropped) > 0:
+            print(f"    {len(dropped)} classifier(s) exceeded time budget ({self.time_budget:.0f}s), dropped: {dropped}")
+
+        return results
@@ -35,6 +35,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 import pywt
 import scipy
@@ -144,7 +145,7 @@ class DWT2(IStrategy):
 
         # DWT model of stock price. Have to use rolling window, otherwise it looks into the future
         dataframe['dwt'] = dataframe['close'].rolling(window=self.dwt_window).apply(self.roll_get_dwt)
-        dataframe['smooth'] = dataframe['close'].rolling(window=self.dwt_window).apply(self.roll_smooth)
+        dataframe['smooth'] = rm.rolling_gaussian(dataframe['close'], self.dwt_window, 4)
 
         # smoothed version - useful for trends
         # dataframe['smooth'] = gaussian_filter1d(dataframe['close'], 8)
@@ -251,15 +252,8 @@ class DWT2(IStrategy):
 
 
     def roll_smooth(self, col) -> float:
-        # must return scalar, so just calculate prediction and take last value
-
-        smooth = gaussian_filter1d(col, 4)
-
-        length = len(smooth)
-        if length > 0:
-            return smooth[length - 1]
-        else:
-            return col[len(col) - 1]
+        # must return scalar, i.e. the last value of the smoothed window (see rolling_models.gaussian_last)
+        return rm.gaussian_last(col, 4)
 
     ###################################
 
@@ -0,0 +1,127 @@
+#
+# Fast backtesting of (already trained) darts torch models, used by ClassifierDarts and ClassifierPyTorch
+#
+# darts historical_forecasts(retrain=False, last_points_only=True) produces one forecast per candle, and (in the
+# versions used here) runs each forecast origin through the model separately, at a few hundred forecasts per second.
+# Since the model is not retrained, every forecast origin is independent, so instead this builds the input windows
+# for all origins as a strided (zero-copy) view over the combined target/covariate array, runs them through the
+# underlying torch module in large batches, and maps the requested step of each forecast back to the candle that it
+# predicts.
+#
+# The results are the same as historical_forecasts() with the default (earliest possible) start, stride=1 and
+# last_points_only=True, i.e. for each candle t from (input_chunk_length + forecast_horizon - 1) onwards, the
+# forecast of t made from the input_chunk_length candles ending at t - forecast_horizon
+#
+# Only deterministic models that take past target + past covariates are handled (no likelihood, encoders, future
+# covariates or output shift), and forecast_horizon must be within output_chunk_length (no auto-regression).
+# Use supports() to check, and fall back to historical_forecasts() otherwise
+#
+
+import numpy as np
+
+from lazy_imports import lazy_import
+
+import logging
+
+log = logging.getLogger(__name__)
+
+torch = lazy_import("torch")
+
+
+class DartsBacktester():
+
+    batch_size = 1024
+
+    # number of elements in the input tuple expected by each module, found by probing. key: id(module)
+    input_formats = {}
+
+    def __init__(self, batch_size=1024):
+        super().__init__()
+        self.batch_size = batch_size
+
+    # returns True if the model can be backtested here
+    def supports(self, model, forecast_horizon: int) -> bool:
+
+        module = getattr(model, 'model', None)
+        if (module is None) or (not isinstance(module, torch.nn.Module)):
+            return False
+
+        if getattr(module, 'likelihood', None) is not None:
+            return False  # probabilistic, results are sampled
+
+        if getattr(model, 'add_encoders', None):
+            return False  # encoders add covariates that we don't generate here
+
+        try:
+            if model.uses_future_covariates or model.uses_static_covariates:
+                return False
+        except Exception:
+            pass
+
+        if getattr(model, 'output_chunk_shift', 0) != 0:
+            return False
+
+        return 0 < forecast_horizon <= model.output_chunk_length
+
+    # returns sliding windows over data (rows = time), as a view. windows[i] = data[i:i+window_len]
+    def get_windows(self, data: np.ndarray, window_len: int) -> np.ndarray:
+        windows = np.lib.stride_tricks.sliding_window_view(data, window_len, axis=0)
+        # sliding_window_view puts the window axis last, we need (num windows, window_len, num columns)
+        return np.swapaxes(windows, 1, 2)
+
+    # run the module on one batch of input windows, returns outputs of shape (batch, output_chunk_length, targets)
+    def run_module(self, module, x_past):
+        key = id(module)
+        if key in DartsBacktester.input_formats:
+            x_in = (x_past, None, None, None)[:DartsBacktester.input_formats[key]]
+            return module._produce_predict_output(x_in)
+
+        # the format of the input tuple depends on the darts version:
+        # (past, future, static, future target), (past, future, static) or (past, static)
+        error = None
+        for num_inputs in [4, 3, 2]:
+            try:
+                out = module._produce_predict_output((x_past, None, None, None)[:num_inputs])
+                DartsBacktester.input_formats[key] = num_inputs
+                return out
+            except (ValueError, TypeError, IndexError) as e:
+                error = e
+
+        raise error
+
+    # backtest model against the (scaled) target and covariate arrays, which have one row per candle.
+    # Returns (predictions, start), where predictions[i] is the forecast for candle start+i
+    def backtest(self, model, target: np.ndarray, covariates: np.ndarray, forecast_horizon: int):
+
+        module = model.model
+        input_len = model.input_chunk_length
+        dtype = next(module.parameters()).dtype
+        device = next(module.parameters()).device
+
+        target = np.asarray(target).reshape(np.shape(target)[0], -1)
+        covariates = np.asarray(covariates).reshape(np.shape(covariates)[0], -1)
+        num_targets = target.shape[1]
+
+        # the last window needed is the one ending forecast_horizon candles before the end of the data
+        data = np.concatenate([target, covariates], axis=1)
+        num_windows = data.shape[0] - input_len - forecast_horizon + 1
+        if num_windows <= 0:
+            return np.zeros((0, num_targets)), data.shape[0]
+
+        windows = self.get_windows(data[:data.shape[0] - forecast_horizon], input_len)
+        predictions = np.zeros((num_windows, num_targets), dtype=np.float64)
+
+        was_training = module.training
+        module.eval()
+        try:
+            with torch.inference_mode():
+                for start in range(0, num_windows, self.batch_size):
+                    end = min(start + self.batch_size, num_windows)
+                    x_past = torch.from_numpy(np.ascontiguousarray(windows[start:end])).to(device=device, dtype=dtype)
+                    out = self.run_module(module, x_past)
+                    out = out[:, getattr(module, 'first_prediction_index', 0):, :]
+                    predictions[start:end] = out[:, forecast_horizon - 1, :].reshape(end - start, -1).cpu().numpy()
+        finally:
+            module.train(was_training)
+
+        return predictions, input_len + forecast_horizon - 1
@@ -29,12 +29,25 @@ warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
 import custom_indicators as cta
+import rolling_models as rm
 from finta import TA as fta
 
 from DataframeUtils import DataframeUtils
+from IndicatorCache import IndicatorCache
     
 #################
 
+# decorator used to declare an indicator function in DataframePopulator. inputs are the columns that the function
+# uses, outputs are the columns that it adds to the dataframe
+def indicator(inputs: list, outputs: list):
+    def decorate(func):
+        func.inputs = inputs
+        func.outputs = outputs
+        return func
+    return decorate
+
+#################
+
 class DataframePopulator():
     # global vars that control data generation. Ok to set these from a strategy
     
@@ -47,28 +60,170 @@ class DataframePopulator():
 
     dataframeUtils = None
 
+    # set to a list of columns to only calculate those indicators (plus anything they depend on). None means all
+    required_columns = None
+
+    # columns used by add_hidden_indicators() and add_future_data(), so always calculated
+    core_columns = ['mid', 'dwt', 'dwt_dir', 'dwt_profit_mean', 'dwt_profit_std', 'dwt_loss_mean', 'dwt_loss_std',
+                    'profit_threshold', 'loss_threshold', 'dwt_nseq_up', 'dwt_nseq_dn']
+
+    # columns expected in the input dataframe
+    raw_columns = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+    indicator_registry = None  # list of indicator functions, built on first use
+
+    # cache of computed indicators. Bump cache_version whenever add_indicators() changes, so old entries are not used
+    use_cache = True
+    cache_dir = None  # set to a directory to also cache indicators on disk (Parquet)
+    cache_version = 1
+    indicatorCache = None
+
     def __init__(self):
         super().__init__()
         self.dataframeUtils = DataframeUtils()
+        self.indicatorCache = IndicatorCache(cache_dir=self.cache_dir)
 
     #################
     
-    # populate dataframe with desired technical indicators
-    # NOTE: OK to throw (almost) anything in here, just add it to the parameter list
+    # populate dataframe with desired technical indicators, using the cached results if the same data has already
+    # been processed (by this or any other strategy). The key includes a hash of the input data, so (without a
+    # cache_dir) this only saves work for repeated populates of the same candles in live/dry runs. pair and timeframe
+    # make the cache easier to inspect, and give the in-memory slot of each pair
+    def add_indicators(self, dataframe: DataFrame, pair: str = "", timeframe: str = "") -> DataFrame:
+
+        if not self.use_cache:
+            return self.calc_indicators(dataframe)
+
+        # other modes only populate each pair once, so only the disk tier (if any) can be re-used
+        self.indicatorCache.use_memory = self.runmode in ('live', 'dry_run')
+
+        key = self.indicatorCache.make_key(pair, timeframe, dataframe, self.get_indicator_spec())
+        cached = self.indicatorCache.get(key)
+
+        if cached is not None:
+            for col in cached.columns:
+                dataframe[col] = cached[col].to_numpy(copy=True)
+            dataframe.fillna(0.0, inplace=True)
+            return dataframe
+
+        input_cols = set(dataframe.columns)
+        dataframe = self.calc_indicators(dataframe)
+        new_cols = [col for col in dataframe.columns if col not in input_cols]
+        self.indicatorCache.put(key, dataframe[new_cols].copy())
+
+        return dataframe
+
+    # returns the parameters that affect the results of calc_indicators()
+    def get_indicator_spec(self) -> dict:
+        return {
+            'version': self.cache_version,
+            'win_size': self.win_size,
+            'startup_win': self.startup_win,
+            'rolling_dwt': self.runmode in ('hyperopt', 'backtest', 'plot'),
+            'n_profit_stddevs': self.n_profit_stddevs,
+            'n_loss_stddevs': self.n_loss_stddevs,
+            'dtype': np.dtype(self.dataframeUtils.data_dtype).name,
+            'required_columns': None if self.required_columns is None else sorted(self.required_columns)
+        }
+
+    # calculate technical indicators
+    # NOTE: OK to throw (almost) anything in here, just add an indicator function below (see the indicator decorator)
     # The whole idea is to create a dimension-reduced mapping anyway
     # Warning: do not use indicators that might produce 'inf' results, it messes up the scaling
-    
-    def add_indicators(self, dataframe: DataFrame) -> DataFrame:
+    # If required_columns is set, only those columns (plus anything they depend on) are calculated
+
+    def calc_indicators(self, dataframe: DataFrame) -> DataFrame:
+
+        input_cols = set(dataframe.columns)
+
+        for func in self.get_indicator_plan(self.required_columns):
+            func(self, dataframe)
+
+        # TODO: remove/fix any columns that contain 'inf'
+        self.dataframeUtils.check_inf(dataframe)
+
+        # TODO: fix NaNs
+        dataframe.fillna(0.0, inplace=True)
+
+        # store the (float) indicators in the data dtype. The input (price) columns are left alone
+        dtype = self.dataframeUtils.data_dtype
+        for col in dataframe.columns:
+            if (col not in input_cols) and (dataframe[col].dtype == np.float64) and (dtype != np.float64):
+                dataframe[col] = dataframe[col].astype(dtype)
+
+        return dataframe
+
+    # returns the list of indicator functions needed to produce the requested columns, in dependency order.
+    # If columns is None, all indicators are returned
+    @classmethod
+    def get_indicator_plan(cls, columns=None) -> list:
+
+        registry = cls.get_indicator_registry()
+
+        if columns is None:
+            return registry
 
+        # map each column to the indicator that produces it
+        producers = {}
+        for func in registry:
+            for col in func.outputs:
+                producers[col] = func
+
+        # transitive closure of requested columns (plus the ones used by the other add_*() methods)
+        needed = set()
+        pending = list(cls.core_columns) + list(columns)
+        while pending:
+            col = pending.pop()
+            if col not in producers:
+                if col not in cls.raw_columns:
+                    print(f"    WARN: unknown indicator column: {col}")
+                continue
+            func = producers[col]
+            if func not in needed:
+                needed.add(func)
+                pending.extend(func.inputs)
+
+        # the registry is already in dependency order (checked in get_indicator_registry())
+        return [func for func in registry if func in needed]
+
+    # returns all indicator functions, in the order they are declared
+    @classmethod
+    def get_indicator_registry(cls) -> list:
+
+        if cls.indicator_registry is None:
+            registry = [func for func in vars(cls).values() if hasattr(func, 'outputs')]
+
+            # check that every input is produced by an earlier indicator (or is in the raw data)
+            available = set(cls.raw_columns)
+            for func in registry:
+                missing = [col for col in func.inputs if col not in available]
+                if len(missing) > 0:
+                    raise ValueError(f"indicator {func.__name__} depends on {missing}, which are not produced earlier")
+                available.update(func.outputs)
+
+            cls.indicator_registry = registry
+
+        return cls.indicator_registry
+
+    #################
+    # Indicator definitions. Each function adds its outputs to the dataframe, and may only use its inputs.
+    # Declare them in dependency order (an indicator must come after anything it uses)
+
+    # these averages are used internally, do not remove!
+    @indicator(inputs=['open', 'close'], outputs=['mid'])
+    def ind_mid(self, dataframe: DataFrame):
         dataframe['mid'] = (dataframe['open'] + dataframe['close']) / 2.0
 
-        # these averages are used internally, do not remove!
+    @indicator(inputs=['close'], outputs=['sma', 'ema', 'tema'])
+    def ind_averages(self, dataframe: DataFrame):
         dataframe['sma'] = ta.SMA(dataframe, timeperiod=self.win_size)
         dataframe['ema'] = ta.EMA(dataframe, timeperiod=self.win_size)
         dataframe['tema'] = ta.TEMA(dataframe, timeperiod=self.win_size)
         # dataframe['tema_stddev'] = dataframe['tema'].rolling(self.win_size).std()
-    
-        # RSI
+
+    # RSI
+    @indicator(inputs=['close'], outputs=['rsi', 'srsi_k', 'srsi_d'])
+    def ind_rsi(self, dataframe: DataFrame):
         period = 14
         smoothD = 3
         SmoothK = 3
@@ -77,8 +232,11 @@ class DataframePopulator():
                 dataframe['rsi'].rolling(period).max() - dataframe['rsi'].rolling(period).min())
         dataframe['srsi_k'] = stochrsi.rolling(SmoothK).mean() * 100
         dataframe['srsi_d'] = dataframe['srsi_k'].rolling(smoothD).mean()
-    
-        # Bollinger Bands (must include these)
+
+    # Bollinger Bands (must include these)
+    @indicator(inputs=['close'],
+               outputs=['bb_lowerband', 'bb_middleband', 'bb_upperband', 'bb_width', 'bb_gain', 'bb_loss'])
+    def ind_bollinger(self, dataframe: DataFrame):
         bollinger = qtpylib.bollinger_bands(dataframe['close'], window=20, stds=2)
         dataframe['bb_lowerband'] = bollinger['lower']
         dataframe['bb_middleband'] = bollinger['mid']
@@ -86,175 +244,157 @@ class DataframePopulator():
         dataframe['bb_width'] = ((dataframe['bb_upperband'] - dataframe['bb_lowerband']) / dataframe['bb_middleband'])
         dataframe["bb_gain"] = ((dataframe["bb_upperband"] - dataframe["close"]) / dataframe["close"])
         dataframe["bb_loss"] = ((dataframe["bb_lowerband"] - dataframe["close"]) / dataframe["close"])
-    
-        # Donchian Channels
+
+    # Donchian Channels
+    @indicator(inputs=['high', 'low'], outputs=['dc_upper', 'dc_lower', 'dc_mid'])
+    def ind_donchian(self, dataframe: DataFrame):
         dataframe['dc_upper'] = ta.MAX(dataframe['high'], timeperiod=self.win_size)
         dataframe['dc_lower'] = ta.MIN(dataframe['low'], timeperiod=self.win_size)
         dataframe['dc_mid'] = ta.TEMA(((dataframe['dc_upper'] + dataframe['dc_lower']) / 2), timeperiod=self.win_size)
-    
+
+    @indicator(inputs=['dc_upper', 'dc_lower', 'bb_upperband', 'bb_lowerband'],
+               outputs=['dcbb_dist_upper', 'dcbb_dist_lower'])
+    def ind_dcbb_dist(self, dataframe: DataFrame):
         dataframe["dcbb_dist_upper"] = (dataframe["dc_upper"] - dataframe['bb_upperband'])
         dataframe["dcbb_dist_lower"] = (dataframe["dc_lower"] - dataframe['bb_lowerband'])
-    
-        # Fibonacci Levels (of Donchian Channel)
+
+    # Fibonacci Levels (of Donchian Channel)
+    @indicator(inputs=['dc_upper', 'dc_lower'], outputs=['dc_dist'])
+    def ind_dc_dist(self, dataframe: DataFrame):
         dataframe['dc_dist'] = (dataframe['dc_upper'] - dataframe['dc_lower'])
         # dataframe['dc_hf'] = dataframe['dc_upper'] - dataframe['dc_dist'] * 0.236  # Highest Fib
         # dataframe['dc_chf'] = dataframe['dc_upper'] - dataframe['dc_dist'] * 0.382  # Centre High Fib
         # dataframe['dc_clf'] = dataframe['dc_upper'] - dataframe['dc_dist'] * 0.618  # Centre Low Fib
         # dataframe['dc_lf'] = dataframe['dc_upper'] - dataframe['dc_dist'] * 0.764  # Low Fib
-    
-         # Keltner Channels (these can sometimes produce inf results)
+
+    # Keltner Channels (these can sometimes produce inf results)
+    @indicator(inputs=['high', 'low', 'close'], outputs=['kc_upper', 'kc_lower', 'kc_mid'])
+    def ind_keltner(self, dataframe: DataFrame):
         keltner = qtpylib.keltner_channel(dataframe)
         dataframe["kc_upper"] = keltner["upper"]
         dataframe["kc_lower"] = keltner["lower"]
         dataframe["kc_mid"] = keltner["mid"]
-    
-        # Williams %R
+
+    # Williams %R
+    @indicator(inputs=['high', 'low', 'close'], outputs=['wr'])
+    def ind_wr(self, dataframe: DataFrame):
         dataframe['wr'] = 0.02 * (self.williams_r(dataframe, period=14) + 50.0)
-    
-        # Fisher RSI
+
+    # Fisher RSI
+    @indicator(inputs=['rsi'], outputs=['fisher_rsi'])
+    def ind_fisher_rsi(self, dataframe: DataFrame):
         rsi = 0.1 * (dataframe['rsi'] - 50)
         dataframe['fisher_rsi'] = (np.exp(2 * rsi) - 1) / (np.exp(2 * rsi) + 1)
-    
-        # Combined Fisher RSI and Williams %R
+
+    # Combined Fisher RSI and Williams %R
+    @indicator(inputs=['wr', 'fisher_rsi'], outputs=['fisher_wr'])
+    def ind_fisher_wr(self, dataframe: DataFrame):
         dataframe['fisher_wr'] = (dataframe['wr'] + dataframe['fisher_rsi']) / 2.0
-    
-        # RSI
-        # dataframe['rsi'] = ta.RSI(dataframe, timeperiod=self.win_size)
+
+    # RSI
+    @indicator(inputs=['close'], outputs=['rsi_14'])
+    def ind_rsi_14(self, dataframe: DataFrame):
         dataframe['rsi_14'] = ta.RSI(dataframe, timeperiod=14)
-    
-        # # EMAs
-        # dataframe['ema_12'] = ta.EMA(dataframe, timeperiod=12)
-        # dataframe['ema_20'] = ta.EMA(dataframe, timeperiod=20)
-        # dataframe['ema_25'] = ta.EMA(dataframe, timeperiod=25)
-        # dataframe['ema_35'] = ta.EMA(dataframe, timeperiod=35)
-        # dataframe['ema_50'] = ta.EMA(dataframe, timeperiod=50)
-        # dataframe['ema_100'] = ta.EMA(dataframe, timeperiod=100)
-        # dataframe['ema_200'] = ta.EMA(dataframe, timeperiod=200)
-    
-        # SMA
+
+    # SMA
+    @indicator(inputs=['close'], outputs=['sma_200'])
+    def ind_sma_200(self, dataframe: DataFrame):
         dataframe['sma_200'] = ta.SMA(dataframe, timeperiod=200)
         # dataframe['sma_200_dec_20'] = np.where(dataframe['sma_200'] < dataframe['sma_200'].shift(20), 1.0, -1.0)
         # dataframe['sma_200_dec_24'] = np.where(dataframe['sma_200'] < dataframe['sma_200'].shift(24), 1.0, -1.0)
-    
-        # # CMF
-        # dataframe['cmf'] = chaikin_money_flow(dataframe, 20)
-    
-        # # CTI
-        # dataframe['cti'] = pta.cti(dataframe["close"], length=20)
-    
-        # # CRSI (3, 2, 100)
-        # crsi_closechange = dataframe['close'] / dataframe['close'].shift(1)
-        # crsi_updown = np.where(crsi_closechange.gt(1), 1.0, np.where(crsi_closechange.lt(1), -1.0, -1.0))
-        # dataframe['crsi'] = (ta.RSI(dataframe['close'], timeperiod=3) + ta.RSI(crsi_updown, timeperiod=2) + ta.ROC(
-        #     dataframe['close'],
-        #     100)) / 3
-        #
-        # # Williams %R
-        # dataframe['r_14'] = self.williams_r(dataframe, period=14)
-        # dataframe['r_480'] = self.williams_r(dataframe, period=480)
-    
-        # # ROC
-        # dataframe['roc_9'] = ta.ROC(dataframe, timeperiod=9)
-    
-        # # T3 Average
-        # dataframe['t3_avg'] = t3_average(dataframe)
-    
-        # # S/R
-        # res_series = dataframe['high'].rolling(window=5, center=True).apply(lambda row: is_resistance(row),
-        #                                                                     raw=True).shift(2)
-        # sup_series = dataframe['low'].rolling(window=5, center=True).apply(lambda row: is_support(row),
-        #                                                                    raw=True).shift(2)
-        # dataframe['res_level'] = Series(
-        #     np.where(res_series,
-        #              np.where(dataframe['close'] > dataframe['open'], dataframe['close'], dataframe['open']),
-        #              float('NaN'))).ffill()
-        # dataframe['res_hlevel'] = Series(np.where(res_series, dataframe['high'], float('NaN'))).ffill()
-        # dataframe['sup_level'] = Series(
-        #     np.where(sup_series,
-        #              np.where(dataframe['close'] < dataframe['open'], dataframe['close'], dataframe['open']),
-        #              float('NaN'))).ffill()
-    
-        # # Pump protections
-        # dataframe['hl_pct_change_48'] = self.range_percent_change(dataframe, 'HL', 48)
-        # dataframe['hl_pct_change_36'] = self.range_percent_change(dataframe, 'HL', 36)
-        # dataframe['hl_pct_change_24'] = self.range_percent_change(dataframe, 'HL', 24)
-        # dataframe['hl_pct_change_12'] = self.range_percent_change(dataframe, 'HL', 12)
-        # dataframe['hl_pct_change_6'] = self.range_percent_change(dataframe, 'HL', 6)
-    
-        # ADX
+
+    # Other indicators that have been tried (add an indicator function to use them):
+    #   EMAs (ema_12 ... ema_200), CMF (chaikin_money_flow), CTI (pta.cti), CRSI (3, 2, 100), Williams %R (r_14, r_480),
+    #   ROC (roc_9), T3 Average (t3_average), S/R levels (is_support/is_resistance), pump protections
+    #   (range_percent_change), SAR, MOM, priming indicators (color, primed, in_the_mood, moist, throbbing)
+
+    # ADX
+    @indicator(inputs=['high', 'low', 'close'], outputs=['adx'])
+    def ind_adx(self, dataframe: DataFrame):
         dataframe['adx'] = ta.ADX(dataframe)
-    
-        # Plus Directional Indicator / Movement
+
+    # Plus/Minus Directional Indicator / Movement
+    @indicator(inputs=['high', 'low', 'close'],
+               outputs=['dm_plus', 'di_plus', 'dm_minus', 'di_minus', 'dm_delta', 'di_delta'])
+    def ind_directional(self, dataframe: DataFrame):
         dataframe['dm_plus'] = ta.PLUS_DM(dataframe)
         dataframe['di_plus'] = ta.PLUS_DI(dataframe)
-    
-        # Minus Directional Indicator / Movement
         dataframe['dm_minus'] = ta.MINUS_DM(dataframe)
         dataframe['di_minus'] = ta.MINUS_DI(dataframe)
         dataframe['dm_delta'] = dataframe['dm_plus'] - dataframe['dm_minus']
         dataframe['di_delta'] = dataframe['di_plus'] - dataframe['di_minus']
-    
-        # MACD
+
+    # MACD
+    @indicator(inputs=['close'], outputs=['macd', 'macdsignal', 'macdhist'])
+    def ind_macd(self, dataframe: DataFrame):
         macd = ta.MACD(dataframe)
         dataframe['macd'] = macd['macd']
         dataframe['macdsignal'] = macd['macdsignal']
         dataframe['macdhist'] = macd['macdhist']
-    
-        # Stoch fast
+
+    # Stoch fast
+    @indicator(inputs=['high', 'low', 'close'], outputs=['fastd', 'fastk', 'fast_diff'])
+    def ind_stoch_fast(self, dataframe: DataFrame):
         stoch_fast = ta.STOCHF(dataframe)
         dataframe['fastd'] = stoch_fast['fastd']
         dataframe['fastk'] = stoch_fast['fastk']
         dataframe['fast_diff'] = dataframe['fastd'] - dataframe['fastk']
-    
-        # # SAR Parabol
-        # dataframe['sar'] = ta.SAR(dataframe)
-    
-        # dataframe['mom'] = ta.MOM(dataframe, timeperiod=14)
-        #
-        # # priming indicators
-        # dataframe['color'] = np.where((dataframe['close'] > dataframe['open']), 1.0, -1.0)
-        # dataframe['rsi_7'] = ta.RSI(dataframe, timeperiod=7)
-        # dataframe['roc_6'] = ta.ROC(dataframe, timeperiod=6)
-        # dataframe['primed'] = np.where(dataframe['color'].rolling(3).sum() == 3.0, 1.0, -1.0)
-        # dataframe['in_the_mood'] = np.where(dataframe['rsi_7'] > dataframe['rsi_7'].rolling(12).mean(), 1.0, -1.0)
-        # dataframe['moist'] = np.where(qtpylib.crossed_above(dataframe['macd'], dataframe['macdsignal']), 1.0, -1.0)
-        # dataframe['throbbing'] = np.where(dataframe['roc_6'] > dataframe['roc_6'].rolling(12).mean(), 1.0, -1.0)
-    
-        # MFI
+
+    # MFI
+    @indicator(inputs=['high', 'low', 'close', 'volume'], outputs=['mfi'])
+    def ind_mfi(self, dataframe: DataFrame):
         dataframe['mfi'] = ta.MFI(dataframe)
-    
-        # Volume Flow Indicator (MFI) for volume based on the direction of price movement
+
+    # Volume Flow Indicator (MFI) for volume based on the direction of price movement
+    @indicator(inputs=['high', 'low', 'close', 'volume'], outputs=['vfi'])
+    def ind_vfi(self, dataframe: DataFrame):
         dataframe['vfi'] = fta.VFI(dataframe, period=14)
-    
-        # ATR
+
+    # ATR
+    @indicator(inputs=['high', 'low', 'close'], outputs=['atr'])
+    def ind_atr(self, dataframe: DataFrame):
         dataframe['atr'] = ta.ATR(dataframe, timeperiod=self.win_size)
-    
-        # Hilbert Transform Indicator - SineWave
+
+    # Hilbert Transform Indicator - SineWave
+    @indicator(inputs=['close'], outputs=['htsine', 'htleadsine'])
+    def ind_hilbert(self, dataframe: DataFrame):
         hilbert = ta.HT_SINE(dataframe)
         dataframe['htsine'] = hilbert['sine']
         dataframe['htleadsine'] = hilbert['leadsine']
-    
-        # Oscillators
-    
-        # EWO
+
+    # Oscillators
+
+    # EWO
+    @indicator(inputs=['close'], outputs=['ewo'])
+    def ind_ewo(self, dataframe: DataFrame):
         dataframe['ewo'] = self.ewo(dataframe, 50, 200)
-    
-        # Ultimate Oscillator
+
+    # Ultimate Oscillator
+    @indicator(inputs=['high', 'low', 'close'], outputs=['uo'])
+    def ind_uo(self, dataframe: DataFrame):
         dataframe['uo'] = ta.ULTOSC(dataframe)
-    
-        # Aroon, Aroon Oscillator
+
+    # Aroon, Aroon Oscillator
+    @indicator(inputs=['high', 'low'], outputs=['aroonup', 'aroondown', 'aroonosc'])
+    def ind_aroon(self, dataframe: DataFrame):
         aroon = ta.AROON(dataframe)
         dataframe['aroonup'] = aroon['aroonup']
         dataframe['aroondown'] = aroon['aroondown']
         dataframe['aroonosc'] = ta.AROONOSC(dataframe)
-    
-        # Awesome Oscillator
+
+    # Awesome Oscillator
+    @indicator(inputs=['high', 'low'], outputs=['ao'])
+    def ind_ao(self, dataframe: DataFrame):
         dataframe['ao'] = qtpylib.awesome_oscillator(dataframe)
-    
-        # Commodity Channel Index: values [Oversold:-100, Overbought:100]
+
+    # Commodity Channel Index: values [Oversold:-100, Overbought:100]
+    @indicator(inputs=['high', 'low', 'close'], outputs=['cci'])
+    def ind_cci(self, dataframe: DataFrame):
         dataframe['cci'] = ta.CCI(dataframe)
-    
-        # DWT model
+
+    # DWT model
+    @indicator(inputs=['mid'], outputs=['dwt'])
+    def ind_dwt(self, dataframe: DataFrame):
         # if in backtest or hyperopt, then we have to do rolling calculations
         if self.runmode in ('hyperopt', 'backtest', 'plot'):
             # dataframe['dwt'] = dataframe['close'].rolling(window=self.startup_win).apply(self.roll_get_dwt)
@@ -262,44 +402,42 @@ class DataframePopulator():
         else:
             # dataframe['dwt'] = self.get_dwt(dataframe['close'])
             dataframe['dwt'] = self.get_dwt(dataframe['mid'])
-    
+
+    @indicator(inputs=['dwt'],
+               outputs=['dwt_gain', 'dwt_profit', 'dwt_loss', 'dwt_profit_mean', 'dwt_profit_std', 'dwt_loss_mean',
+                        'dwt_loss_std', 'profit_threshold', 'loss_threshold'])
+    def ind_dwt_gain(self, dataframe: DataFrame):
         dataframe['dwt_gain'] = 100.0 * (dataframe['dwt'] - dataframe['dwt'].shift()) / dataframe['dwt'].shift()
         dataframe['dwt_profit'] = dataframe['dwt_gain'].clip(lower=0.0)
         dataframe['dwt_loss'] = dataframe['dwt_gain'].clip(upper=0.0)
-    
+
         dataframe['dwt_profit_mean'] = dataframe['dwt_profit'].rolling(self.win_size).mean()
         dataframe['dwt_profit_std'] = dataframe['dwt_profit'].rolling(self.win_size).std()
         dataframe['dwt_loss_mean'] = dataframe['dwt_loss'].rolling(self.win_size).mean()
         dataframe['dwt_loss_std'] = dataframe['dwt_loss'].rolling(self.win_size).std()
-    
+
         dataframe['profit_threshold'] = dataframe['dwt_profit_mean'] + self.n_profit_stddevs * abs(dataframe['dwt_profit_std'])
-    
+
         dataframe['loss_threshold'] = dataframe['dwt_loss_mean'] - self.n_loss_stddevs * abs(dataframe['dwt_loss_std'])
-    
-    
-        # Sequences of consecutive up/downs
+
+    # Sequences of consecutive up/downs
+    @indicator(inputs=['dwt'], outputs=['dwt_dir', 'dwt_dir_up', 'dwt_nseq_up', 'dwt_dir_dn', 'dwt_nseq_dn'])
+    def ind_dwt_sequences(self, dataframe: DataFrame):
         dataframe['dwt_dir'] = 0.0
         dataframe['dwt_dir'] = np.where(dataframe['dwt'].diff() > 0, 1.0, -1.0)
-    
+
         dataframe['dwt_dir_up'] = dataframe['dwt_dir'].clip(lower=0.0)
         dataframe['dwt_nseq_up'] = dataframe['dwt_dir_up'] * (dataframe['dwt_dir_up'].groupby(
             (dataframe['dwt_dir_up'] != dataframe['dwt_dir_up'].shift()).cumsum()).cumcount() + 1)
         dataframe['dwt_nseq_up'] = dataframe['dwt_nseq_up'].clip(lower=0.0, upper=20.0)  # removes startup artifacts
-    
+
         dataframe['dwt_dir_dn'] = abs(dataframe['dwt_dir'].clip(upper=0.0))
         dataframe['dwt_nseq_dn'] = dataframe['dwt_dir_dn'] * (dataframe['dwt_dir_dn'].groupby(
             (dataframe['dwt_dir_dn'] != dataframe['dwt_dir_dn'].shift()).cumsum()).cumcount() + 1)
         dataframe['dwt_nseq_dn'] = dataframe['dwt_nseq_dn'].clip(lower=0.0, upper=20.0)
-    
-        # TODO: remove/fix any columns that contain 'inf'
-        self.dataframeUtils.check_inf(dataframe)
 
-        # TODO: fix NaNs
-        dataframe.fillna(0.0, inplace=True)
-    
-        return dataframe
-    
-    
+    #################
+
     # 'hidden' indicators. These are ostensibly backward looking, but may inadvertently use means, smoothing etc.
     def add_hidden_indicators(self, dataframe: DataFrame) -> DataFrame:
     
@@ -341,13 +479,14 @@ class DataframePopulator():
     
     
     # calculate future gains. Used for setting targets. Yes, we lookahead in the data!
-    def add_future_data(self, dataframe: DataFrame, lookahead: int) -> DataFrame:
+    # Set copy=False if dataframe is already a copy (saves copying the whole frame again)
+    def add_future_data(self, dataframe: DataFrame, lookahead: int, copy=True) -> DataFrame:
     
         lookahead_win = max(lookahead, 14)
     
         # make a copy of the dataframe so that we do not put any forward looking data into the main dataframe
         # Also, use a different name to avoid cut & paste errors
-        future_df = dataframe.copy()
+        future_df = dataframe.copy() if copy else dataframe
     
         # we can either use the actual closing price, or the DWT model (smoother)
     
@@ -507,17 +646,8 @@ class DataframePopulator():
     
     # returns (rolling) smoothed version of input column
     def roll_smooth(self, col) -> float:
-        # must return scalar, so just calculate prediction and take last value
-    
-        smooth = gaussian_filter1d(col, 4)
-        # smooth = gaussian_filter1d(col, 2)
-    
-        length = len(smooth)
-        if length > 0:
-            return smooth[length - 1]
-        else:
-            print("model:", smooth)
-            return 0.0
+        # must return scalar, i.e. the last value of the smoothed window (see rolling_models.gaussian_last)
+        return rm.gaussian_last(col, 4)
     
     def get_dwt(self, col):
     
@@ -35,6 +35,23 @@ class ScalerType(Enum):
     MinMax = 3
 
 
+# inverse/forward scaling of a single column, extracted from a scaler that was fitted to a whole dataframe.
+# All of the supported scalers are affine per column (x_scaled = (x - offset) / scale), so this is exact
+class ColumnScaler():
+    offset = 0.0
+    scale = 1.0
+
+    def __init__(self, offset=0.0, scale=1.0):
+        self.offset = offset
+        self.scale = scale
+
+    def transform(self, data):
+        return (np.asarray(data, dtype=float) - self.offset) / self.scale
+
+    def inverse_transform(self, data):
+        return np.asarray(data, dtype=float) * self.scale + self.offset
+
+
 class DataframeUtils():
 
     #################################
@@ -44,12 +61,25 @@ class DataframeUtils():
     scaler_type:ScalerType = ScalerType.NoScaling
     scaler_fitted = False
 
+    # incremental mode: keep running statistics for each key (e.g. pair), and only absorb rows that are newer than
+    # the last fit, instead of refitting to the whole dataframe. Only works for scalers that support partial_fit()
+    # (Standard and MinMax), others are just refitted
+    incremental_scaling = False
+    scaler_key = ""
+    running_scalers = None  # key: {'type', 'columns', 'scaler', 'last_date'}
+
+    # dtype used for normalised data and tensors. The ML frameworks all work in float32 anyway, so using float64 just
+    # means that there are extra (double-sized) copies of the data. Set to np.float64 for full precision
+    data_dtype = np.float32
 
-    # sets the type of scaler desired, and initialises associated vars
-    def set_scaler_type(self, type:ScalerType):
+
+    # sets the type of scaler desired, and initialises associated vars. key identifies the running statistics to use
+    # in incremental mode
+    def set_scaler_type(self, type:ScalerType, key=""):
         self.scaler_type = type
         self.scaler_fitted = False
         self.scaler = None
+        self.scaler_key = key
         self.scaler = self.get_scaler()
         # print(f"    Scaler set to: {type}")
 
@@ -77,7 +107,17 @@ class DataframeUtils():
             print(f"    Unknown scaler type: {self.scaler_type}")
         return scaler
 
+    # True if data scaled with this type of scaler stays consistent in incremental mode, i.e. the scaler can be
+    # updated with partial_fit() (or there is no scaling)
+    @staticmethod
+    def supports_incremental_scaling(type: ScalerType) -> bool:
+        return type in (ScalerType.NoScaling, ScalerType.Standard, ScalerType.MinMax)
+
     def fit_scaler(self, dataframe: DataFrame):
+        if self.incremental_scaling and hasattr(self.scaler, 'partial_fit'):
+            self.update_running_scaler(dataframe)
+            return
+
         if self.scaler is not None:
             if self.scaler_fitted:
                 print("    Warning: re-fitting scaler")
@@ -87,6 +127,30 @@ class DataframeUtils():
             print("    WARN: fit_scaler() called, but scaler has not been assigned")
         return
 
+    # update the running scaler for the current key with any rows newer than the last update, and make it current.
+    # Note: the date column must already have been converted to a number (as in norm_dataframe())
+    def update_running_scaler(self, dataframe: DataFrame):
+        if self.running_scalers is None:
+            self.running_scalers = {}
+
+        cols = list(dataframe.columns)
+        entry = self.running_scalers.get(self.scaler_key, None)
+        if (entry is None) or (entry['type'] != self.scaler_type) or (entry['columns'] != cols):
+            entry = {'type': self.scaler_type, 'columns': cols, 'scaler': self.make_scaler(), 'last_date': None}
+            self.running_scalers[self.scaler_key] = entry
+
+        new_rows = dataframe
+        if (entry['last_date'] is not None) and ('date' in dataframe.columns):
+            new_rows = dataframe[dataframe['date'] > entry['last_date']]
+
+        if new_rows.shape[0] > 0:
+            entry['scaler'].partial_fit(new_rows)
+            if 'date' in dataframe.columns:
+                entry['last_date'] = dataframe['date'].max()
+
+        self.scaler = entry['scaler']
+        self.scaler_fitted = True
+
     ###################################
     # debug utilities
 
@@ -160,7 +224,7 @@ class DataframeUtils():
         if not self.scaler_fitted:
             self.fit_scaler(df)
 
-        df = pd.DataFrame(self.scaler.transform(df), columns=cols)
+        df = pd.DataFrame(self.to_dtype(self.scaler.transform(df)), columns=cols)
 
         return df
 
@@ -182,6 +246,21 @@ class DataframeUtils():
 
         return df
 
+    # get a scaler for just one column of the (normalised) dataframe. Much cheaper than adding the values to a copy
+    # of the dataframe and inverse scaling the whole thing. Note this relies on the scaler still being valid
+    def get_column_scaler(self, column: str) -> ColumnScaler:
+
+        if (self.scaler is None) or (not self.scaler_fitted):
+            return ColumnScaler()
+
+        # inverse transform 0 and 1 for every column, which gives the offset and scale of each column
+        cols = self.scaler.feature_names_in_
+        probe = pd.DataFrame(np.array([np.zeros(len(cols)), np.ones(len(cols))]), columns=cols)
+        restored = self.scaler.inverse_transform(probe)
+        index = list(cols).index(column)
+
+        return ColumnScaler(offset=restored[0, index], scale=restored[1, index] - restored[0, index])
+
     ###################################
 
 
@@ -467,7 +546,16 @@ class DataframeUtils():
         return train_tensor, test_tensor, train_buys_tensor, test_buys_tensor, train_sells_tensor, test_sells_tensor
 
     # convert dataframe to 3D tensor (for use with keras models)
-    def df_to_tensor(self, df, seq_len):
+    # output format = [nrows, seq_len, nfeatures], where tensor[row][i] = data[row-i] (i.e. reversed in time),
+    # and the entries before the start of the data are zero
+    # By default, this returns a normal (contiguous, writeable) array in the data dtype (use dtype to override).
+    # Set materialize=False to get a read-only (strided) view of a zero-padded copy of the data instead, so memory use
+    # is O(nrows * nfeatures) rather than O(nrows * seq_len * nfeatures). The view has a negative stride, which some
+    # frameworks (e.g. torch.from_numpy()) reject, so only use it where the tensor is just sliced/copied
+    def df_to_tensor(self, df, seq_len, dtype=None, materialize=True):
+
+        if dtype is None:
+            dtype = self.data_dtype
 
         if self.is_dataframe(df):
             data = np.array(df)
@@ -476,38 +564,25 @@ class DataframeUtils():
 
         nrows = np.shape(data)[0]
         nfeatures = np.shape(data)[1]
-        tensor_arr = np.zeros((nrows, seq_len, nfeatures), dtype=float)
-        zero_row = np.zeros((nfeatures), dtype=float)
-        # tensor_arr = []
 
-        # print("data:{} tensor:{}".format(np.shape(data), np.shape(tensor_arr)))
-        # print("nrows:{} nfeatures:{}".format(nrows, nfeatures))
+        # pad the front with zeros, so that every row has a full window
+        padded = np.zeros((nrows + seq_len - 1, nfeatures), dtype=dtype)
+        padded[seq_len - 1:] = data
 
-        reverse = True
+        # sliding window over rows gives [nrows, nfeatures, seq_len]. Swap the last two axes and reverse the sequence
+        tensor_arr = np.lib.stride_tricks.sliding_window_view(padded, seq_len, axis=0)
+        tensor_arr = np.swapaxes(tensor_arr, 1, 2)[:, ::-1, :]
+
+        if materialize:
+            tensor_arr = np.ascontiguousarray(tensor_arr)
 
-        # fill the first part (0..seqlen rows), which are only sparsely populated
-        for row in range(seq_len):
-            for seq in range(seq_len):
-                if seq >= (seq_len - row - 1):
-                    src_row = (row + seq) - seq_len + 1
-                    tensor_arr[row][seq] = data[src_row]
-                else:
-                    tensor_arr[row][seq] = zero_row
-            if reverse:
-                tensor_arr[row] = np.flipud(tensor_arr[row])
-
-        # fill the rest
-        # print("Data:{}, len:{}".format(np.shape(data), seq_len))
-        for row in range(seq_len, nrows):
-            tensor_arr[row] = data[(row - seq_len) + 1:row + 1]
-            if reverse:
-                tensor_arr[row] = np.flipud(tensor_arr[row])
-
-        # print("data: ", data)
-        # print("tensor: ", tensor_arr)
         # print("data:{} tensor:{}".format(np.shape(data), np.shape(tensor_arr)))
         return tensor_arr
 
+    # convert data (array, tensor, dataframe) to the data dtype. Does not copy if it is already the right type
+    def to_dtype(self, data):
+        return np.asarray(data, dtype=self.data_dtype)
+
     # utility to check whether an object is a Dataframe
     def is_dataframe(self, data) -> bool:
         ctype = str(type(data)).lower()
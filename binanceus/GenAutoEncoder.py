@@ -40,6 +40,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 from finta import TA as fta
 
 from sklearn.model_selection import RandomizedSearchCV, train_test_split
@@ -426,8 +427,8 @@ class GenAutoEncoder(IStrategy):
         # if in backtest or hyperopt, then we have to do rolling calculations
         if self.dp.runmode.value in ('hyperopt', 'backtest'):
             dataframe['dwt'] = dataframe['close'].rolling(window=self.dwt_window).apply(self.roll_get_dwt)
-            dataframe['smooth'] = dataframe['close'].rolling(window=self.dwt_window).apply(self.roll_smooth)
-            dataframe['dwt_smooth'] = dataframe['dwt'].rolling(window=self.dwt_window).apply(self.roll_smooth)
+            dataframe['smooth'] = rm.rolling_gaussian(dataframe['close'], self.dwt_window, 2)
+            dataframe['dwt_smooth'] = rm.rolling_gaussian(dataframe['dwt'], self.dwt_window, 2)
         else:
             dataframe['dwt'] = self.get_dwt(dataframe['close'])
             dataframe['smooth'] = gaussian_filter1d(dataframe['close'], 2)
@@ -506,17 +507,8 @@ class GenAutoEncoder(IStrategy):
 
     # returns (rolling) smoothed version of input column
     def roll_smooth(self, col) -> float:
-        # must return scalar, so just calculate prediction and take last value
-
-        # smooth = gaussian_filter1d(col, 4)
-        smooth = gaussian_filter1d(col, 2)
-
-        length = len(smooth)
-        if length > 0:
-            return smooth[length - 1]
-        else:
-            print("model:", smooth)
-            return 0.0
+        # must return scalar, i.e. the last value of the smoothed window (see rolling_models.gaussian_last)
+        return rm.gaussian_last(col, 2)
 
     def get_dwt(self, col):
 
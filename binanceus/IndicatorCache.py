@@ -0,0 +1,149 @@
+#
+# Cache of computed indicator columns, used by DataframePopulator
+#
+# Several strategies (PCA, NNBC, NNTC, Anomaly, NNPredict and all of their subclasses) use exactly the same set of
+# indicators, so when they are run on the same data (backtests, hyperopt restarts, multiple strategies etc.) the same
+# work gets repeated. The results are cached here, keyed by the pair, timeframe, the content of the input data and
+# the indicator 'spec' (any parameter that affects the results).
+#
+# There are two tiers:
+#   - an in-memory cache, shared by everything in the same process (class-level storage). This only holds the latest
+#     entry for each pair/timeframe, and is only meant for live/dry runs (set use_memory), where the same candles are
+#     processed more than once, e.g. by the batch predictions in bot_loop_start() followed by populate_indicators().
+#     The key changes with every new candle, so an older entry would never be hit again
+#   - an (optional) on-disk cache, in Parquet or Feather format. Set cache_dir to enable. This requires pyarrow,
+#     if that is not installed then the disk tier is just disabled. This is what gives re-use across backtests,
+#     hyperopt restarts etc., where each pair is only populated once per run (so keeping it in memory would just
+#     double the memory used by the indicators)
+#
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class IndicatorCache():
+
+    # in-memory tier, shared across all instances. pair/timeframe: (key, DataFrame), i.e. one entry per pair
+    memory = {}
+    use_memory = False
+
+    cache_dir = None  # set to a directory path to enable the disk tier
+    file_format = 'parquet'  # 'parquet' or 'feather'
+
+    # columns used to identify the input data
+    key_columns = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+    hits = 0
+    misses = 0
+
+    def __init__(self, cache_dir=None, file_format='parquet', use_memory=False):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.file_format = file_format
+        self.use_memory = use_memory
+
+    # builds the cache key. The data hash covers the whole input, so the key changes if any candle changes (not just
+    # the last one), or if the dataframe grows/shrinks
+    def make_key(self, pair: str, timeframe: str, dataframe: DataFrame, spec: dict) -> str:
+
+        last_date = ""
+        if 'date' in dataframe.columns and dataframe.shape[0] > 0:
+            last_date = pd.Timestamp(dataframe['date'].iloc[-1]).strftime('%Y%m%d%H%M%S')
+
+        # hash_pandas_object() gives a (vectorised) hash per row, which then gets reduced to a single digest
+        cols = [col for col in self.key_columns if col in dataframe.columns]
+        row_hashes = pd.util.hash_pandas_object(dataframe[cols], index=False).to_numpy()
+        hasher = hashlib.sha1(np.ascontiguousarray(row_hashes).view(np.uint8))
+        hasher.update(repr(sorted(spec.items())).encode())
+
+        pair_name = pair.replace("/", "_").replace(":", "_")
+        return f"{pair_name}_{timeframe}_{last_date}_{hasher.hexdigest()[:16]}"
+
+    # the in-memory slot for a key, i.e. the pair and timeframe (the date and hash are the last 2 parts of the key)
+    @staticmethod
+    def get_slot(key: str) -> str:
+        return key.rsplit("_", 2)[0]
+
+    # returns the cached indicator columns for key, or None if not found
+    def get(self, key: str):
+
+        if self.use_memory:
+            entry = IndicatorCache.memory.get(self.get_slot(key))
+            if (entry is not None) and (entry[0] == key):
+                IndicatorCache.hits += 1
+                return entry[1]
+
+        df = self.load(key)
+        if df is not None:
+            self.add_to_memory(key, df)
+            IndicatorCache.hits += 1
+            return df
+
+        IndicatorCache.misses += 1
+        return None
+
+    # add indicator columns to the cache
+    def put(self, key: str, dataframe: DataFrame):
+        self.add_to_memory(key, dataframe)
+        self.save(key, dataframe)
+
+    # replaces the pair's previous entry (if any)
+    def add_to_memory(self, key: str, dataframe: DataFrame):
+        if self.use_memory:
+            IndicatorCache.memory[self.get_slot(key)] = (key, dataframe)
+
+    def clear(self):
+        IndicatorCache.memory.clear()
+
+    ###################################
+    # disk tier
+
+    def get_path(self, key: str):
+        if self.cache_dir is None:
+            return None
+        ext = ".feather" if self.file_format == 'feather' else ".parquet"
+        return Path(self.cache_dir) / (key + ext)
+
+    def load(self, key: str):
+        path = self.get_path(key)
+        if (path is None) or (not path.exists()):
+            return None
+
+        try:
+            if self.file_format == 'feather':
+                return pd.read_feather(path)
+            else:
+                return pd.read_parquet(path)
+        except Exception as e:
+            log.warning(f"IndicatorCache: could not read {path} ({e})")
+            return None
+
+    def save(self, key: str, dataframe: DataFrame):
+        path = self.get_path(key)
+        if path is None:
+            return
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            # write to a temp file then rename, so that parallel processes (hyperopt) never see a partial file
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            if self.file_format == 'feather':
+                dataframe.reset_index(drop=True).to_feather(tmp_path)
+            else:
+                dataframe.to_parquet(tmp_path, index=False)
+            tmp_path.replace(path)
+        except ImportError as e:
+            # pyarrow (or equivalent) not installed. Just disable the disk tier
+            log.warning(f"IndicatorCache: disk cache disabled ({e})")
+            self.cache_dir = None
+        except Exception as e:
+            log.warning(f"IndicatorCache: could not write {path} ({e})")
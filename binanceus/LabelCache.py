@@ -0,0 +1,215 @@
+#
+# Cache of training labels (targets), used by create_training_data() in PCA, NNBC, NNTC and Anomaly
+#
+# Generating the labels means copying the dataframe, adding the 'hidden' and future indicators and running a DWT over
+# the whole close series, and that was being done on every call to populate_indicators(), even when the data had not
+# changed or the labels were not going to be used (models not due for retraining).
+#
+# Only the results are kept: the label columns (train_buy, train_sell) and the debug columns that were added for
+# plotting, as numpy arrays. Entries are keyed by the pair, a hash of the input candles and a 'spec' (anything else
+# that affects the labels: strategy class, lookahead, indicator settings etc.)
+#
+# Incremental updates: the full DWT models the entire close series, so every new candle changes (slightly) the
+# labels of all of the earlier candles, and there is no exact way to update them. If the labels are not going to be
+# used for training (i.e. the caller is just keeping them up to date), extend() will re-use the previous labels for
+# the candles that it has already seen, as long as those candles have not changed. New candles are all inside the
+# lookahead window, so they have no future data yet and just get a label of 0 (debug columns get NaN). The caller
+# should do a full calculation whenever the labels are needed for training.
+#
+# get_training_data() is the shared implementation of create_training_data() for those strategies: it looks up (or
+# calculates) the labels, using the strategy's own get_train_buy_signals()/get_train_sell_signals() and debug
+# functions.
+#
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class LabelCache():
+
+    # exact matches, shared across all instances (LRU). Entries are small (a few columns), so this can be fairly big
+    lru = OrderedDict()
+    max_entries = 64
+
+    # most recent entry for each pair/spec, used by extend()
+    latest = {}
+
+    # columns used to identify the input data
+    key_columns = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+    hits = 0
+    misses = 0
+    extends = 0
+
+    def __init__(self, max_entries=64):
+        super().__init__()
+        self.max_entries = max_entries
+
+    # builds the cache key. The data hash covers every candle, so the key changes if any of them changes
+    def make_key(self, pair: str, dataframe: DataFrame, spec: dict) -> str:
+        hasher = hashlib.sha1(np.ascontiguousarray(self.get_row_hashes(dataframe)).view(np.uint8))
+        hasher.update(self.get_spec_id(pair, spec).encode())
+        return hasher.hexdigest()
+
+    def get_spec_id(self, pair: str, spec: dict) -> str:
+        return pair + repr(sorted(spec.items()))
+
+    def get_row_hashes(self, dataframe: DataFrame):
+        cols = [col for col in self.key_columns if col in dataframe.columns]
+        return pd.util.hash_pandas_object(dataframe[cols], index=False).to_numpy()
+
+    def get_dates(self, dataframe: DataFrame):
+        if 'date' not in dataframe.columns:
+            return None
+        return pd.to_datetime(dataframe['date'], utc=True).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+    # returns the cached entry ({'labels': {col: array}, 'debug': {col: array}}) for key, or None if not found
+    def get(self, key: str):
+        if key in LabelCache.lru:
+            LabelCache.lru.move_to_end(key)
+            LabelCache.hits += 1
+            return LabelCache.lru[key]
+
+        LabelCache.misses += 1
+        return None
+
+    # add (fully calculated) labels to the cache
+    def put(self, key: str, pair: str, dataframe: DataFrame, spec: dict, entry: dict):
+        LabelCache.lru[key] = entry
+        LabelCache.lru.move_to_end(key)
+        while len(LabelCache.lru) > self.max_entries:
+            LabelCache.lru.popitem(last=False)
+
+        self.set_latest(pair, dataframe, spec, entry)
+
+    def set_latest(self, pair: str, dataframe: DataFrame, spec: dict, entry: dict):
+        dates = self.get_dates(dataframe)
+        if dates is None:
+            return
+        LabelCache.latest[self.get_spec_id(pair, spec)] = {
+            'dates': dates,
+            'row_hashes': self.get_row_hashes(dataframe),
+            'entry': entry
+        }
+
+    # returns the latest entry for the pair, extended to cover dataframe, or None if that is not possible (no entry,
+    # candles were changed or inserted, gaps etc.). Only use this if the labels are not needed for training
+    def extend(self, pair: str, dataframe: DataFrame, spec: dict):
+
+        spec_id = self.get_spec_id(pair, spec)
+        if spec_id not in LabelCache.latest:
+            return None
+
+        dates = self.get_dates(dataframe)
+        if (dates is None) or (len(dates) == 0):
+            return None
+
+        prev = LabelCache.latest[spec_id]
+        prev_dates = prev['dates']
+
+        # dataframe[:num_seen] should match prev[start:start+num_seen]. Older candles may have been dropped (live
+        # dataframes are a fixed size window), but nothing can be changed or inserted
+        start = int(np.searchsorted(prev_dates, dates[0]))
+        num_seen = int(np.searchsorted(dates, prev_dates[-1], side='right'))
+        end = start + num_seen
+        if (num_seen == 0) or (end > len(prev_dates)):
+            return None
+        if not np.array_equal(prev_dates[start:end], dates[:num_seen]):
+            return None
+        row_hashes = self.get_row_hashes(dataframe)
+        if not np.array_equal(prev['row_hashes'][start:end], row_hashes[:num_seen]):
+            return None
+
+        num_new = len(dates) - num_seen
+        prev_entry = prev['entry']
+        entry = {
+            'labels': {col: np.concatenate([values[start:end], np.zeros(num_new, dtype=values.dtype)])
+                       for col, values in prev_entry['labels'].items()},
+            'debug': {col: np.concatenate([values[start:end], np.full(num_new, np.nan)])
+                      for col, values in prev_entry['debug'].items()}
+        }
+
+        LabelCache.latest[spec_id] = {'dates': dates, 'row_hashes': row_hashes, 'entry': entry}
+        LabelCache.extends += 1
+        return entry
+
+    def clear(self):
+        LabelCache.lru.clear()
+        LabelCache.latest.clear()
+
+    ###################################
+    # shared implementation of create_training_data() for the strategies above
+
+    # returns the buy/sell labels (as Series) for strategy.curr_pair, using the cache if possible, and adds the debug
+    # columns to strategy.dbg_curr_df. If extend is True (the labels will not be used for training on this candle) and
+    # there is no exact match, the previous labels for the pair are extended to cover the new candles
+    def get_training_data(self, strategy, dataframe: DataFrame, use_cache=True, extend=False):
+
+        if use_cache:
+            spec = self.get_spec(strategy)
+            key = self.make_key(strategy.curr_pair, dataframe, spec)
+            labels = self.get(key)
+            if (labels is None) and extend:
+                labels = self.extend(strategy.curr_pair, dataframe, spec)
+            if labels is None:
+                labels = self.calc_labels(strategy, dataframe)
+                self.put(key, strategy.curr_pair, dataframe, spec, labels)
+        else:
+            labels = self.calc_labels(strategy, dataframe)
+
+        for indicator, values in labels['debug'].items():
+            if not (indicator in strategy.dbg_curr_df):
+                strategy.dbg_curr_df[indicator] = values
+
+        buys = pd.Series(labels['labels']['train_buy'], index=dataframe.index, name='train_buy')
+        if buys.sum() < 3:
+            print("OOPS! <3 ({:.0f}) buy signals generated. Check training criteria".format(buys.sum()))
+
+        sells = pd.Series(labels['labels']['train_sell'], index=dataframe.index, name='train_sell')
+        if sells.sum() < 3:
+            print("OOPS! <3 ({:.0f}) sell signals generated. Check training criteria".format(sells.sum()))
+
+        return buys, sells
+
+    # returns the parameters (other than the data) that affect the training labels of strategy
+    def get_spec(self, strategy) -> dict:
+        return {
+            'strategy': strategy.__class__.__name__,
+            'lookahead': strategy.curr_lookahead,
+            'indicators': repr(sorted(strategy.dataframePopulator.get_indicator_spec().items()))
+        }
+
+    # calculates the labels from scratch, using the strategy's training signals. Returns the label and debug columns
+    # (as arrays)
+    def calc_labels(self, strategy, dataframe: DataFrame) -> dict:
+
+        # add_hidden_indicators() works on a copy, so add_future_data() does not need to make another one
+        future_df = strategy.dataframePopulator.add_hidden_indicators(dataframe.copy())
+        future_df = strategy.dataframePopulator.add_future_data(future_df, strategy.curr_lookahead, copy=False)
+
+        # use sequence trends as criteria
+        future_df['train_buy'] = strategy.get_train_buy_signals(future_df)
+        future_df['train_sell'] = strategy.get_train_sell_signals(future_df)
+
+        # collect the debug indicators in a separate frame, so that they can be cached along with the labels
+        main_df = strategy.dbg_curr_df
+        strategy.dbg_curr_df = DataFrame(index=dataframe.index)
+        try:
+            strategy.save_debug_data(future_df)
+            strategy.save_debug_indicators(future_df)
+            debug_df = strategy.dbg_curr_df
+        finally:
+            strategy.dbg_curr_df = main_df
+
+        return {
+            'labels': {col: future_df[col].to_numpy(dtype=float) for col in ['train_buy', 'train_sell']},
+            'debug': {col: debug_df[col].to_numpy() for col in debug_df.columns}
+        }
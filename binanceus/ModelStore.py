@@ -0,0 +1,108 @@
+#
+# Persistent store for the per-pair models used by the PCA family of strategies
+#
+# The PCA strategies train a scaler, a PCA reduction and a buy/sell classifier for each pair. Without this, all of
+# that is lost whenever the bot restarts, and every backtest (even over the same data) starts from scratch.
+#
+# Each entry is saved with joblib (uncompressed, so numpy arrays can be memory-mapped on load), along with:
+#   - a format version. Entries with a different version are ignored (just bump store_version if the layout changes)
+#   - the list of features (columns) used for training. A model is only re-used if the features match
+#   - a hash of the training window (data + labels + training parameters). If this matches, the model is exactly
+#     what training would have produced, so training can be skipped
+#
+# Models are only loaded when a pair asks for them (not at startup)
+#
+# Files are stored in: <strategy dir>/models/<strategy name>/<pair>.joblib (latest model for each pair)
+#
+
+import hashlib
+import os
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class ModelStore():
+
+    store_version = 1
+
+    category = ""
+    root_dir = ""
+
+    def __init__(self, category: str, root_dir: str = ""):
+        super().__init__()
+        self.category = category
+
+        # default is a subdirectory of the location of this file (same as the Classifier* models)
+        if len(root_dir) == 0:
+            root_dir = os.path.dirname(str(Path(__file__))) + "/models/"
+        self.root_dir = root_dir
+
+    # returns the path of the model file for a pair
+    def get_model_path(self, pair: str) -> Path:
+        name = pair.split("/")[0].replace(":", "_")
+        return Path(self.root_dir) / self.category / (name + ".joblib")
+
+    # returns a hash of the training window. Any change to the data, labels or parameters changes the hash
+    def get_train_hash(self, df_norm: DataFrame, buys, sells, params: dict) -> str:
+        hasher = hashlib.sha1()
+        hasher.update(np.ascontiguousarray(pd.util.hash_pandas_object(df_norm, index=False).to_numpy()))
+        hasher.update(np.ascontiguousarray(np.asarray(buys, dtype=float)))
+        hasher.update(np.ascontiguousarray(np.asarray(sells, dtype=float)))
+        hasher.update(repr(list(df_norm.columns)).encode())
+        hasher.update(repr(sorted(params.items())).encode())
+        return hasher.hexdigest()
+
+    # save the model info for a pair. info is a dict of the (picklable) models, e.g. the pair_model_info entry
+    def save(self, pair: str, info: dict, features: list, train_hash: str):
+
+        entry = {
+            'version': self.store_version,
+            'pair': pair,
+            'features': list(features),
+            'train_hash': train_hash,
+            'info': info
+        }
+
+        path = self.get_model_path(pair)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            # write to a temp file then rename, so that a partial file is never loaded
+            tmp_path = path.with_suffix(".tmp")
+            joblib.dump(entry, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            log.warning(f"ModelStore: could not save {path} ({e})")
+
+    # load the model info for a pair. Returns None if there is no (compatible) saved model.
+    # If train_hash is supplied, only a model trained on exactly the same window is returned
+    def load(self, pair: str, features: list, train_hash: str = None):
+
+        path = self.get_model_path(pair)
+        if not path.exists():
+            return None
+
+        try:
+            entry = joblib.load(path, mmap_mode='r')
+        except Exception as e:
+            log.warning(f"ModelStore: could not load {path} ({e})")
+            return None
+
+        if entry.get('version', 0) != self.store_version:
+            return None
+
+        if entry['features'] != list(features):
+            return None
+
+        if (train_hash is not None) and (entry['train_hash'] != train_hash):
+            return None
+
+        return entry
@@ -87,6 +87,8 @@ import RBM
 
 from DataframeUtils import DataframeUtils, ScalerType
 from DataframePopulator import DataframePopulator
+from LabelCache import LabelCache
+from BatchPredictor import BatchPredictor
 
 from NNBClassifier_MLP import NNBClassifier_MLP
 from NNBClassifier_MLP2 import NNBClassifier_MLP2
@@ -227,11 +229,16 @@ class NNBC(IStrategy):
     refit_model = False  # only set to True when training. If False, then existing model is used, if present
     use_full_dataset = True  # use the entire dataset for training (in backtest)
     model_per_pair = False
+    use_batch_predictions = True  # shared model: run the predictions for all pairs in one batch (live/dry runs)
+    batch_predictor = None
 
     scaler_type = ScalerType.Robust # scaler type used for normalisation
 
     dataframeUtils = None
     dataframePopulator = None
+    indicator_columns = None  # set to a list of indicator columns to only calculate those (plus dependencies)
+    label_cache = None
+    use_label_cache = True  # re-use the training labels if the data has not changed (or only has new candles)
 
     buy_tag = 'Buy'
     sell_tag = 'Sell'
@@ -251,6 +258,7 @@ class NNBC(IStrategy):
     dbg_verbose = True  # controls debug output
     dbg_curr_df: DataFrame = None  # for debugging of current dataframe
     dbg_trace_memory = False # if true, trace memory usage
+    dbg_log_memory = False  # if true, log process memory (current/peak RSS) after each processing stage
     dbg_trace_pair = "" # pair used for synching memory snapshots
 
     # variables to track state
@@ -371,6 +379,9 @@ class NNBC(IStrategy):
         if self.dataframeUtils is None:
             self.dataframeUtils = DataframeUtils()
 
+        if self.batch_predictor is None:
+            self.batch_predictor = BatchPredictor()
+
         if self.dataframePopulator is None:
 
             if self.dbg_trace_memory and (self.dbg_trace_pair == self.curr_pair):
@@ -385,6 +396,7 @@ class NNBC(IStrategy):
             self.dataframePopulator.startup_win = self.startup_candle_count
             self.dataframePopulator.n_loss_stddevs = self.n_loss_stddevs
             self.dataframePopulator.n_profit_stddevs = self.n_profit_stddevs
+            self.dataframePopulator.required_columns = self.indicator_columns
 
         # first time through? Print some debug info
         if self.first_time:
@@ -410,15 +422,21 @@ class NNBC(IStrategy):
         self.dataframeUtils.set_scaler_type(self.scaler_type)
 
         # populate the normal dataframe
-        dataframe = self.dataframePopulator.add_indicators(dataframe)
+        dataframe = self.dataframePopulator.add_indicators(dataframe, self.curr_pair, self.timeframe)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "indicators")
 
         # get the buy/sell training signals
         buys, sells = self.create_training_data(dataframe)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "labels")
 
         # train the models on the populated data and signals
         if self.dbg_verbose:
             print("    training models...")
         self.train_models(curr_pair, dataframe, buys, sells)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "training")
 
         # add predictions
         if self.dbg_verbose:
@@ -434,6 +452,8 @@ class NNBC(IStrategy):
         if self.dbg_verbose:
             print("    updating stoploss data...")
         self.add_stoploss_indicators(dataframe, curr_pair)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "predictions")
 
         if self.dbg_trace_memory and (self.dbg_trace_pair == self.curr_pair):
             profiler.snapshot()
@@ -444,31 +464,11 @@ class NNBC(IStrategy):
     ################################
 
     # creates the buy/sell labels absed on looking ahead into the supplied dataframe
+    # The labels (and debug columns) are cached, so they are only recalculated when the data changes (see LabelCache)
     def create_training_data(self, dataframe: DataFrame):
-
-        # future_df = self.add_future_data(dataframe.copy())
-        future_df = self.dataframePopulator.add_hidden_indicators(dataframe.copy())
-        future_df = self.dataframePopulator.add_future_data(future_df, self.curr_lookahead)
-
-        future_df['train_buy'] = 0.0
-        future_df['train_sell'] = 0.0
-
-        # use sequence trends as criteria
-        future_df['train_buy'] = self.get_train_buy_signals(future_df)
-        future_df['train_sell'] = self.get_train_sell_signals(future_df)
-
-        buys = future_df['train_buy'].copy()
-        if buys.sum() < 3:
-            print("OOPS! <3 ({:.0f}) buy signals generated. Check training criteria".format(buys.sum()))
-
-        sells = future_df['train_sell'].copy()
-        if sells.sum() < 3:
-            print("OOPS! <3 ({:.0f}) sell signals generated. Check training criteria".format(sells.sum()))
-
-        self.save_debug_data(future_df)
-        self.save_debug_indicators(future_df)
-
-        return buys, sells
+        if self.label_cache is None:
+            self.label_cache = LabelCache()
+        return self.label_cache.get_training_data(self, dataframe, use_cache=self.use_label_cache)
 
     def save_debug_data(self, future_df: DataFrame):
 
@@ -889,6 +889,12 @@ class NNBC(IStrategy):
         predict = None
 
         if clf is not None:
+            # use the result from the cross-pair batch (see bot_loop_start()), if there is one for this candle
+            if self.batch_predictor is not None:
+                predict = self.batch_predictor.get(clf, pair, dataframe['date'].iloc[-1])
+                if predict is not None:
+                    return predict
+
             # print("    predicting... - dataframe:", dataframe.shape)
             df_norm = self.dataframeUtils.norm_dataframe(dataframe)
             if self.compress_data:
@@ -966,6 +972,63 @@ class NNBC(IStrategy):
 
         return predict
 
+    ###################################
+
+    # called by freqtrade once per loop, after the candles have been refreshed and before any pairs are analysed
+    def bot_loop_start(self, **kwargs) -> None:
+        if self.batch_predictions_enabled():
+            self.run_batch_predictions()
+        return
+
+    # True if the predictions for all pairs can be run in a single batch. Only for live/dry runs, since that is when
+    # predictions are run one candle at a time
+    def batch_predictions_enabled(self) -> bool:
+        if (not self.use_batch_predictions) or self.model_per_pair:
+            return False
+        if (self.dp is None) or (self.dp.runmode.value not in ('live', 'dry_run')):
+            return False
+        return (self.batch_predictor is not None) and \
+            ((self.buy_classifier is not None) or (self.sell_classifier is not None))
+
+    # runs the data for every (initialised) pair in the whitelist through the buy and sell models, one batch each.
+    # The results are picked up by predict(). Pairs that have not been through populate_indicators() yet are skipped,
+    # as are pairs that already have results for their latest candle (so this is done once per candle, not per loop).
+    # Predictions cover the whole dataframe (same as predict()), because the classifiers scale their thresholds
+    # using all of the predictions for a pair
+    def run_batch_predictions(self):
+
+        pairs = [pair for pair in self.dp.current_whitelist() if pair in self.curr_state]
+        if len(pairs) == 0:
+            return
+
+        classifiers = [clf for clf in [self.buy_classifier, self.sell_classifier] if clf is not None]
+        inputs = {}
+        for pair in pairs:
+            self.curr_pair = pair
+            dataframe = self.dp.get_pair_dataframe(pair=pair, timeframe=self.timeframe)
+            if dataframe.shape[0] == 0:
+                continue
+            if all(self.batch_predictor.has_result(clf, pair, dataframe['date'].iloc[-1]) for clf in classifiers):
+                continue
+
+            # same processing as populate_indicators(). The indicators are cached (IndicatorCache), so that
+            # populate_indicators() can re-use them for the same candles
+            dataframe = self.dataframePopulator.add_indicators(dataframe.copy(), pair, self.timeframe)
+            self.dataframeUtils.set_scaler_type(self.scaler_type)
+            df_norm = self.dataframeUtils.norm_dataframe(dataframe)
+            if self.compress_data:
+                df_norm = self.compress_dataframe(df_norm)
+
+            inputs[pair] = (dataframe['date'].iloc[-1], self.dataframeUtils.df_to_tensor(df_norm, self.seq_len))
+
+        if len(inputs) == 0:
+            return
+        for clf in classifiers:
+            self.batch_predictor.run(clf, inputs)
+            if self.dbg_verbose:
+                print(f"    batch predictions: {BatchPredictor.last_batch_size} pairs in "
+                      f"{BatchPredictor.last_batch_time:.3f}s")
+
     ###################################
     # Debug stuff
 
@@ -1,4 +1,7 @@
 import operator
+import queue
+import threading
+import time
 import tracemalloc
 
 import numpy as np
@@ -42,23 +45,29 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 from finta import TA as fta
 
-import keras
-import tensorflow as tf
-from keras import layers
 from tqdm import tqdm
-from tqdm.keras import TqdmCallback
 import sklearn.decomposition as skd
 
 import random
-import Time2Vector
-import Transformer
-import Attention
+
+from lazy_imports import lazy_import, lazy_attr
+
+# tensorflow/keras (and anything that uses them) are only loaded when the classifier is created
+keras = lazy_import("keras")
+tf = lazy_import("tensorflow")
+layers = lazy_import("keras.layers")
+TqdmCallback = lazy_attr("tqdm.keras", "TqdmCallback")
+Time2Vector = lazy_import("Time2Vector")
+Transformer = lazy_import("Transformer")
+Attention = lazy_import("Attention")
 
 from DataframeUtils import DataframeUtils, ScalerType
 from DataframePopulator import DataframePopulator
-from NNPredictor_LSTM import NNPredictor_LSTM
+from BatchPredictor import BatchPredictor
+NNPredictor_LSTM = lazy_attr("NNPredictor_LSTM", "NNPredictor_LSTM")
 import Environment
 import profiler
 
@@ -159,6 +168,10 @@ class NNPredict(IStrategy):
     num_epochs = 128  # max number of iterations for training
     batch_size = 1024  # batch size for training
     predict_batch_size = 512
+    predict_prefetch = 2  # number of data chunks prepared ahead of the model (batch predictions)
+    rolling_window = 64  # length of data window used for each rolling prediction
+    rolling_batch_size = 256  # number of windows passed to the classifier at a time (rolling predictions)
+    rolling_predict_rate = 0.0  # throughput of last rolling prediction run (predictions/sec)
 
     classifier_list = {}  # classifier for each pair
     init_done = {}  # flags whether initialisation has been done for a pair or not
@@ -169,6 +182,8 @@ class NNPredict(IStrategy):
     scaler_type = ScalerType.Robust  # scaler type used for normalisation
     # scaler_type = ScalerType.Standard  # scaler type used for normalisation
     model_per_pair = False  # set to True to create pair-specific models (better but only works for pairs in whitelist)
+    use_batch_predictions = True  # shared model: run the latest predictions for all pairs in one batch (live/dry runs)
+    batch_predictor = None
     training_only = False  # set to True to just generate models, no backtesting or prediction
 
     # target_column = 'close'  # which column should be used for training and prediction
@@ -176,6 +191,7 @@ class NNPredict(IStrategy):
 
     dataframeUtils = None
     dataframePopulator = None
+    indicator_columns = None  # set to a list of indicator columns to only calculate those (plus dependencies)
 
     # flags used for initialisation
     first_time = True  # mostly for debug
@@ -186,6 +202,7 @@ class NNPredict(IStrategy):
     dbg_curr_df: DataFrame = None  # for debugging of current dataframe
     dbg_enable_tracing = False  # set to True in subclass to enable function tracing
     dbg_trace_memory = True
+    dbg_log_memory = False  # if true, log process memory (current/peak RSS) after each processing stage
     dbg_trace_pair = ""
 
     # variables to track state
@@ -274,6 +291,9 @@ class NNPredict(IStrategy):
         if self.dataframeUtils is None:
             self.dataframeUtils = DataframeUtils()
 
+        if self.batch_predictor is None:
+            self.batch_predictor = BatchPredictor()
+
         if self.dataframePopulator is None:
 
             if self.dbg_trace_memory and (self.dbg_trace_pair == self.curr_pair):
@@ -288,6 +308,7 @@ class NNPredict(IStrategy):
             self.dataframePopulator.startup_win = self.startup_candle_count
             self.dataframePopulator.n_loss_stddevs = self.n_loss_stddevs
             self.dataframePopulator.n_profit_stddevs = self.n_profit_stddevs
+            self.dataframePopulator.required_columns = self.indicator_columns
 
         if NNPredict.first_time:
             NNPredict.first_time = False
@@ -321,6 +342,8 @@ class NNPredict(IStrategy):
         if self.dbg_verbose:
             print("    Adding technical indicators...")
         dataframe = self.add_indicators(dataframe)
+        if self.dbg_log_memory:
+            profiler.log_memory(self.curr_pair, "indicators")
 
         # train the model
         if self.dbg_verbose:
@@ -331,6 +354,8 @@ class NNPredict(IStrategy):
             self.refit_model = True
 
         dataframe = self.train_model(dataframe, self.curr_pair)
+        if self.dbg_log_memory:
+            profiler.log_memory(self.curr_pair, "training")
 
         # if in training mode then skip further processing.
         # Doesn't make sense without the model anyway, and it can sometimes be very slow
@@ -352,6 +377,8 @@ class NNPredict(IStrategy):
                 print("    running predictions...")
 
         dataframe = self.add_predictions(dataframe, self.curr_pair)
+        if self.dbg_log_memory:
+            profiler.log_memory(self.curr_pair, "predictions")
 
         # Custom Stoploss
         if self.dbg_verbose:
@@ -368,7 +395,7 @@ class NNPredict(IStrategy):
     def add_indicators(self, dataframe: DataFrame) -> DataFrame:
 
         # populate the standard indicators
-        dataframe = self.dataframePopulator.add_indicators(dataframe)
+        dataframe = self.dataframePopulator.add_indicators(dataframe, self.curr_pair, self.timeframe)
 
         # populate the training indicators
         dataframe = self.add_training_indicators(dataframe)
@@ -605,6 +632,18 @@ class NNPredict(IStrategy):
         # get a scaler for the price data
         price_scaler = self.dataframeUtils.make_scaler()
 
+        # use the result from the cross-pair batch (see bot_loop_start()), if there is one for this candle
+        if self.batch_predictor is not None:
+            preds = self.batch_predictor.get(classifier, self.curr_pair, dataframe['date'].iloc[-1])
+            if preds is not None:
+                latest_prediction = preds[-1]
+                if prescale_data:
+                    # the price scaler works per column, so only the last value affects the last prediction
+                    price_scaler.fit(np.array(dataframe[self.target_column].iloc[-1:]).reshape(1, -1))
+                    latest_prediction = price_scaler.inverse_transform(np.array([[latest_prediction]]))[0][-1]
+                dataframe['predict'].iloc[-1] = latest_prediction
+                return dataframe
+
         # print(f'backtest_data() - use_dataframes:{use_dataframes} prescale_data:{prescale_data}')
 
         # pre-scale if needed
@@ -656,6 +695,67 @@ class NNPredict(IStrategy):
 
     ################################
 
+    # called by freqtrade once per loop, after the candles have been refreshed and before any pairs are analysed
+    def bot_loop_start(self, **kwargs) -> None:
+        if self.batch_predictions_enabled():
+            self.run_batch_predictions()
+        return
+
+    # True if the latest predictions for all pairs can be run in a single batch. Only for live/dry runs, since that
+    # is when predictions are run one candle at a time
+    def batch_predictions_enabled(self) -> bool:
+        if (not self.use_batch_predictions) or self.model_per_pair or self.training_only:
+            return False
+        if (self.dp is None) or (self.dp.runmode.value not in ('live', 'dry_run')):
+            return False
+        return (self.batch_predictor is not None) and (len(self.init_done) > 0)
+
+    # runs the latest prediction for every (initialised) pair in the whitelist through the shared model in one batch.
+    # The results are picked up by update_predictions(). Pairs that have not been through populate_indicators() yet
+    # are skipped, since their model may not be trained, as are pairs that already have a result for their latest
+    # candle (so the work is done once per candle, not once per loop)
+    def run_batch_predictions(self):
+
+        pairs = [pair for pair in self.dp.current_whitelist()
+                 if (pair in self.init_done) and (pair in self.classifier_list)]
+        if len(pairs) == 0:
+            return
+
+        # all pairs use the same model, so any of the classifiers will do
+        classifier = self.classifier_list[pairs[0]]
+        if classifier.needs_dataframes() or classifier.returns_single_prediction():
+            return
+
+        inputs = {}
+        for pair in pairs:
+            self.curr_pair = pair
+            dataframe = self.dp.get_pair_dataframe(pair=pair, timeframe=self.timeframe)
+            if (dataframe.shape[0] == 0) or \
+                    self.batch_predictor.has_result(classifier, pair, dataframe['date'].iloc[-1]):
+                continue
+
+            # same processing as populate_indicators(). The indicators are cached (IndicatorCache), so that
+            # populate_indicators() can re-use them for the same candles
+            dataframe = self.add_indicators(dataframe.copy())
+            self.dataframeUtils.set_scaler_type(self.scaler_type)
+            if classifier.prescale_data():
+                df_norm = self.dataframeUtils.norm_dataframe(dataframe)
+            else:
+                df_norm = dataframe
+
+            # only the last prediction is used, so just the latest window is needed (copied out of the view)
+            tensor = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len, materialize=False)
+            inputs[pair] = (dataframe['date'].iloc[-1], np.ascontiguousarray(tensor[-1:]))
+
+        if len(inputs) == 0:
+            return
+        self.batch_predictor.run(classifier, inputs)
+        if self.dbg_verbose:
+            print(f"    batch predictions: {BatchPredictor.last_batch_size} pairs in "
+                  f"{BatchPredictor.last_batch_time:.3f}s")
+
+    ################################
+
     # get predictions from the model. Directly updates the 'predict' column
     def add_model_predictions(self, dataframe: DataFrame) -> DataFrame:
 
@@ -716,46 +816,24 @@ class NNPredict(IStrategy):
             df_norm = self.compress_dataframe(df_norm)
             print(f"    Compressed dataframe {old_dim} -> {np.shape(df_norm)[1]}")
 
-        if not use_dataframes:
-            # convert dataframe to tensor
-            df_tensor = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len)
+        if use_dataframes:
+            data = df_norm
+        else:
+            # convert dataframe to tensor. prefetch_chunks() copies each chunk, so a view is enough here
+            data = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len, materialize=False)
 
-        # prediction does not work well when run over a large dataset, so divide into chunks and predict for each one
-        # then concatenate the results and return
-        preds_notrend: np.array = []
+        # prediction does not work well when run over a large dataset, so divide into chunks and predict for each one.
+        # Chunks are prepared in a background thread while the model runs, and results go straight into the output
+        nrows = np.shape(df_norm)[0]
+        preds_notrend = np.zeros(nrows, dtype=float)
         batch_size = self.predict_batch_size
 
-        nruns = int(np.shape(df_norm)[0] / batch_size)
-        # print(f'    batch_size:{batch_size} nruns:{nruns}')
-
-        for i in tqdm(range(nruns), desc="    Predicting…", ascii=True, ncols=75):
-            # for i in range(nruns):
-            start = i * batch_size
-            end = start + batch_size
-            # print("start:{} end:{}".format(start, end))
-            if use_dataframes:
-                chunk = df_norm.iloc[start:end]
-            else:
-                chunk = df_tensor[start:end]
-            # print(chunk)
-            preds = self.get_predictions(chunk)
-            # print(preds)
-            preds_notrend = np.concatenate((preds_notrend, preds))
-
-        # copy whatever is leftover
-        start = nruns * batch_size
-        end = np.shape(df_norm)[0]
-        # print("start:{} end:{}".format(start, end))
-        if end > start:
-            if use_dataframes:
-                chunk = df_norm.iloc[start:end]
-            else:
-                chunk = df_tensor[start:end]
-            preds = self.get_predictions(chunk)
-            preds_notrend = np.concatenate((preds_notrend, preds))
+        with tqdm(total=nrows, desc="    Predicting…", ascii=True, ncols=75) as pbar:
+            for start, end, chunk in self.prefetch_chunks(data, nrows, batch_size):
+                preds_notrend[start:end] = self.get_predictions(chunk)
+                pbar.update(end - start)
 
         # re-scale the predictions
-        # slight cheat - replace 'temp' column with predictions, then inverse scale
 
         # decompress
         if self.compress_data:
@@ -766,26 +844,68 @@ class NNPredict(IStrategy):
 
         else:
             if prescale_data:
-                # replace the 'temp' column and de-normalise (this is why we added the 'temp' column earlier, to match dimensions)
-                df_norm["temp"] = preds_notrend
-                inv_y = self.dataframeUtils.denorm_dataframe(df_norm)
-                predictions = inv_y["temp"]
+                # inverse scale just the target column (the model was trained on the scaled target column)
+                column_scaler = self.dataframeUtils.get_column_scaler(self.target_column)
+                predictions = column_scaler.inverse_transform(preds_notrend)
             else:
                 # classifier handles scaling
                 predictions = preds_notrend
 
-        # print("runs:{} predictions:{}".format(nruns, len(predictions)))
-
         dataframe['predict'] = predictions
         return dataframe
 
-    # run prediction in rolling fashion (one result at a time -> slow) over the entire history
+    # generator that returns (start, end, chunk) for consecutive chunks of data (dataframe or tensor).
+    # The chunks are prepared in a background thread, so the next chunk is (usually) ready as soon as the model has
+    # finished with the current one. At most self.predict_prefetch chunks are held in the queue
+    def prefetch_chunks(self, data, nrows: int, batch_size: int):
+
+        chunk_queue = queue.Queue(maxsize=self.predict_prefetch)
+        stop = threading.Event()
+        use_dataframes = self.dataframeUtils.is_dataframe(data)
+
+        def producer():
+            try:
+                for start in range(0, nrows, batch_size):
+                    if stop.is_set():
+                        return
+                    end = min(start + batch_size, nrows)
+                    if use_dataframes:
+                        chunk = data.iloc[start:end]
+                    else:
+                        # tensors are (strided) views, so copy each chunk into contiguous memory here
+                        chunk = np.ascontiguousarray(data[start:end])
+                    chunk_queue.put((start, end, chunk))
+                chunk_queue.put(None)
+            except Exception as e:
+                chunk_queue.put(e)
+
+        thread = threading.Thread(target=producer, daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                item = chunk_queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # make sure the producer is not left blocked on a full queue
+            stop.set()
+            while thread.is_alive():
+                try:
+                    chunk_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                thread.join(0.01)
+
+    # run prediction in rolling fashion over the entire history. Each prediction only sees a fixed length window of
+    # data ending on that row, and the windows are passed to the classifier in batches
     def add_model_rolling_predictions(self, dataframe: DataFrame) -> DataFrame:
 
         print("    Adding rolling predictions. Might take a while...")
 
-        # probably don't need to handle tensor cases since those classifiers typically do not return single values
-
         # get the current clasifier
         classifier = self.classifier_list[self.curr_pair]
         use_dataframes = classifier.needs_dataframes()
@@ -797,35 +917,41 @@ class NNPredict(IStrategy):
         else:
             df_norm = dataframe
 
-        if not use_dataframes:
-            df_tensor = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len)
-
-        window = 64
-        start = window
-        end = np.shape(df_norm)[0]
-
-        preds_notrend: np.array = []
-
-        # set values for startup window
-        for index in range(0, start):
-            preds_notrend = np.concatenate((preds_notrend, [df_norm[self.target_column].iloc[index]]))
+        if use_dataframes:
+            data = df_norm
+        else:
+            data = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len)
 
-        # add predictions
-        for i in tqdm(range(start, end), desc="    Predicting…", ascii=True, ncols=75):
-            # for index in range(start, end):
-            if use_dataframes:
-                chunk = df_norm.iloc[start:end]
-            else:
-                chunk = df_tensor[start:end]
-            preds = self.get_predictions(chunk)
-            preds_notrend = np.concatenate((preds_notrend, preds))
+        window = self.rolling_window
+        nrows = np.shape(df_norm)[0]
+
+        # preallocate results, and set values for startup window
+        preds_notrend = np.zeros(nrows, dtype=float)
+        preds_notrend[:window] = df_norm[self.target_column].iloc[:window]
+
+        # add predictions. Row i is predicted from the window that ends on row i
+        start_time = time.perf_counter()
+        with tqdm(total=max(nrows - window, 0), desc="    Predicting…", ascii=True, ncols=75) as pbar:
+            for bstart in range(window, nrows, self.rolling_batch_size):
+                bend = min(bstart + self.rolling_batch_size, nrows)
+                if use_dataframes:
+                    windows = [data.iloc[i - window + 1:i + 1] for i in range(bstart, bend)]
+                else:
+                    windows = [data[i - window + 1:i + 1] for i in range(bstart, bend)]
+                preds_notrend[bstart:bend] = self.get_window_predictions(classifier, windows)
+                pbar.update(bend - bstart)
+
+        # throughput (predictions/sec), so that changes to classifiers/batch sizes can be compared
+        elapsed = time.perf_counter() - start_time
+        npreds = max(nrows - window, 0)
+        self.rolling_predict_rate = npreds / elapsed if elapsed > 0 else 0.0
+        print(f"    {npreds} rolling predictions in {elapsed:.2f}s ({self.rolling_predict_rate:.1f}/s)")
 
         # re-scale, if needed
         if prescale_data:
-            # replace the 'temp' column and de-normalise (this is why we added the 'temp' column earlier, to match dimensions)
-            df_norm["temp"] = preds_notrend
-            inv_y = self.dataframeUtils.denorm_dataframe(df_norm)
-            predictions = inv_y["temp"]
+            # inverse scale just the target column, same as add_model_batch_predictions()
+            column_scaler = self.dataframeUtils.get_column_scaler(self.target_column)
+            predictions = column_scaler.inverse_transform(preds_notrend)
         else:
             # classifier handles scaling
             predictions = preds_notrend
@@ -835,6 +961,17 @@ class NNPredict(IStrategy):
 
         return dataframe
 
+    # get the (single) prediction for each of a list of windows. Uses the classifier's batch interface if it has one,
+    # otherwise the windows are predicted one at a time
+    def get_window_predictions(self, classifier, windows: list) -> np.ndarray:
+        if hasattr(classifier, 'predict_windows'):
+            return classifier.predict_windows(windows)
+
+        preds = np.zeros(len(windows), dtype=float)
+        for i, w in enumerate(windows):
+            preds[i] = self.get_predictions(w)[-1]
+        return preds
+
     ################################
 
     # add columns based on predictions. Do not call until after model has been trained
@@ -901,27 +1038,12 @@ class NNPredict(IStrategy):
 
     # returns (rolling) smoothed version of input column
     def roll_smooth(self, col) -> float:
-        # must return scalar, so just calculate prediction and take last value
-
-        smooth = gaussian_filter1d(col, 4)
-        # smooth = gaussian_filter1d(col, 2)
-
-        length = len(smooth)
-        if length > 0:
-            return smooth[length - 1]
-        else:
-            return col[len(col) - 1]
+        # must return scalar, i.e. the last value of the smoothed window (see rolling_models.gaussian_last)
+        return rm.gaussian_last(col, 4)
 
     def roll_strong_smooth(self, col) -> float:
-        # must return scalar, so just calculate prediction and take last value
-
-        smooth = gaussian_filter1d(col, 24)
-
-        length = len(smooth)
-        if length > 0:
-            return smooth[length - 1]
-        else:
-            return col[len(col) - 1]
+        # must return scalar, i.e. the last value of the smoothed window (see rolling_models.gaussian_last)
+        return rm.gaussian_last(col, 24)
 
     ################################
 
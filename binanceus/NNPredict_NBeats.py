@@ -44,15 +44,19 @@ warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 import custom_indicators as cta
 from finta import TA as fta
 
-import keras
-from keras import layers
 from tqdm import tqdm
-from tqdm.keras import TqdmCallback
+
+# keras is only loaded when the classifier is created
+from lazy_imports import lazy_import, lazy_attr
+
+keras = lazy_import("keras")
+layers = lazy_import("keras.layers")
+TqdmCallback = lazy_attr("tqdm.keras", "TqdmCallback")
 
 import random
 
 from NNPredict import NNPredict
-from NNPredictor_NBeats import NNPredictor_NBeats
+NNPredictor_NBeats = lazy_attr("NNPredictor_NBeats", "NNPredictor_NBeats")
 
 """
 ####################################################################################
@@ -44,16 +44,20 @@ warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 import custom_indicators as cta
 from finta import TA as fta
 
-import keras
-from keras import layers
 from tqdm import tqdm
-from tqdm.keras import TqdmCallback
+
+# keras is only loaded when the classifier is created
+from lazy_imports import lazy_import, lazy_attr
+
+keras = lazy_import("keras")
+layers = lazy_import("keras.layers")
+TqdmCallback = lazy_attr("tqdm.keras", "TqdmCallback")
 
 import random
 
 from NNPredict import NNPredict
 # from NNPredictor_Ray import NNPredictor_Ray
-from NNPredictor_NLinear import NNPredictor_NLinear
+NNPredictor_NLinear = lazy_attr("NNPredictor_NLinear", "NNPredictor_NLinear")
 
 """
 ####################################################################################
@@ -86,6 +86,7 @@ import RBM
 
 from DataframeUtils import DataframeUtils, ScalerType
 from DataframePopulator import DataframePopulator
+from LabelCache import LabelCache
 
 # from NNTClassifier_MLP import NNTClassifier_MLP
 # from NNTClassifier_MLP2 import NNTClassifier_MLP2
@@ -228,6 +229,9 @@ class NNTC(IStrategy):
 
     dataframeUtils = None
     dataframePopulator = None
+    indicator_columns = None  # set to a list of indicator columns to only calculate those (plus dependencies)
+    label_cache = None
+    use_label_cache = True  # re-use the training labels if the data has not changed (or only has new candles)
 
     dwt_window = startup_candle_count
 
@@ -244,6 +248,7 @@ class NNTC(IStrategy):
     dbg_verbose = True  # controls debug output
     dbg_curr_df: DataFrame = None  # for debugging of current dataframe
     dbg_trace_memory = False  # if true, trace memory usage
+    dbg_log_memory = False  # if true, log process memory (current/peak RSS) after each processing stage
     dbg_trace_pair = ""  # pair used for synching memory snapshots
 
     # variables to track state
@@ -382,6 +387,7 @@ class NNTC(IStrategy):
             self.dataframePopulator.startup_win = self.startup_candle_count
             self.dataframePopulator.n_loss_stddevs = self.n_loss_stddevs
             self.dataframePopulator.n_profit_stddevs = self.n_profit_stddevs
+            self.dataframePopulator.required_columns = self.indicator_columns
 
         # first time through? Print some debug info
         if self.first_time:
@@ -406,15 +412,21 @@ class NNTC(IStrategy):
         self.dataframeUtils.set_scaler_type(self.scaler_type)
 
         # populate the normal dataframe
-        dataframe = self.dataframePopulator.add_indicators(dataframe)
+        dataframe = self.dataframePopulator.add_indicators(dataframe, self.curr_pair, self.timeframe)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "indicators")
 
         # get the buy/sell training signals
         buys, sells = self.create_training_data(dataframe)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "labels")
 
         # train the models on the populated data and signals
         if self.dbg_verbose:
             print("    training models...")
         self.train_models(curr_pair, dataframe, buys, sells)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "training")
 
         # add predictions
         if self.dbg_verbose:
@@ -429,6 +441,8 @@ class NNTC(IStrategy):
         if self.dbg_verbose:
             print("    updating stoploss data...")
         self.add_stoploss_indicators(dataframe, curr_pair)
+        if self.dbg_log_memory:
+            profiler.log_memory(curr_pair, "predictions")
 
         if self.dbg_trace_memory and (self.dbg_trace_pair == self.curr_pair):
             profiler.snapshot()
@@ -438,31 +452,11 @@ class NNTC(IStrategy):
     ################################
 
     # creates the buy/sell labels absed on looking ahead into the supplied dataframe
+    # The labels (and debug columns) are cached, so they are only recalculated when the data changes (see LabelCache)
     def create_training_data(self, dataframe: DataFrame):
-
-        # future_df = self.add_future_data(dataframe.copy())
-        future_df = self.dataframePopulator.add_hidden_indicators(dataframe.copy())
-        future_df = self.dataframePopulator.add_future_data(future_df, self.curr_lookahead)
-
-        future_df['train_buy'] = 0.0
-        future_df['train_sell'] = 0.0
-
-        # use sequence trends as criteria
-        future_df['train_buy'] = self.get_train_buy_signals(future_df)
-        future_df['train_sell'] = self.get_train_sell_signals(future_df)
-
-        buys = future_df['train_buy'].copy()
-        if buys.sum() < 3:
-            print("OOPS! <3 ({:.0f}) buy signals generated. Check training criteria".format(buys.sum()))
-
-        sells = future_df['train_sell'].copy()
-        if sells.sum() < 3:
-            print("OOPS! <3 ({:.0f}) sell signals generated. Check training criteria".format(sells.sum()))
-
-        self.save_debug_data(future_df)
-        self.save_debug_indicators(future_df)
-
-        return buys, sells
+        if self.label_cache is None:
+            self.label_cache = LabelCache()
+        return self.label_cache.get_training_data(self, dataframe, use_cache=self.use_label_cache)
 
     def save_debug_data(self, future_df: DataFrame):
 
@@ -1,4 +1,6 @@
+import copy
 import operator
+import threading
 
 import numpy as np
 from enum import Enum
@@ -85,6 +87,11 @@ from RBMEncoder import RBMEncoder
 
 from DataframeUtils import DataframeUtils, ScalerType
 from DataframePopulator import DataframePopulator
+from LabelCache import LabelCache
+from ModelStore import ModelStore
+from ClassifierTournament import ClassifierTournament
+from TrainingScheduler import TrainingScheduler
+from StreamingPCA import StreamingPCA
 
 """
 ####################################################################################
@@ -210,6 +217,7 @@ class PCA(IStrategy):
     num_pairs = 0
     pair_model_info = {}  # holds model-related info for each pair
     classifier_stats = {}  # holds statistics for each type of classifier (useful to rank classifiers
+    classifier_stats_lock = threading.Lock()  # classifier_stats is updated when models are installed (training threads)
 
     # debug flags
     first_time = True  # mostly for debug
@@ -219,8 +227,22 @@ class PCA(IStrategy):
 
     dataframeUtils = None
     dataframePopulator = None
+    indicator_columns = None  # set to a list of indicator columns to only calculate those (plus dependencies)
+    label_cache = None
+    use_label_cache = True  # re-use the training labels if the data has not changed (or only has new candles)
+    model_store = None
+    use_model_store = True  # save trained models, and re-use them if the training data has not changed
 
     dbg_scan_classifiers = False  # if True, scan all viable classifiers and choose the best. Very slow!
+    clf_scan_workers = 0  # number of processes used to scan classifiers. 0 = all CPUs, 1 = run in strategy process
+    clf_scan_time_budget = 300.0  # max time (secs) allowed for each classifier fit during a scan (overruns are stopped)
+    clf_scan_halving = False  # if True, eliminate the weakest classifiers after a fit on a subsample of the data
+    training_scheduler = None
+    train_interval = 16  # number of candles between retraining of each pair
+    train_in_background = True  # live/dry-run only: train in background threads, keep using old models until done
+    train_workers = 1  # max number of pairs that train at the same time (in background)
+    incremental_pca = False  # if True, PCA and scaler are updated with new candles only (Standard or MinMax scaler)
+    pca_variance_threshold = 0.999  # PCA keeps enough components to cover this fraction of the variance
     dbg_test_classifier = True  # test clasifiers after fitting
     dbg_analyse_pca = False  # analyze PCA weights
     dbg_verbose = False  # controls debug output
@@ -349,6 +371,20 @@ class PCA(IStrategy):
 
         if self.dataframeUtils is None:
             self.dataframeUtils = DataframeUtils()
+            # the incremental PCA accumulates rows over many updates, so they all have to be scaled the same way. A
+            # scaler without partial_fit() would be refitted to each window instead
+            if self.incremental_pca and not DataframeUtils.supports_incremental_scaling(self.scaler_type):
+                print(f"    WARN: {self.scaler_type.name} scaler cannot be updated incrementally. "
+                      f"Using Standard scaler for incremental PCA")
+                self.scaler_type = ScalerType.Standard
+            self.dataframeUtils.incremental_scaling = self.incremental_pca
+
+        if self.model_store is None:
+            self.model_store = ModelStore(self.__class__.__name__)
+
+        if self.training_scheduler is None:
+            self.training_scheduler = TrainingScheduler(train_interval=self.train_interval,
+                                                        max_workers=self.train_workers)
 
         if self.dataframePopulator is None:
             self.dataframePopulator = DataframePopulator()
@@ -358,6 +394,7 @@ class PCA(IStrategy):
             self.dataframePopulator.startup_win = self.startup_candle_count
             self.dataframePopulator.n_loss_stddevs = self.n_loss_stddevs
             self.dataframePopulator.n_profit_stddevs = self.n_profit_stddevs
+            self.dataframePopulator.required_columns = self.indicator_columns
 
         if self.first_time:
             self.first_time = False
@@ -376,24 +413,25 @@ class PCA(IStrategy):
         # if first time through for this pair, add entry to pair_model_info
         if not (curr_pair in self.pair_model_info):
             self.pair_model_info[curr_pair] = {
-                'interval': 0,
                 'pca_size': 0,
                 'pca': None,
                 'clf_buy_name': "",
                 'clf_buy': None,
                 'clf_sell_name': "",
-                'clf_sell': None
+                'clf_sell': None,
+                'pca_date': None,
+                'train_hash': ""
             }
         else:
-            # decrement interval. When this reaches 0 it will trigger re-fitting of the data
-            self.pair_model_info[curr_pair]['interval'] = self.pair_model_info[curr_pair]['interval'] - 1
+            # one more candle since the last training. The scheduler triggers re-fitting when the models are stale
+            self.training_scheduler.tick(curr_pair)
 
         # (re-)set the scaler
-        self.dataframeUtils.set_scaler_type(self.scaler_type)
+        self.dataframeUtils.set_scaler_type(self.scaler_type, curr_pair)
 
         # populate the normal dataframe
         # dataframe = self.add_indicators(dataframe)
-        dataframe = self.dataframePopulator.add_indicators(dataframe)
+        dataframe = self.dataframePopulator.add_indicators(dataframe, self.curr_pair, self.timeframe)
 
         buys, sells = self.create_training_data(dataframe)
 
@@ -442,30 +480,14 @@ class PCA(IStrategy):
     ################################
 
     # creates the buy/sell labels absed on looking ahead into the supplied dataframe
+    # The labels (and debug columns) are cached, so they are only recalculated when the data changes (see LabelCache)
+    # Models are only retrained when the training scheduler says so. Until then, the cached labels can just be extended
+    # with the new candles
     def create_training_data(self, dataframe: DataFrame):
-
-        future_df = self.dataframePopulator.add_hidden_indicators(dataframe.copy())
-        future_df = self.dataframePopulator.add_future_data(future_df, self.curr_lookahead)
-
-        future_df['train_buy'] = 0.0
-        future_df['train_sell'] = 0.0
-
-        # use sequence trends as criteria
-        future_df['train_buy'] = self.get_train_buy_signals(future_df)
-        future_df['train_sell'] = self.get_train_sell_signals(future_df)
-
-        buys = future_df['train_buy'].copy()
-        if buys.sum() < 3:
-            print("OOPS! <3 ({:.0f}) buy signals generated. Check training criteria".format(buys.sum()))
-
-        sells = future_df['train_sell'].copy()
-        if buys.sum() < 3:
-            print("OOPS! <3 ({:.0f}) sell signals generated. Check training criteria".format(sells.sum()))
-
-        self.save_debug_data(future_df)
-        self.save_debug_indicators(future_df)
-
-        return buys, sells
+        if self.label_cache is None:
+            self.label_cache = LabelCache()
+        return self.label_cache.get_training_data(self, dataframe, use_cache=self.use_label_cache,
+                                                  extend=not self.training_scheduler.is_due(self.curr_pair))
 
     def save_debug_data(self, future_df: DataFrame):
 
@@ -505,44 +527,116 @@ class PCA(IStrategy):
 
     def train_models(self, curr_pair, dataframe: DataFrame, buys, sells):
 
-        # only run if interval reaches 0 (no point retraining every camdle)
-        count = self.pair_model_info[curr_pair]['interval']
-        if (count > 0):
-            self.pair_model_info[curr_pair]['interval'] = count - 1
+        # only run if the models for this pair are due to be retrained (no point retraining every candle)
+        if not self.training_scheduler.is_due(curr_pair):
             return
+
+        # check for saved models. If the models were trained on exactly the same data, then just re-use them.
+        # In live/dry-run modes, the latest saved models are used until the pair is retrained (warm start)
+        train_hash = ""
+        if self.use_model_store:
+            train_hash = self.model_store.get_train_hash(dataframe, buys, sells, self.get_train_params())
+            if self.pair_model_info[curr_pair]['train_hash'] == train_hash:
+                self.training_scheduler.mark_trained(curr_pair)
+                return
+            if self.load_models(curr_pair, dataframe.columns, train_hash):
+                self.training_scheduler.mark_trained(curr_pair)
+                return
+            if (self.pair_model_info[curr_pair]['pca'] is None) and (self.dp.runmode.value in ('live', 'dry_run')):
+                if self.load_models(curr_pair, dataframe.columns):
+                    self.training_scheduler.mark_trained(curr_pair)
+                    return
+
+        features = dataframe.columns
+
+        # incremental mode: the PCA only needs the candles that arrived since the last update
+        prev_pca = None
+        new_rows = np.ones(dataframe.shape[0], dtype=bool)
+        if self.incremental_pca:
+            prev_pca = self.pair_model_info[curr_pair]['pca']
+            last_date = self.pair_model_info[curr_pair].get('pca_date', None)
+            if isinstance(prev_pca, StreamingPCA) and (last_date is not None):
+                new_rows = (dataframe['date'] > last_date).to_numpy()
+            else:
+                prev_pca = None
+        pca_date = dataframe['date'].iloc[-1] if 'date' in dataframe.columns else None
+
+        # in live/dry-run modes, train in the background and keep using the current models until that completes.
+        # Otherwise, train now (and reset the models, which makes it safe to just return on error)
+        background = self.train_in_background and (self.dp.runmode.value in ('live', 'dry_run'))
+        if not background:
+            self.install_models(curr_pair, self.get_empty_models(), features, "")
+
+        remove_outliers = False
+        if remove_outliers:
+            # norm dataframe before splitting, otherwise variances are skewed
+            full_df_norm = self.dataframeUtils.norm_dataframe(dataframe)
+            full_df_norm, buys, sells = self.dataframeUtils.remove_outliers(full_df_norm, buys, sells)
         else:
-            # reset interval to a random number between 1 and the amount of lookahead
-            # self.pair_model_info[curr_pair]['interval'] = random.randint(1, self.curr_lookahead)
-            self.pair_model_info[curr_pair]['interval'] = random.randint(2, max(32, self.curr_lookahead))
-
-        # Reset models for this pair. Makes it safe to just return on error
-        self.pair_model_info[curr_pair]['pca_size'] = 0
-        self.pair_model_info[curr_pair]['pca'] = None
-        self.pair_model_info[curr_pair]['clf_buy_name'] = ""
-        self.pair_model_info[curr_pair]['clf_buy'] = None
-        self.pair_model_info[curr_pair]['clf_sell_name'] = ""
-        self.pair_model_info[curr_pair]['clf_sell'] = None
+            full_df_norm = self.dataframeUtils.norm_dataframe(dataframe).clip(lower=-3.0, upper=3.0)  # supress outliers
+
+        # Note: normalisation is done here because the scaler is shared by all pairs. Everything after this only
+        # uses local data, so it can run in a background thread
+        pca_update = None
+        if self.incremental_pca:
+            pca_update = (prev_pca, full_df_norm[new_rows], pca_date)
+
+        def train_func():
+            return self.fit_models(curr_pair, full_df_norm, buys, sells, pca_update)
+
+        def install_func(models):
+            if models is not None:
+                self.install_models(curr_pair, models, features, train_hash)
+
+        if background:
+            self.training_scheduler.submit(curr_pair, train_func, install_func)
+        else:
+            self.training_scheduler.run(curr_pair, train_func, install_func)
+
+    # model entries of pair_model_info, with nothing trained
+    def get_empty_models(self) -> dict:
+        return {
+            'pca_size': 0,
+            'pca': None,
+            'clf_buy_name': "",
+            'clf_buy': None,
+            'clf_sell_name': "",
+            'clf_sell': None,
+            'pca_date': None
+        }
+
+    # install newly trained models for a pair. The pair's entry is replaced with a single assignment, so anything
+    # that takes a reference to the entry always sees a consistent set of models (even if training is in the
+    # background)
+    def install_models(self, pair, models: dict, features, train_hash):
+        info = dict(self.pair_model_info[pair])
+        info.update({key: value for key, value in models.items() if key != 'clf_scores'})
+        info['train_hash'] = train_hash
+        self.pair_model_info[pair] = info
+
+        self.update_classifier_stats(models.get('clf_scores', {}))
+
+        if self.use_model_store and (len(train_hash) > 0):
+            self.save_models(pair, features, train_hash)
+
+    # fit the PCA reduction and buy/sell classifiers to the (normalised) data.
+    # pca_update is (previous PCA, new rows, date of last row) in incremental mode, None otherwise.
+    # Returns a dict of the models (plus the classifier scan scores, if any), or None on error. Does not modify
+    # pair_model_info or classifier_stats, so is safe to run in the background
+    def fit_models(self, curr_pair, full_df_norm: DataFrame, buys, sells, pca_update=None):
 
         # check input - need at least 2 samples or classifiers will not train
         if buys.sum() < 2:
             print("*** ERR: insufficient buys in expected results. Check training data")
             # print(buys)
-            return
+            return None
 
         if sells.sum() < 2:
             print("*** ERR: insufficient sells in expected results. Check training data")
-            return
+            return None
 
         rand_st = 27  # use fixed number for reproducibility
 
-        remove_outliers = False
-        if remove_outliers:
-            # norm dataframe before splitting, otherwise variances are skewed
-            full_df_norm = self.dataframeUtils.norm_dataframe(dataframe)
-            full_df_norm, buys, sells = self.dataframeUtils.remove_outliers(full_df_norm, buys, sells)
-        else:
-            full_df_norm = self.dataframeUtils.norm_dataframe(dataframe).clip(lower=-3.0, upper=3.0)  # supress outliers
-
         # constrain size to what will be available in run modes
         data_size = int(min(975, full_df_norm.shape[0]))
 
@@ -577,7 +671,12 @@ class PCA(IStrategy):
 
         # create the PCA analysis model
 
-        pca = self.get_pca(df_train)
+        pca_date = None
+        if pca_update is None:
+            pca = self.get_pca(df_train)
+        else:
+            prev_pca, df_new, pca_date = pca_update
+            pca = self.update_pca(prev_pca, df_new)
 
         df_train_pca = DataFrame(pca.transform(df_train))
 
@@ -591,7 +690,7 @@ class PCA(IStrategy):
             print("df_train columns: ", df_train.columns.values)
             print("df_train_pca columns: ", df_train_pca.columns.values)
             print("***")
-            return
+            return None
 
         # Create buy/sell classifiers for the model
 
@@ -599,28 +698,21 @@ class PCA(IStrategy):
         buy_ratio = 100.0 * (train_buys.sum() / len(train_buys))
         if (buy_ratio < 0.5):
             print("*** ERR: insufficient number of positive buy labels ({:.2f}%)".format(buy_ratio))
-            return
+            return None
 
-        buy_clf, buy_clf_name = self.get_buy_classifier(df_train_pca, train_buy_labels)
+        clf_scores = {}
+        buy_clf, buy_clf_name = self.get_buy_classifier(df_train_pca, train_buy_labels, clf_scores)
 
         sell_ratio = 100.0 * (train_sells.sum() / len(train_sells))
         if (sell_ratio < 0.5):
             print("*** ERR: insufficient number of positive sell labels ({:.2f}%)".format(sell_ratio))
-            return
+            return None
 
-        sell_clf, sell_clf_name = self.get_sell_classifier(df_train_pca, train_sell_labels)
+        sell_clf, sell_clf_name = self.get_sell_classifier(df_train_pca, train_sell_labels, clf_scores)
 
         if self.dbg_verbose:
             print(f'    Classifiers - buy: {buy_clf_name} sell: {sell_clf_name}')
 
-        # save the models
-        self.pair_model_info[curr_pair]['pca'] = pca
-        self.pair_model_info[curr_pair]['pca_size'] = df_train_pca.shape[1]
-        self.pair_model_info[curr_pair]['clf_buy_name'] = buy_clf_name
-        self.pair_model_info[curr_pair]['clf_buy'] = buy_clf
-        self.pair_model_info[curr_pair]['clf_sell_name'] = sell_clf_name
-        self.pair_model_info[curr_pair]['clf_sell'] = sell_clf
-
         # if scan specified, test against the test dataframe
         if self.dbg_test_classifier and self.dbg_verbose:
 
@@ -639,8 +731,87 @@ class PCA(IStrategy):
                 print(classification_report(test_sell_labels, pred_sells))
                 print("")
 
+        return {
+            'pca': pca,
+            'pca_size': df_train_pca.shape[1],
+            'clf_buy_name': buy_clf_name,
+            'clf_buy': buy_clf,
+            'clf_sell_name': sell_clf_name,
+            'clf_sell': sell_clf,
+            'pca_date': pca_date,
+            'clf_scores': clf_scores
+        }
+
+    # parameters (other than the data) that affect training. Used to identify saved models
+    def get_train_params(self) -> dict:
+        return {
+            'strategy': self.__class__.__name__,
+            'lookahead': self.curr_lookahead,
+            'scaler_type': self.scaler_type.name,
+            'classifier': self.default_classifier.name,
+            'incremental_pca': self.incremental_pca,
+            'scan_classifiers': self.dbg_scan_classifiers,
+            'n_profit_stddevs': self.n_profit_stddevs,
+            'n_loss_stddevs': self.n_loss_stddevs
+        }
+
+    # save the models for a pair to the model store
+    def save_models(self, pair, features, train_hash):
+        info = {
+            # the scaler is refitted to each dataframe, it is saved for reference only
+            'scaler': self.dataframeUtils.scaler,
+            'pca': self.pair_model_info[pair]['pca'],
+            'pca_size': self.pair_model_info[pair]['pca_size'],
+            # names are saved as strings, so that loading does not depend on the ClassifierType enum
+            'clf_buy_name': getattr(self.pair_model_info[pair]['clf_buy_name'], 'name',
+                                    self.pair_model_info[pair]['clf_buy_name']),
+            'clf_buy': self.pair_model_info[pair]['clf_buy'],
+            'clf_sell_name': getattr(self.pair_model_info[pair]['clf_sell_name'], 'name',
+                                     self.pair_model_info[pair]['clf_sell_name']),
+            'clf_sell': self.pair_model_info[pair]['clf_sell'],
+            'pca_date': self.pair_model_info[pair].get('pca_date', None)
+        }
+        self.model_store.save(pair, info, features, train_hash)
+
+    # load the models for a pair from the model store. If train_hash is None, the latest saved models are used.
+    # Returns True if the models were loaded
+    def load_models(self, pair, features, train_hash=None) -> bool:
+        entry = self.model_store.load(pair, features, train_hash)
+        if entry is None:
+            return False
+
+        info = dict(self.pair_model_info[pair])
+        for key in ['pca', 'pca_size', 'clf_buy_name', 'clf_buy', 'clf_sell_name', 'clf_sell']:
+            info[key] = entry['info'][key]
+        info['pca_date'] = entry['info'].get('pca_date', None)
+        info['train_hash'] = entry['train_hash']
+        self.pair_model_info[pair] = info
+
+        print(f"    loaded saved models for {pair} (buy: {entry['info']['clf_buy_name']} "
+              f"sell: {entry['info']['clf_sell_name']})")
+        return True
+
     autoencoder = None
 
+    # update the (streaming) PCA model with new rows (must be normalised). Creates a new model if there isn't one.
+    # Note that the current model is not modified, it may still be in use
+    def update_pca(self, pca, df_new: DataFrame):
+
+        if isinstance(pca, StreamingPCA) and (pca.n_features_in_ == df_new.shape[1]):
+            pca = copy.deepcopy(pca)
+        else:
+            pca = StreamingPCA(variance_threshold=self.pca_variance_threshold, whiten=True)
+
+        pca = pca.partial_fit(df_new)
+        print(f"    PCA updated with {df_new.shape[0]} rows ({pca.n_samples_seen_} total)")
+
+        self.check_pca(pca, df_new)
+
+        if self.dbg_analyse_pca and self.dbg_verbose:
+            self.analyse_pca(pca, df_new)
+
+        return pca
+
     # get the PCA model for the supplied dataframe (dataframe must be normalised)
     def get_pca(self, df_norm: DataFrame):
 
@@ -653,26 +824,15 @@ class PCA(IStrategy):
 
         # there are various types of PCA, plus alternatives like ICA and Feature Extraction
         if pca_type == 0:
-            pca = skd.PCA(n_components=ncols, whiten=whiten, svd_solver='full').fit(df_norm)
-            var_ratios = pca.explained_variance_ratio_
+            # a fractional n_components keeps enough components to cover that fraction of the variance, and is
+            # chosen from the same decomposition (so there is no need to fit twice)
+            # pca = skd.PCA(n_components=ncols, svd_solver="randomized", whiten=True).fit(df_norm)
+            n_components = self.pca_variance_threshold if self.pca_variance_threshold < 1.0 else ncols
+            pca = skd.PCA(n_components=n_components, whiten=whiten, svd_solver='full').fit(df_norm)
 
             # if self.dbg_verbose:
             #     print ("PCA variance_ratio: ", pca.explained_variance_ratio_)
 
-            # scan variance and only take if column contributes >x%
-            ncols = 0
-            var_sum = 0.0
-            variance_threshold = 0.999
-            # variance_threshold = 0.99
-            while ((var_sum < variance_threshold) & (ncols < len(var_ratios))):
-                var_sum = var_sum + var_ratios[ncols]
-                ncols = ncols + 1
-
-            # if necessary, re-calculate pca with reduced column set
-            if (ncols != df_norm.shape[1]):
-                # pca = skd.PCA(n_components=ncols, svd_solver="randomized", whiten=True).fit(df_norm)
-                pca = skd.PCA(n_components=ncols, whiten=whiten, svd_solver='full').fit(df_norm)
-
             self.check_pca(pca, df_norm)
 
             if self.dbg_analyse_pca and self.dbg_verbose:
@@ -825,7 +985,7 @@ class PCA(IStrategy):
         # print(l3.head())
 
     # get a classifier for the supplied dataframe (normalised) and known results
-    def get_buy_classifier(self, df_norm: DataFrame, results):
+    def get_buy_classifier(self, df_norm: DataFrame, results, clf_scores=None):
 
         clf = None
         name = ""
@@ -837,24 +997,19 @@ class PCA(IStrategy):
             print("***")
             return clf, name
 
-        # If already done, just get previous result and re-fit
-        if self.pair_model_info[self.curr_pair]['clf_buy']:
-            clf = self.pair_model_info[self.curr_pair]['clf_buy']
-            clf = clf.fit(df_norm, labels)
-            name = self.pair_model_info[self.curr_pair]['clf_buy_name']
+        # Note: always a new classifier, the current one may still be in use (if training in the background)
+        if self.dbg_scan_classifiers:
+            if self.dbg_verbose:
+                print("    Finding best buy classifier:")
+            clf, name = self.find_best_classifier(df_norm, labels, tag="buy", clf_scores=clf_scores)
         else:
-            if self.dbg_scan_classifiers:
-                if self.dbg_verbose:
-                    print("    Finding best buy classifier:")
-                clf, name = self.find_best_classifier(df_norm, labels, tag="buy")
-            else:
-                clf, name = self.classifier_factory(self.default_classifier, df_norm, labels)
-                clf = clf.fit(df_norm, labels)
+            clf, name = self.classifier_factory(self.default_classifier, df_norm, labels)
+            clf = clf.fit(df_norm, labels)
 
         return clf, name
 
     # get a classifier for the supplied dataframe (normalised) and known results
-    def get_sell_classifier(self, df_norm: DataFrame, results):
+    def get_sell_classifier(self, df_norm: DataFrame, results, clf_scores=None):
 
         clf = None
         name = ""
@@ -866,19 +1021,14 @@ class PCA(IStrategy):
             print("***")
             return clf, name
 
-        # If already done, just get previous result and re-fit
-        if self.pair_model_info[self.curr_pair]['clf_sell']:
-            clf = self.pair_model_info[self.curr_pair]['clf_sell']
-            clf = clf.fit(df_norm, labels)
-            name = self.pair_model_info[self.curr_pair]['clf_sell_name']
+        # Note: always a new classifier, the current one may still be in use (if training in the background)
+        if self.dbg_scan_classifiers:
+            if self.dbg_verbose:
+                print("    Finding best sell classifier:")
+            clf, name = self.find_best_classifier(df_norm, labels, tag="sell", clf_scores=clf_scores)
         else:
-            if self.dbg_scan_classifiers:
-                if self.dbg_verbose:
-                    print("    Finding best sell classifier:")
-                clf, name = self.find_best_classifier(df_norm, labels, tag="sell")
-            else:
-                clf, name = self.classifier_factory(self.default_classifier, df_norm, labels)
-                clf = clf.fit(df_norm, labels)
+            clf, name = self.classifier_factory(self.default_classifier, df_norm, labels)
+            clf = clf.fit(df_norm, labels)
 
         return clf, name
 
@@ -957,8 +1107,9 @@ class PCA(IStrategy):
         return clf, name
 
     # tries different types of classifiers and returns the best one
-    # tag parameter identifies where to save performance stats (default is not to save)
-    def find_best_classifier(self, df, results, tag=""):
+    # tag parameter identifies where to save performance stats (default is not to save). The scores are added to
+    # clf_scores, and only go into classifier_stats when the models are installed (this can run in the background)
+    def find_best_classifier(self, df, results, tag="", clf_scores=None):
 
         if self.dbg_verbose:
             print("      Evaluating classifiers..")
@@ -995,19 +1146,24 @@ class PCA(IStrategy):
             print("    Insufficient +ve (test) results: ", res_test.sum())
             return None, ""
 
+        # create the candidates, and fit/score them in parallel
+        candidates = {}
         for cname in self.classifier_list:
             clf, _ = self.classifier_factory(cname, df_train, res_train)
-
             if clf is not None:
+                candidates[cname] = clf
 
-                # fit to the training data
-                clf_dict[cname] = clf
-                clf = clf.fit(df_train, res_train)
+        tournament = ClassifierTournament(max_workers=self.clf_scan_workers,
+                                          time_budget=self.clf_scan_time_budget,
+                                          halving=self.clf_scan_halving)
+        scores = tournament.run(candidates, df_train, res_train, df_test, res_test)
+
+        for cname in self.classifier_list:
+            if cname in scores:
 
-                # assess using the test data. Do *not* use the training data for testing
-                pred_test = clf.predict(df_test)
-                # score = f1_score(results, prediction, average=None)[1]
-                score = f1_score(res_test, pred_test, average='macro')
+                # the classifier has been fitted to the training data, and scored using the test data
+                clf, score = scores[cname]
+                clf_dict[cname] = clf
 
                 if self.dbg_verbose:
                     print("      {0:<20}: {1:.3f}".format(cname, score))
@@ -1016,18 +1172,9 @@ class PCA(IStrategy):
                     best_score = score
                     best_classifier = cname
 
-                # update classifier stats
-                if tag:
-                    if not (tag in self.classifier_stats):
-                        self.classifier_stats[tag] = {}
-
-                    if not (cname in self.classifier_stats[tag]):
-                        self.classifier_stats[tag][cname] = {'count': 0, 'score': 0.0, 'selected': 0}
-
-                    curr_count = self.classifier_stats[tag][cname]['count']
-                    curr_score = self.classifier_stats[tag][cname]['score']
-                    self.classifier_stats[tag][cname]['count'] = curr_count + 1
-                    self.classifier_stats[tag][cname]['score'] = (curr_score * curr_count + score) / (curr_count + 1)
+                # record classifier score
+                if tag and (clf_scores is not None):
+                    clf_scores.setdefault(tag, {'scores': {}, 'selected': ""})['scores'][cname] = score
 
         if best_score <= 0.0:
             print("   No classifier found")
@@ -1042,24 +1189,40 @@ class PCA(IStrategy):
             print("!!!")
             return None, ""
 
-        # update stats for selected classifier
-        if tag:
-            if best_classifier in self.classifier_stats[tag]:
-                self.classifier_stats[tag][best_classifier]['selected'] = self.classifier_stats[tag][best_classifier] \
-                                                                              ['selected'] + 1
+        # record selected classifier
+        if tag and (clf_scores is not None) and (tag in clf_scores):
+            clf_scores[tag]['selected'] = best_classifier
 
         print("       ", tag, " model selected: ", best_classifier, " Score:{:.3f}".format(best_score))
         # print("")
 
         return clf, best_classifier
 
+    # add the scores from a classifier scan (see find_best_classifier()) to the stats of each classifier type
+    def update_classifier_stats(self, clf_scores: dict):
+        with self.classifier_stats_lock:
+            for tag, tag_scores in clf_scores.items():
+                stats = self.classifier_stats.setdefault(tag, {})
+                for cname, score in tag_scores['scores'].items():
+                    if not (cname in stats):
+                        stats[cname] = {'count': 0, 'score': 0.0, 'selected': 0}
+
+                    curr_count = stats[cname]['count']
+                    curr_score = stats[cname]['score']
+                    stats[cname]['count'] = curr_count + 1
+                    stats[cname]['score'] = (curr_score * curr_count + score) / (curr_count + 1)
+
+                if tag_scores['selected'] in stats:
+                    stats[tag_scores['selected']]['selected'] = stats[tag_scores['selected']]['selected'] + 1
+
     # make predictions for supplied dataframe (returns column)
-    def predict(self, dataframe: DataFrame, pair, clf):
+    def predict(self, dataframe: DataFrame, pair, clf, pca=None):
 
         # predict = 0
         predict = None
 
-        pca = self.pair_model_info[pair]['pca']
+        if pca is None:
+            pca = self.pair_model_info[pair]['pca']
 
         if clf:
             # print("    predicting.. - dataframe:", dataframe.shape)
@@ -1074,17 +1237,19 @@ class PCA(IStrategy):
         return predict
 
     def predict_buy(self, df: DataFrame, pair):
-        clf = self.pair_model_info[pair]['clf_buy']
+        # take a reference to the models, in case they are replaced by (background) training
+        info = self.pair_model_info[pair]
+        clf = info['clf_buy']
 
         if clf is None:
             print("    No Buy Classifier for pair ", pair, " -Skipping predictions")
-            self.pair_model_info[pair]['interval'] = min(self.pair_model_info[pair]['interval'], 4)
+            self.training_scheduler.retrain_soon(pair, 4)
             predict = df['close'].copy()  # just to get the size
             predict = 0.0
             return predict
 
         print("    predicting buys..")
-        predict = self.predict(df, pair, clf)
+        predict = self.predict(df, pair, clf, info['pca'])
 
         # if self.dbg_test_classifier:
         #     # DEBUG: check accuracy
@@ -1107,16 +1272,18 @@ class PCA(IStrategy):
         return predict
 
     def predict_sell(self, df: DataFrame, pair):
-        clf = self.pair_model_info[pair]['clf_sell']
+        # take a reference to the models, in case they are replaced by (background) training
+        info = self.pair_model_info[pair]
+        clf = info['clf_sell']
         if clf is None:
             print("    No Sell Classifier for pair ", pair, " -Skipping predictions")
-            self.pair_model_info[pair]['interval'] = min(self.pair_model_info[pair]['interval'], 4)
+            self.training_scheduler.retrain_soon(pair, 4)
             predict = df['close']  # just to get the size
             predict = 0.0
             return predict
 
         print("    predicting sells..")
-        predict = self.predict(df, pair, clf)
+        predict = self.predict(df, pair, clf, info['pca'])
 
         # if self.dbg_test_classifier:
         #     # DEBUG: check accuracy
@@ -1182,37 +1349,41 @@ class PCA(IStrategy):
 
             print(table)
 
-        if len(self.classifier_stats) > 0:
+        # copy, the stats can be updated by the training threads
+        with self.classifier_stats_lock:
+            classifier_stats = copy.deepcopy(self.classifier_stats)
+
+        if len(classifier_stats) > 0:
             # print("Classifier Statistics:")
             # print("---------------------")
             print("")
-            if 'buy' in self.classifier_stats:
+            if 'buy' in classifier_stats:
                 print("")
                 table = PrettyTable(["Classifier", "Mean Score", "Selected"])
                 table.title = "Buy Classifiers"
                 table.align["Classifier"] = "l"
                 table.align["Mean Score"] = "c"
                 table.float_format = '.4'
-                for cls in self.classifier_stats['buy']:
+                for cls in classifier_stats['buy']:
                     table.add_row([cls,
-                                   self.classifier_stats['buy'][cls]['score'],
-                                   self.classifier_stats['buy'][cls]['selected']])
+                                   classifier_stats['buy'][cls]['score'],
+                                   classifier_stats['buy'][cls]['selected']])
                 table.reversesort = True
                 # table.sortby = 'Mean Score'
                 print(table.get_string(sort_key=operator.itemgetter(2, 1), sortby="Selected"))
                 print("")
 
-            if 'sell' in self.classifier_stats:
+            if 'sell' in classifier_stats:
                 print("")
                 table = PrettyTable(["Classifier", "Mean Score", "Selected"])
                 table.title = "Sell Classifiers"
                 table.align["Classifier"] = "l"
                 table.align["Mean Score"] = "c"
                 table.float_format = '.4'
-                for cls in self.classifier_stats['sell']:
+                for cls in classifier_stats['sell']:
                     table.add_row([cls,
-                                   self.classifier_stats['sell'][cls]['score'],
-                                   self.classifier_stats['sell'][cls]['selected']])
+                                   classifier_stats['sell'][cls]['score'],
+                                   classifier_stats['sell'][cls]['selected']])
                 table.reversesort = True
                 # table.sortby = 'Mean Score'
                 print(table.get_string(sort_key=operator.itemgetter(2, 1), sortby="Selected"))
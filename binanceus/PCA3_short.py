@@ -43,6 +43,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 from finta import TA as fta
 
 from sklearn.model_selection import RandomizedSearchCV, train_test_split
@@ -927,17 +928,8 @@ class PCA3_short(IStrategy):
 
     # returns (rolling) smoothed version of input column
     def roll_smooth(self, col) -> float:
-        # must return scalar, so just calculate prediction and take last value
-
-        # smooth = gaussian_filter1d(col, 4)
-        smooth = gaussian_filter1d(col, 2)
-
-        length = len(smooth)
-        if length > 0:
-            return smooth[length - 1]
-        else:
-            print("model:", smooth)
-            return 0.0
+        # must return scalar, i.e. the last value of the smoothed window (see rolling_models.gaussian_last)
+        return rm.gaussian_last(col, 2)
 
     def get_dwt(self, col):
 
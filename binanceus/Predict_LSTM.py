@@ -42,6 +42,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 from finta import TA as fta
 
 import keras
@@ -331,7 +332,7 @@ class Predict_LSTM(IStrategy):
         win_size = max(self.curr_lookahead, 14)
 
         dataframe['predict'] = self.batch_predictions(dataframe)
-        dataframe['predict_smooth'] = dataframe['predict'].rolling(window=win_size).apply(self.roll_strong_smooth)
+        dataframe['predict_smooth'] = rm.rolling_gaussian(dataframe['predict'], win_size, 24)
 
         dataframe['predict_diff'] = 100.0 * (dataframe['predict'] - dataframe['close']) / dataframe['close']
 
@@ -792,27 +793,12 @@ class Predict_LSTM(IStrategy):
 
     # returns (rolling) smoothed version of input column
     def roll_smooth(self, col) -> float:
-        # must return scalar, so just calculate prediction and take last value
-
-        smooth = gaussian_filter1d(col, 4)
-        # smooth = gaussian_filter1d(col, 2)
-
-        length = len(smooth)
-        if length > 0:
-            return smooth[length - 1]
-        else:
-            return col[len(col) - 1]
+        # must return scalar, i.e. the last value of the smoothed window (see rolling_models.gaussian_last)
+        return rm.gaussian_last(col, 4)
 
     def roll_strong_smooth(self, col) -> float:
-        # must return scalar, so just calculate prediction and take last value
-
-        smooth = gaussian_filter1d(col, 24)
-
-        length = len(smooth)
-        if length > 0:
-            return smooth[length - 1]
-        else:
-            return col[len(col) - 1]
+        # must return scalar, i.e. the last value of the smoothed window (see rolling_models.gaussian_last)
+        return rm.gaussian_last(col, 24)
 
     ################################
 
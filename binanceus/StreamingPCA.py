@@ -0,0 +1,101 @@
+#
+# PCA that can be updated with new data, without refitting to the whole dataset
+#
+# Keeps a running count, mean and scatter matrix (sum of squared deviations) of the data, and merges in each new batch
+# of rows (Chan et al. parallel update). The components come from an eigen-decomposition of the covariance matrix,
+# which is (ncols x ncols), so the cost of an update depends on the number of new rows and columns, not on how much
+# data has been seen.
+#
+# The number of components is chosen from the same decomposition, i.e. the smallest number that covers
+# variance_threshold of the total variance.
+#
+# Results (components, variance ratios, whitening) match sklearn.decomposition.PCA fitted to all of the data seen
+# so far, to within the sign of each component. transform() works the same way, so this can be used in place of it
+#
+
+import numpy as np
+
+
+class StreamingPCA():
+
+    variance_threshold = 0.999
+    whiten = True
+
+    def __init__(self, variance_threshold=0.999, whiten=True):
+        super().__init__()
+        self.variance_threshold = variance_threshold
+        self.whiten = whiten
+
+        self.n_samples_seen_ = 0
+        self.n_features_in_ = 0
+        self.mean_ = None
+        self.scatter_ = None
+
+        self.n_components_ = 0
+        self.components_ = None
+        self.explained_variance_ = None
+        self.explained_variance_ratio_ = None
+
+    # fit to the data, discarding anything seen previously
+    def fit(self, data):
+        self.n_samples_seen_ = 0
+        self.mean_ = None
+        self.scatter_ = None
+        return self.partial_fit(data)
+
+    # add data (rows) to the model, and recalculate the components
+    def partial_fit(self, data):
+        x = np.asarray(data, dtype=float)
+        nrows = x.shape[0]
+        if nrows == 0:
+            return self
+
+        batch_mean = x.mean(axis=0)
+        centred = x - batch_mean
+        batch_scatter = centred.T @ centred
+
+        if self.n_samples_seen_ == 0:
+            self.n_features_in_ = x.shape[1]
+            self.mean_ = batch_mean
+            self.scatter_ = batch_scatter
+            self.n_samples_seen_ = nrows
+        else:
+            total = self.n_samples_seen_ + nrows
+            delta = batch_mean - self.mean_
+            self.scatter_ = self.scatter_ + batch_scatter + \
+                            np.outer(delta, delta) * (self.n_samples_seen_ * nrows / total)
+            self.mean_ = self.mean_ + delta * (nrows / total)
+            self.n_samples_seen_ = total
+
+        self.decompose()
+        return self
+
+    # calculate components from the current covariance matrix
+    def decompose(self):
+        cov = self.scatter_ / max(self.n_samples_seen_ - 1, 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+
+        # eigh() returns ascending order, and can give tiny negative values for degenerate columns
+        order = np.argsort(eigenvalues)[::-1]
+        eigenvalues = np.clip(eigenvalues[order], 0.0, None)
+        eigenvectors = eigenvectors[:, order]
+
+        total_var = eigenvalues.sum()
+        ratios = eigenvalues / total_var if total_var > 0.0 else np.zeros_like(eigenvalues)
+
+        # smallest number of components that covers the variance threshold
+        ncols = int(np.searchsorted(np.cumsum(ratios), self.variance_threshold, side='left')) + 1
+        ncols = min(max(ncols, 1), len(ratios))
+
+        self.n_components_ = ncols
+        self.components_ = eigenvectors[:, :ncols].T
+        self.explained_variance_ = eigenvalues[:ncols]
+        self.explained_variance_ratio_ = ratios[:ncols]
+
+    def transform(self, data):
+        x = np.asarray(data, dtype=float) - self.mean_
+        x_pca = x @ self.components_.T
+        if self.whiten:
+            scale = np.sqrt(self.explained_variance_)
+            x_pca = x_pca / np.where(scale > 0.0, scale, 1.0)
+        return x_pca
@@ -0,0 +1,132 @@
+
+# Checks that batched predictions (ClassifierKeras.predict_batch() and BatchPredictor) give the same results as
+# running the predictions for each pair separately, and compares the time taken per candle as the number of pairs
+# grows.
+# The model is a small numpy network with a fixed overhead per call, which stands in for the dispatch/conversion
+# overhead of a real framework call (so that keras/tensorflow are not needed to run this)
+#
+# Usage: python TestBatchPredictor.py [call overhead (ms)]
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ClassifierKeras import ClassifierKeras
+from BatchPredictor import BatchPredictor
+
+
+class TestModel():
+    # single dense layer + sigmoid, applied to the flattened window
+
+    def __init__(self, seq_len, num_features, overhead):
+        rng = np.random.default_rng(0)
+        self.weights = rng.normal(0.0, 0.1, (seq_len * num_features,)).astype(np.float32)
+        self.overhead = overhead
+        self.calls = 0
+
+    def predict(self, tensor, verbose=0):
+        self.calls += 1
+        time.sleep(self.overhead)
+        x = np.asarray(tensor).reshape(np.shape(tensor)[0], -1) @ self.weights
+        return (1.0 / (1.0 + np.exp(-x))).reshape(-1, 1)
+
+
+class TestClassifier(ClassifierKeras):
+    batch_predictions = True
+
+    def predict(self, data):
+        tensor = self.dataframeUtils.to_dtype(data)
+        return self.process_predictions(self.model.predict(tensor, verbose=0), tensor)
+
+    # threshold depends on the whole input, like ClassifierKerasBinary, so batches must be split before this
+    def process_predictions(self, preds, tensor):
+        preds = preds[:, 0]
+        return np.where(preds > np.median(preds), 1.0, 0.0)
+
+
+# no process_predictions(), so predict_batch() has to fall back to predict() for each input
+class TestUnbatchedClassifier(ClassifierKeras):
+    batch_predictions = True
+
+    def predict(self, data):
+        return self.model.predict(self.dataframeUtils.to_dtype(data), verbose=0)[:, 0]
+
+
+def get_inputs(num_pairs, nrows, seq_len, num_features):
+    rng = np.random.default_rng(42)
+    date = pd.Timestamp("2022-06-01 12:00", tz='UTC')
+    return {"PAIR{}/USD".format(i): (date, rng.normal(0.0, 1.0, (nrows, seq_len, num_features)).astype(np.float32))
+            for i in range(num_pairs)}
+
+
+def main():
+    overhead = (float(sys.argv[1]) if len(sys.argv) > 1 else 20.0) / 1000.0
+    seq_len = 8
+    num_features = 64
+    all_ok = True
+
+    clf = TestClassifier("BTC/USD", seq_len, num_features)
+    clf.model = TestModel(seq_len, num_features, overhead)
+    batcher = BatchPredictor()
+
+    # 1. results are the same as predicting each pair separately (whole dataframe, e.g. NNBC)
+    inputs = get_inputs(8, 500, seq_len, num_features)
+    expected = {pair: clf.predict(data) for pair, (date, data) in inputs.items()}
+    clf.model.calls = 0
+    batcher.run(clf, inputs)
+    ok = (clf.model.calls == 1)
+    for pair, (date, data) in inputs.items():
+        ok = ok and np.array_equal(expected[pair], batcher.get(clf, pair, date))
+    print("batch matches per-pair predictions: {}".format("OK" if ok else "FAIL"))
+    all_ok = all_ok and ok
+
+    # 2. results are only returned for the candle they were calculated for
+    pair, (date, _) = next(iter(inputs.items()))
+    ok = (batcher.get(clf, pair, date + pd.Timedelta(minutes=5)) is None) and \
+         (batcher.get(clf, "UNKNOWN/USD", date) is None)
+    print("stale/missing results are ignored:  {}".format("OK" if ok else "FAIL"))
+    all_ok = all_ok and ok
+
+    # 3. a pair only needs to be run again when it has a new candle (bot loops are more frequent than candles)
+    ok = batcher.has_result(clf, pair, date) and (not batcher.has_result(clf, pair, date + pd.Timedelta(minutes=5)))
+    print("new candle needed to re-run:        {}".format("OK" if ok else "FAIL"))
+    all_ok = all_ok and ok
+
+    # 4. classifiers without process_predictions() still give the per-pair results
+    unbatched = TestUnbatchedClassifier("BTC/USD", seq_len, num_features)
+    unbatched.model = TestModel(seq_len, num_features, 0.0)
+    data_list = [data for (date, data) in inputs.values()]
+    results = unbatched.predict_batch(data_list)
+    ok = (unbatched.model.calls == len(data_list)) and \
+         all(np.array_equal(result, unbatched.predict(data)) for result, data in zip(results, data_list))
+    print("fallback to per-input predict():    {}".format("OK" if ok else "FAIL"))
+    all_ok = all_ok and ok
+
+    # 5. time per candle, latest window only (e.g. NNPredict)
+    print("")
+    print("{:>6} {:>16} {:>16}".format("pairs", "per-pair (ms)", "batched (ms)"))
+    for num_pairs in [1, 5, 10, 20, 40, 80]:
+        inputs = {pair: (date, data[-1:]) for pair, (date, data) in
+                  get_inputs(num_pairs, seq_len, seq_len, num_features).items()}
+
+        start = time.perf_counter()
+        for pair, (date, data) in inputs.items():
+            clf.predict(data)
+        t_single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batcher.run(clf, inputs)
+        for pair, (date, data) in inputs.items():
+            batcher.get(clf, pair, date)
+        t_batch = time.perf_counter() - start
+
+        print("{:>6} {:>16.1f} {:>16.1f}".format(num_pairs, 1000.0 * t_single, 1000.0 * t_batch))
+
+    print("")
+    print("PASSED" if all_ok else "FAILED")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,11 @@
 
+import time
+import tracemalloc
+
 import numpy as np
 
+from DataframeUtils import DataframeUtils
+
 
 def chunkify(data, seq_len):
     # input format = [nrows, nfeatures] output = [nrows, seq_len, nfeatures]
@@ -33,7 +38,7 @@ def chunkify(data, seq_len):
 
     # print("data: ", data)
     # print("chunked: ", chunked_array)
-    print("data:{} chunked:{}".format(np.shape(data), np.shape(chunked_array)))
+    # print("data:{} chunked:{}".format(np.shape(data), np.shape(chunked_array)))
     return chunked_array
 
 def main():
@@ -74,5 +79,58 @@ def main():
         print(chunk2[i])
     print("")
 
+# check that DataframeUtils.df_to_tensor() gives the same results as chunkify()
+def compare():
+    dataframeUtils = DataframeUtils()
+    all_ok = True
+    for nrows, nfeatures, seq_len in [(12, 6, 4), (1000, 20, 8), (500, 1, 12), (8, 3, 8)]:
+        data = np.random.default_rng(0).normal(size=(nrows, nfeatures))
+        expected = chunkify(data, seq_len)
+        # the default dtype is DataframeUtils.data_dtype (float32), so ask for float64 to get an exact match
+        actual = dataframeUtils.df_to_tensor(data, seq_len, dtype=np.float64)
+        ok = np.array_equal(expected, actual) and actual.flags.writeable and actual.flags.c_contiguous
+        ok = ok and np.array_equal(expected, dataframeUtils.df_to_tensor(data, seq_len, dtype=np.float64,
+                                                                         materialize=False))
+        ok = ok and np.allclose(expected, dataframeUtils.df_to_tensor(data, seq_len), rtol=1e-6, atol=1e-6)
+        ok = ok and (dataframeUtils.df_to_tensor(data, seq_len).dtype == dataframeUtils.data_dtype)
+        ok = ok and np.allclose(expected, dataframeUtils.df_to_tensor(data, seq_len, dtype=np.float32))
+        print("compare rows:{} features:{} seq_len:{} - {}".format(nrows, nfeatures, seq_len,
+                                                                   "OK" if ok else "*** MISMATCH ***"))
+        all_ok = all_ok and ok
+    return all_ok
+
+
+# time & memory for a large dataset
+def benchmark(nrows=100000, nfeatures=80, seq_len=8):
+    dataframeUtils = DataframeUtils()
+    data = np.random.default_rng(0).normal(size=(nrows, nfeatures))
+
+    print("")
+    print("benchmark rows:{} features:{} seq_len:{}".format(nrows, nfeatures, seq_len))
+
+    tests = [
+        ("chunkify (old)", lambda: chunkify(data, seq_len)),
+        ("df_to_tensor (view, float64)", lambda: dataframeUtils.df_to_tensor(data, seq_len, dtype=np.float64,
+                                                                            materialize=False)),
+        ("df_to_tensor (view, float32)", lambda: dataframeUtils.df_to_tensor(data, seq_len, dtype=np.float32,
+                                                                            materialize=False)),
+        ("df_to_tensor (float64)", lambda: dataframeUtils.df_to_tensor(data, seq_len, dtype=np.float64)),
+        ("df_to_tensor (float32)", lambda: dataframeUtils.df_to_tensor(data, seq_len, dtype=np.float32)),
+    ]
+
+    for name, func in tests:
+        tracemalloc.start()
+        start = time.perf_counter()
+        tensor = func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print("    {:<30} {:8.3f}s  peak:{:8.1f}MB".format(name, elapsed, peak / 1e6))
+        del tensor
+
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
+    print("")
+    print("PASSED" if compare() else "FAILED")
+    benchmark()
\ No newline at end of file
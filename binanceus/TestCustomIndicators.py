@@ -0,0 +1,249 @@
+
+# Checks that the numpy versions of the indicators in custom_indicators.py give the same results as the original
+# (DataFrame copy) versions, and compares the memory allocated by each
+# The original versions copied the whole dataframe and then added scratch columns, so the allocation scales with
+# the number of columns in the dataframe, not just the number of rows. Strategies call these after adding all of their
+# other indicators, so the test frame has lots of (dummy) columns
+#
+# Memory is measured with tracemalloc (numpy and pandas report their buffers to it). 'peak' is the peak memory
+# allocated during the call, and is also shown in units of one column (nrows * 8 bytes), i.e. roughly the number
+# of column-sized arrays that were alive at the same time
+#
+# Usage: python TestCustomIndicators.py [nrows] [ncols]
+
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import talib.abstract as ta
+from pandas import DataFrame
+
+import custom_indicators as cta
+
+
+# reference implementations, copied from the original custom_indicators.py
+
+def same_length(bigger, shorter):
+    return np.concatenate((np.full((bigger.shape[0] - shorter.shape[0]), np.nan), shorter))
+
+
+def zema(dataframe, period, field='close'):
+    df = dataframe.copy()
+
+    df['ema1'] = ta.EMA(df[field], timeperiod=period)
+    df['ema2'] = ta.EMA(df['ema1'], timeperiod=period)
+    df['d'] = df['ema1'] - df['ema2']
+    df['zema'] = df['ema1'] + df['d']
+
+    return df['zema']
+
+
+def RMI(dataframe, *, length=20, mom=5):
+    df = dataframe.copy()
+
+    df['maxup'] = (df['close'] - df['close'].shift(mom)).clip(lower=0)
+    df['maxdown'] = (df['close'].shift(mom) - df['close']).clip(lower=0)
+
+    df.fillna(0, inplace=True)
+
+    df["emaInc"] = ta.EMA(df, price='maxup', timeperiod=length)
+    df["emaDec"] = ta.EMA(df, price='maxdown', timeperiod=length)
+
+    df['RMI'] = np.where(df['emaDec'] == 0, 0, 100 - 100 / (1 + df["emaInc"] / df["emaDec"]))
+
+    return df["RMI"]
+
+
+def mastreak(dataframe: DataFrame, period: int = 4, field='close'):
+    df = dataframe.copy()
+
+    avgval = zema(df, period, field)
+
+    arr = np.diff(avgval)
+    pos = np.clip(arr, 0, 1).astype(bool).cumsum()
+    neg = np.clip(arr, -1, 0).astype(bool).cumsum()
+    streak = np.where(arr >= 0, pos - np.maximum.accumulate(np.where(arr <= 0, pos, 0)),
+                      -neg + np.maximum.accumulate(np.where(arr >= 0, neg, 0)))
+
+    res = same_length(df['close'], streak)
+
+    return res
+
+
+def pcc(dataframe: DataFrame, period: int = 20, mult: int = 2):
+    df = dataframe.copy()
+
+    df['previous_close'] = df['close'].shift()
+
+    df['close_change'] = (df['close'] - df['previous_close']) / df['previous_close'] * 100
+    df['high_change'] = (df['high'] - df['close']) / df['close'] * 100
+    df['low_change'] = (df['low'] - df['close']) / df['close'] * 100
+
+    df['delta'] = df['high_change'] - df['low_change']
+
+    mid = zema(df, period, 'close_change')
+    rangema = zema(df, period, 'delta')
+
+    upper = mid + rangema * mult
+    lower = mid - rangema * mult
+
+    return upper, rangema, lower
+
+
+def SSLChannels(dataframe, length=10, mode='sma'):
+    df = dataframe.copy()
+
+    df['smaHigh'] = df['high'].rolling(length).mean()
+    df['smaLow'] = df['low'].rolling(length).mean()
+
+    df['hlv'] = np.where(df['close'] > df['smaHigh'], 1,
+                         np.where(df['close'] < df['smaLow'], -1, np.nan))
+    df['hlv'] = df['hlv'].ffill()
+
+    df['sslDown'] = np.where(df['hlv'] < 0, df['smaHigh'], df['smaLow'])
+    df['sslUp'] = np.where(df['hlv'] < 0, df['smaLow'], df['smaHigh'])
+
+    return df['sslDown'], df['sslUp']
+
+
+def SSLChannels_ATR(dataframe, length=7):
+    df = dataframe.copy()
+
+    df['ATR'] = ta.ATR(df, timeperiod=14)
+    df['smaHigh'] = df['high'].rolling(length).mean() + df['ATR']
+    df['smaLow'] = df['low'].rolling(length).mean() - df['ATR']
+    df['hlv'] = np.where(df['close'] > df['smaHigh'], 1, np.where(df['close'] < df['smaLow'], -1, np.nan))
+    df['hlv'] = df['hlv'].ffill()
+    df['sslDown'] = np.where(df['hlv'] < 0, df['smaHigh'], df['smaLow'])
+    df['sslUp'] = np.where(df['hlv'] < 0, df['smaLow'], df['smaHigh'])
+
+    return df['sslDown'], df['sslUp']
+
+
+def WaveTrend(dataframe, chlen=10, avg=21, smalen=4):
+    df = dataframe.copy()
+
+    df['hlc3'] = (df['high'] + df['low'] + df['close']) / 3
+    df['esa'] = ta.EMA(df['hlc3'], timeperiod=chlen)
+    df['d'] = ta.EMA((df['hlc3'] - df['esa']).abs(), timeperiod=chlen)
+    df['ci'] = (df['hlc3'] - df['esa']) / (0.015 * df['d'])
+    df['tci'] = ta.EMA(df['ci'], timeperiod=avg)
+
+    df['wt1'] = df['tci']
+    df['wt2'] = ta.SMA(df['wt1'], timeperiod=smalen)
+    df['wt1-wt2'] = df['wt1'] - df['wt2']
+
+    return df['wt1'], df['wt2']
+
+
+def T3(dataframe, length=5):
+    df = dataframe.copy()
+
+    df['xe1'] = ta.EMA(df['close'], timeperiod=length)
+    df['xe2'] = ta.EMA(df['xe1'], timeperiod=length)
+    df['xe3'] = ta.EMA(df['xe2'], timeperiod=length)
+    df['xe4'] = ta.EMA(df['xe3'], timeperiod=length)
+    df['xe5'] = ta.EMA(df['xe4'], timeperiod=length)
+    df['xe6'] = ta.EMA(df['xe5'], timeperiod=length)
+    b = 0.7
+    c1 = -b*b*b
+    c2 = 3*b*b+3*b*b*b
+    c3 = -6*b*b-3*b-3*b*b*b
+    c4 = 1+3*b+b*b*b+3*b*b
+    df['T3Average'] = c1 * df['xe6'] + c2 * df['xe5'] + c3 * df['xe4'] + c4 * df['xe3']
+
+    return df['T3Average']
+
+
+def SROC(dataframe, roclen=21, emalen=13, smooth=21):
+    df = dataframe.copy()
+
+    roc = ta.ROC(df, timeperiod=roclen)
+    ema = ta.EMA(df, timeperiod=emalen)
+    sroc = ta.ROC(ema, timeperiod=smooth)
+
+    return sroc
+
+
+# (name, original, new)
+indicators = [
+    ("zema", lambda df: zema(df, 20), lambda df: cta.zema(df, 20)),
+    ("RMI", lambda df: RMI(df, length=24, mom=5), lambda df: cta.RMI(df, length=24, mom=5)),
+    ("mastreak", lambda df: mastreak(df, period=4), lambda df: cta.mastreak(df, period=4)),
+    ("pcc", lambda df: pcc(df), lambda df: cta.pcc(df)),
+    ("SSLChannels", lambda df: SSLChannels(df, 10), lambda df: cta.SSLChannels(df, 10)),
+    ("SSLChannels_ATR", lambda df: SSLChannels_ATR(df, 21), lambda df: cta.SSLChannels_ATR(df, 21)),
+    ("WaveTrend", lambda df: WaveTrend(df), lambda df: cta.WaveTrend(df)),
+    ("T3", lambda df: T3(df), lambda df: cta.T3(df)),
+    ("SROC", lambda df: SROC(df, roclen=21, emalen=13, smooth=21), lambda df: cta.SROC(df, roclen=21, emalen=13, smooth=21)),
+]
+
+
+def get_dataframe(nrows, ncols):
+    # random walk, with a gap, plus enough extra columns to look like a populated strategy dataframe
+    rng = np.random.default_rng(42)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, nrows)))
+    close[nrows // 3] = np.nan
+    spread = np.abs(rng.normal(0.0, 0.005, nrows)) * close
+    data = {
+        'date': pd.date_range("2022-01-01", periods=nrows, freq="5min"),
+        'open': close,
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.uniform(1.0, 100.0, nrows)
+    }
+    for i in range(ncols):
+        data['ind_{}'.format(i)] = rng.normal(0.0, 1.0, nrows)
+    return DataFrame(data)
+
+
+def measure(func, df):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    result = func(df)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak - base
+
+
+def same(expected, actual):
+    if isinstance(expected, tuple):
+        return all(same(e, a) for e, a in zip(expected, actual))
+    return np.allclose(np.asarray(expected, dtype=float), np.asarray(actual, dtype=float), rtol=1e-12, atol=1e-12,
+                       equal_nan=True)
+
+
+def main():
+    nrows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    ncols = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    df = get_dataframe(nrows, ncols)
+    col_bytes = nrows * 8
+
+    print("{} rows, {} columns ({:.1f} MB)".format(nrows, df.shape[1], df.memory_usage(deep=True).sum() / 1e6))
+    print("")
+    print("{:<16} {:>6} {:>20} {:>20} {:>16}".format("indicator", "match", "peak MB (cols) orig", "peak MB (cols) new",
+                                                    "time(ms) orig/new"))
+
+    all_ok = True
+    for name, orig, new in indicators:
+        expected, t_orig, m_orig = measure(orig, df)
+        actual, t_new, m_new = measure(new, df)
+        ok = same(expected, actual)
+        all_ok = all_ok and ok
+        print("{:<16} {:>6} {:>12.1f} ({:>5.0f}) {:>12.1f} ({:>5.0f}) {:>8.1f}/{:<7.1f}".format(
+            name, "OK" if ok else "FAIL",
+            m_orig / 1e6, m_orig / col_bytes, m_new / 1e6, m_new / col_bytes,
+            1000.0 * t_orig, 1000.0 * t_new))
+
+    print("")
+    print("PASSED" if all_ok else "FAILED")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+
+# Checks that DartsBacktester gives the same results as darts historical_forecasts(retrain=False,
+# last_points_only=True), and compares the time taken by each.
+# Small models are trained for 1 epoch on random data, since only the equivalence matters here
+#
+# Usage: python TestDartsBacktester.py [num_samples]
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from darts import TimeSeries
+from darts.models import NBEATSModel, NLinearModel
+
+from DartsBacktester import DartsBacktester
+
+
+def get_series(num_samples, num_features):
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({'date': pd.date_range("2022-01-01", periods=num_samples, freq="5min")})
+    df['close'] = 100.0 + np.cumsum(rng.normal(0.0, 1.0, num_samples))
+    for i in range(num_features - 1):
+        df[f'f{i}'] = rng.normal(0.0, 1.0, num_samples)
+
+    target = TimeSeries.from_dataframe(df, time_col='date', value_cols='close').astype(np.float32)
+    covariates = TimeSeries.from_dataframe(df, time_col='date').astype(np.float32)
+    return target, covariates
+
+
+def main():
+    num_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    seq_len = 32
+    lookahead = 8
+    trainer_args = {'accelerator': 'cpu', 'enable_progress_bar': False, 'logger': False,
+                    'enable_model_summary': False}
+
+    target, covariates = get_series(num_samples, 16)
+    models = [
+        NBEATSModel(input_chunk_length=seq_len, output_chunk_length=lookahead, num_stacks=4, num_blocks=1,
+                    layer_widths=64, n_epochs=1, pl_trainer_kwargs=trainer_args),
+        NLinearModel(input_chunk_length=seq_len, output_chunk_length=lookahead, n_epochs=1,
+                     pl_trainer_kwargs=trainer_args)
+    ]
+
+    backtester = DartsBacktester()
+    all_ok = True
+
+    print("")
+    print("{:<14} {:>8} {:>8} {:>12} {:>16} {:>12} {:>6}".format("model", "horizon", "points", "max diff",
+                                                                 "darts (ms)", "fast (ms)", "match"))
+    for model in models:
+        model.fit(target, past_covariates=covariates, verbose=False)
+
+        for horizon in [1, lookahead]:
+            start = time.perf_counter()
+            expected = model.historical_forecasts(target, past_covariates=covariates, forecast_horizon=horizon,
+                                                  last_points_only=True, retrain=False, verbose=False)
+            t_darts = time.perf_counter() - start
+
+            start = time.perf_counter()
+            preds, first = backtester.backtest(model, target.values(), covariates.values(), horizon)
+            t_fast = time.perf_counter() - start
+
+            # same candles, same values (allowing for float32 rounding)
+            expected_values = expected.values()[:, 0]
+            ok = backtester.supports(model, horizon) and \
+                 (expected.start_time() == target.time_index[first]) and \
+                 (len(expected_values) == len(preds))
+            diff = np.max(np.abs(expected_values - preds[:, 0])) if ok else np.nan
+            ok = ok and bool(np.allclose(expected_values, preds[:, 0], rtol=1e-5, atol=1e-5))
+            all_ok = all_ok and ok
+
+            print("{:<14} {:>8} {:>8} {:>12.2e} {:>16.1f} {:>12.1f} {:>6}".format(
+                model.__class__.__name__, horizon, len(preds), diff, 1000.0 * t_darts, 1000.0 * t_fast,
+                "OK" if ok else "FAIL"))
+
+    # models that need auto-regression are not handled
+    ok = not backtester.supports(models[0], lookahead + 1)
+    print("")
+    print("horizon > output_chunk_length not supported: {}".format("OK" if ok else "FAIL"))
+    all_ok = all_ok and ok
+
+    print("")
+    print("PASSED" if all_ok else "FAILED")
+
+
+if __name__ == '__main__':
+    main()
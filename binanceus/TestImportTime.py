@@ -0,0 +1,81 @@
+
+# Measures the time (and memory) taken to import each strategy module, and shows which of the heavy ML frameworks
+# get loaded as a result. freqtrade imports every strategy file that it finds, so this is a rough measure of how much
+# each strategy adds to bot startup (and list-strategies etc.)
+# Each module is imported in a fresh interpreter, so the results do not depend on the order
+#
+# Usage: python TestImportTime.py [module ...]
+#        (default is all of the strategy files in this directory)
+
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+frameworks = ['tensorflow', 'keras', 'torch', 'darts', 'pytorch_lightning', 'xgboost', 'ray']
+
+# runs in the child process
+probe = """
+import json, resource, sys, time
+sys.path.insert(0, {dir!r})
+start = time.perf_counter()
+error = ""
+try:
+    import {module}
+except BaseException as e:
+    error = type(e).__name__ + ": " + str(e)
+elapsed = time.perf_counter() - start
+loaded = [f for f in {frameworks!r} if f in sys.modules]
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{'time': elapsed, 'peak': peak, 'loaded': loaded, 'error': error}}))
+"""
+
+
+# strategies, and subclasses of the base strategies (NNPredict_* etc.). Test scripts are skipped
+strategy_class = re.compile(r"^class \w+\((IStrategy|NNPredict|NNBC|NNTC|Anomaly|PCA)\)", re.MULTILINE)
+
+
+def get_strategy_modules(strat_dir: Path) -> list:
+    modules = []
+    for path in sorted(strat_dir.glob("*.py")):
+        if path.stem.startswith("Test"):
+            continue
+        if strategy_class.search(path.read_text(errors='ignore')):
+            modules.append(path.stem)
+    return modules
+
+
+def time_import(strat_dir: Path, module: str) -> dict:
+    code = probe.format(dir=str(strat_dir), module=module, frameworks=frameworks)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if len(lines) == 0:
+        return {'time': 0.0, 'peak': 0.0, 'loaded': [], 'error': " ".join(result.stderr.strip().splitlines()[-1:])}
+    return json.loads(lines[-1])
+
+
+def main():
+    strat_dir = Path(__file__).parent.resolve()
+    modules = sys.argv[1:] if len(sys.argv) > 1 else get_strategy_modules(strat_dir)
+
+    # baseline: the interpreter itself
+    baseline = time_import(strat_dir, "sys")
+
+    print("{:<28} {:>8} {:>10}  {}".format("module", "time(s)", "peak(MB)", "frameworks loaded"))
+    total = 0.0
+    for module in modules:
+        res = time_import(strat_dir, module)
+        total += res['time']
+        if res['error']:
+            status = "(import failed: {})".format(res['error'])
+        else:
+            status = ", ".join(res['loaded']) if res['loaded'] else "-"
+        print("{:<28} {:8.3f} {:10.1f}  {}".format(module, res['time'], res['peak'] - baseline['peak'], status))
+
+    print("")
+    print("total import time: {:.2f}s ({} modules)".format(total, len(modules)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+
+# Checks that StreamingPCA, updated with several batches of data (partial_fit), gives the same results as
+# sklearn.decomposition.PCA fitted to all of the data at once: number of components, variances & ratios, components
+# (to within the sign of each one) and the (whitened) transform
+#
+# Usage: python TestStreamingPCA.py
+
+import numpy as np
+import sklearn.decomposition as skd
+
+from StreamingPCA import StreamingPCA
+
+
+# correlated columns with a range of variances, so that the variance threshold actually removes components
+def get_data(nrows, ncols, rng):
+    latent = rng.normal(0.0, 1.0, (nrows, ncols)) * np.geomspace(10.0, 0.01, ncols)
+    mixing = rng.normal(0.0, 1.0, (ncols, ncols))
+    return latent @ mixing + rng.normal(0.0, 5.0, ncols)
+
+
+def compare(name, expected, actual, tol=1e-6) -> bool:
+    ok = (np.shape(expected) == np.shape(actual)) and np.allclose(expected, actual, rtol=tol, atol=tol)
+    print("{:<40} {}".format(name, "OK" if ok else "FAIL"))
+    return ok
+
+
+# check against sklearn, after fitting the data in batches
+def check(name, data, batch_sizes, variance_threshold, whiten) -> bool:
+    n_components = variance_threshold if variance_threshold < 1.0 else data.shape[1]
+    expected = skd.PCA(n_components=n_components, whiten=whiten, svd_solver='full').fit(data)
+
+    pca = StreamingPCA(variance_threshold=variance_threshold, whiten=whiten)
+    start = 0
+    for size in batch_sizes:
+        pca.partial_fit(data[start:start + size])
+        start += size
+    pca.partial_fit(data[start:])
+
+    # components are only defined to within their sign
+    signs = np.sign(np.sum(expected.components_ * pca.components_, axis=1)) if \
+        expected.components_.shape == pca.components_.shape else 1.0
+
+    print(f"{name}: {len(batch_sizes) + 1} batches, {pca.n_components_} components")
+    ok = compare("    n_samples_seen", data.shape[0], pca.n_samples_seen_)
+    ok = compare("    n_components", expected.n_components_, pca.n_components_) and ok
+    ok = compare("    mean", expected.mean_, pca.mean_) and ok
+    ok = compare("    explained_variance", expected.explained_variance_, pca.explained_variance_) and ok
+    ok = compare("    explained_variance_ratio", expected.explained_variance_ratio_,
+                 pca.explained_variance_ratio_) and ok
+    ok = compare("    components", expected.components_, pca.components_ * np.reshape(signs, (-1, 1))) and ok
+    ok = compare("    transform", expected.transform(data), pca.transform(data) * signs) and ok
+    return ok
+
+
+def main():
+    rng = np.random.default_rng(42)
+    all_ok = True
+
+    data = get_data(2000, 12, rng)
+    all_ok = check("all components", data, [500, 700, 1, 300], 1.0, True) and all_ok
+    all_ok = check("variance threshold", data, [500, 700, 1, 300], 0.99, True) and all_ok
+    all_ok = check("no whitening", data, [100] * 10, 0.999, False) and all_ok
+    all_ok = check("single batch", data, [], 0.999, True) and all_ok
+
+    # fit() discards earlier data
+    pca = StreamingPCA(variance_threshold=0.99).partial_fit(get_data(500, 12, rng)).fit(data)
+    expected = StreamingPCA(variance_threshold=0.99).fit(data)
+    all_ok = compare("fit() after partial_fit()", expected.explained_variance_, pca.explained_variance_) and all_ok
+
+    print("")
+    print("PASSED" if all_ok else "FAILED")
+
+
+if __name__ == '__main__':
+    main()
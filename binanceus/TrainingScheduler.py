@@ -0,0 +1,126 @@
+#
+# Schedules (re-)training of per-pair models across all pairs of a strategy
+#
+# Instead of each pair retraining after a random number of candles, the scheduler tracks how stale each pair's models
+# are (candles since the last training) and how long training takes for that pair. A pair becomes due once it has
+# gone train_interval candles without training.
+#
+# Training jobs can either be run immediately (backtest, hyperopt etc.), or submitted to a pool of background threads
+# (live/dry-run), so that populate_indicators() does not have to wait for training. max_workers is the CPU budget,
+# i.e. the max number of trainings that run at the same time. If there are more jobs than workers, the most stale
+# pairs go first (with ties going to the pair that trains fastest). If a pair is submitted again before its previous
+# job has started, the new job (i.e. the latest data) replaces the old one.
+#
+# Each job is a function that returns the trained models, plus a function that installs them. The install function
+# is called from the worker thread, so it should swap the models in with a single assignment
+#
+
+import concurrent.futures
+import threading
+import time
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class TrainingScheduler():
+
+    train_interval = 16  # candles between retrains of a pair
+    max_workers = 1
+
+    def __init__(self, train_interval=16, max_workers=1):
+        super().__init__()
+        self.train_interval = train_interval
+        self.max_workers = max(max_workers, 1)
+
+        self.pair_state = {}  # pair: {'staleness', 'cost', 'trained', 'running'}
+        self.pending = {}  # pair: (train_func, install_func)
+        self.lock = threading.Lock()
+        self.executor = None
+        self.num_running = 0
+
+    def get_state(self, pair: str) -> dict:
+        if pair not in self.pair_state:
+            self.pair_state[pair] = {'staleness': 0, 'cost': 0.0, 'trained': False, 'running': False}
+        return self.pair_state[pair]
+
+    # call once per candle for each pair
+    def tick(self, pair: str):
+        with self.lock:
+            self.get_state(pair)['staleness'] += 1
+
+    # returns True if the pair should be (re-)trained. Pairs that are training (or waiting to) are not due
+    def is_due(self, pair: str) -> bool:
+        with self.lock:
+            state = self.get_state(pair)
+            if state['running'] or (pair in self.pending):
+                return False
+            return (not state['trained']) or (state['staleness'] >= self.train_interval)
+
+    # make a pair due within the specified number of candles (e.g. if it has no usable model)
+    def retrain_soon(self, pair: str, candles: int):
+        with self.lock:
+            state = self.get_state(pair)
+            state['staleness'] = max(state['staleness'], self.train_interval - candles)
+
+    # record that a pair has up-to-date models, without training (e.g. loaded from file)
+    def mark_trained(self, pair: str):
+        with self.lock:
+            state = self.get_state(pair)
+            state['staleness'] = 0
+            state['trained'] = True
+
+    # train now, in the calling thread
+    def run(self, pair: str, train_func, install_func):
+        with self.lock:
+            self.get_state(pair)['running'] = True
+        self.train(pair, train_func, install_func)
+
+    # queue a training job, to be run in the background
+    def submit(self, pair: str, train_func, install_func):
+        with self.lock:
+            self.pending[pair] = (train_func, install_func)
+        self.dispatch()
+
+    # start as many pending jobs as the CPU budget allows
+    def dispatch(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                                      thread_name_prefix="training")
+
+            while (self.num_running < self.max_workers) and (len(self.pending) > 0):
+                pair = max(self.pending.keys(), key=self.get_priority)
+                train_func, install_func = self.pending.pop(pair)
+                self.get_state(pair)['running'] = True
+                self.num_running += 1
+                self.executor.submit(self.run_job, pair, train_func, install_func)
+
+    # most stale first, then fastest first. Call with lock held
+    def get_priority(self, pair: str):
+        state = self.get_state(pair)
+        return (state['staleness'], -state['cost'])
+
+    def run_job(self, pair: str, train_func, install_func):
+        try:
+            self.train(pair, train_func, install_func)
+        finally:
+            with self.lock:
+                self.num_running -= 1
+            self.dispatch()
+
+    def train(self, pair: str, train_func, install_func):
+        start = time.perf_counter()
+        try:
+            install_func(train_func())
+        except Exception as e:
+            log.exception(f"TrainingScheduler: training failed for {pair}: {e}")
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                state = self.get_state(pair)
+                state['cost'] = elapsed if state['cost'] == 0.0 else 0.8 * state['cost'] + 0.2 * elapsed
+                state['staleness'] = 0
+                state['trained'] = True
+                state['running'] = False
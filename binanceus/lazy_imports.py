@@ -0,0 +1,104 @@
+#
+# Lazy (on-demand) imports of heavy modules
+#
+# freqtrade imports every strategy file that it finds, so anything imported at the top of a strategy (or anything that
+# it imports) is loaded even if the strategy is never used. Importing tensorflow, keras, torch, darts etc. takes
+# several seconds (and a lot of memory) each, which slows down bot startup, list-strategies etc.
+#
+# Usage (at module level, in place of the normal import):
+#
+#    tf = lazy_import("tensorflow")                   # import tensorflow as tf
+#    layers = lazy_import("keras.layers")             # from keras import layers
+#    Trainer = lazy_attr("pytorch_lightning", "Trainer")  # from pytorch_lightning import Trainer
+#
+# The module is only imported the first time that something is accessed, e.g. tf.keras..., or Trainer(...).
+# on_load is an optional function that is called with the module once it has been imported. Use this for any setup
+# code that used to run after the import (seeds, logging levels etc.)
+#
+# Note: do not access lazy modules at module level (e.g. class MyLayer(keras.layers.Layer)), that just triggers the
+# import
+#
+
+import importlib
+import sys
+import threading
+import types
+
+_lock = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+
+    def __init__(self, name: str, on_load=None):
+        super().__init__(name)
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_on_load'] = on_load
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_lazy_name'])
+                    on_load = self.__dict__['_lazy_on_load']
+                    if on_load is not None:
+                        on_load(module)
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_lazy_module'] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_lazy_name']}' ({state})>"
+
+
+# an object inside a lazily imported module (class, function, submodule etc.). Calls and attribute access are passed
+# through to the object. Note that this is not the object itself, so isinstance() etc. will not work
+class LazyAttribute():
+
+    def __init__(self, module: LazyModule, path: str):
+        self._module = module
+        self._path = path
+        self._obj = None
+
+    def _load(self):
+        if self._obj is None:
+            obj = self._module
+            for attr in self._path.split("."):
+                obj = getattr(obj, attr)
+            self._obj = obj
+        return self._obj
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, item):
+        if item.startswith('_'):
+            raise AttributeError(item)
+        return getattr(self._load(), item)
+
+    def __repr__(self):
+        return f"<lazy attribute '{self._path}' of {self._module!r}>"
+
+
+def lazy_import(name: str, on_load=None) -> LazyModule:
+    # already imported, no point in deferring
+    if (name in sys.modules) and (on_load is None):
+        return sys.modules[name]
+    return LazyModule(name, on_load)
+
+
+def lazy_attr(module_name: str, path: str) -> LazyAttribute:
+    return LazyAttribute(lazy_import(module_name), path)
+
+
+# returns True if the (real) module has been imported
+def is_loaded(name: str) -> bool:
+    return name in sys.modules
@@ -13,9 +13,19 @@
 #    profiler.display_stats()
 #    profiler.compare()
 #    profiler.print_trace()
+#
+#    to log the process memory (current and peak RSS) at the end of a processing stage:
+#    profiler.log_memory("BTC/USD", "indicators")
 
+import os
+import sys
 import tracemalloc
 
+try:
+    import resource
+except ImportError:
+    resource = None  # not available on Windows
+
 # list to store memory snapshots
 snaps = []
 
@@ -74,4 +84,29 @@ def print_trace():
 
     print(f"\n*** Trace for largest memory block - ({largest.count} blocks, {largest.size / 1024} Kb) ***")
     for l in largest.traceback.format():
-        print(l)
\ No newline at end of file
+        print(l)
+
+
+# returns the current and peak resident memory (RSS) of this process, in MB. Either can be 0.0 if not available
+def get_rss_mb():
+    current = 0.0
+    peak = 0.0
+
+    # current RSS is only readily available on Linux
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    if resource is not None:
+        # ru_maxrss is in bytes on macOS, KB elsewhere
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+    return current, peak
+
+
+def log_memory(pair: str, stage: str):
+    current, peak = get_rss_mb()
+    print(f"    [mem] {pair} {stage:<12} rss: {current:8.1f} MB  peak: {peak:8.1f} MB")
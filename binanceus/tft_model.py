@@ -29,22 +29,25 @@ import os
 import shutil
 
 import tft_dataformatters_base
-import tft_utils as utils
 import numpy as np
 import pandas as pd
-import tensorflow as tf
+from lazy_imports import lazy_import, LazyAttribute
+
+# tensorflow is only loaded when a model is built
+tf = lazy_import("tensorflow")
+utils = lazy_import("tft_utils")
 
 # Layer definitions.
-concat = tf.keras.backend.concatenate
-stack = tf.keras.backend.stack
-K = tf.keras.backend
-Add = tf.keras.layers.Add
-LayerNorm = tf.keras.layers.LayerNormalization
-Dense = tf.keras.layers.Dense
-Multiply = tf.keras.layers.Multiply
-Dropout = tf.keras.layers.Dropout
-Activation = tf.keras.layers.Activation
-Lambda = tf.keras.layers.Lambda
+concat = LazyAttribute(tf, "keras.backend.concatenate")
+stack = LazyAttribute(tf, "keras.backend.stack")
+K = LazyAttribute(tf, "keras.backend")
+Add = LazyAttribute(tf, "keras.layers.Add")
+LayerNorm = LazyAttribute(tf, "keras.layers.LayerNormalization")
+Dense = LazyAttribute(tf, "keras.layers.Dense")
+Multiply = LazyAttribute(tf, "keras.layers.Multiply")
+Dropout = LazyAttribute(tf, "keras.layers.Dropout")
+Activation = LazyAttribute(tf, "keras.layers.Activation")
+Lambda = LazyAttribute(tf, "keras.layers.Lambda")
 
 # Default input types.
 InputTypes = tft_dataformatters_base.InputTypes
@@ -33,6 +33,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 import pywt
 
@@ -161,7 +162,12 @@ class FBB_FFT(IStrategy):
 
         # dataframe['fft_model'] = dataframe['close'].rolling(window=self.buy_fft_window.value).apply(self.model)
         # informative['fft_lookahead'] = informative['close'].rolling(window=self.buy_fft_window.value).apply(self.predict)
-        informative['fft_lookahead'] = informative['close'].rolling(window=self.fft_window).apply(self.predict)
+        if self.fft_lookahead == 0:
+            # no extrapolation, so this is just the last value of the model. Use the (much faster) batched version
+            informative['fft_lookahead'] = rm.rolling_last(informative['close'], self.fft_window,
+                                                           lambda w: rm.fft_lowpass_model(w, self.buy_fft_cutoff.value))
+        else:
+            informative['fft_lookahead'] = informative['close'].rolling(window=self.fft_window).apply(self.predict)
 
 
         # merge into normal timeframe
@@ -33,6 +33,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 from  simdkalman import KalmanFilter
 
@@ -80,6 +81,9 @@ class KalmanSIMD(IStrategy):
 
     custom_trade_info = {}
 
+    # cache of rolling model results (live/dry-run only)
+    model_cache = rm.RollingModelCache()
+
     ###################################
 
     # Strategy Specific Variable Storage
@@ -96,6 +100,9 @@ class KalmanSIMD(IStrategy):
             )
     current_pair = ""
 
+    # smooth all of the rolling windows in (chunked) batches, rather than one simdkalman call per candle
+    kf_batch = True
+
 
     ## Hyperopt Variables
     
@@ -183,7 +190,14 @@ class KalmanSIMD(IStrategy):
         # set current filter (can't pass parameter to apply())
         self.kalman_filter = self.filter_list[curr_pair]
 
-        informative['kf_model'] = informative['close'].rolling(window=self.kf_window).apply(self.model)
+        kf_func = self.batch_model if self.kf_batch else rm.per_window(self.model)
+        if self.dp.runmode.value in ('live', 'dry_run'):
+            # only calculate the model for new candles
+            informative['kf_model'] = self.model_cache.rolling(curr_pair, self.inf_timeframe, 'kf_model',
+                                                               informative['date'], informative['close'],
+                                                               self.kf_window, kf_func)
+        else:
+            informative['kf_model'] = rm.rolling_last(informative['close'], self.kf_window, kf_func)
         # informative['kf_predict'] = informative['kf_model'].rolling(window=self.kf_window).apply(self.predict)
 
         # merge into normal timeframe
@@ -250,6 +264,17 @@ class KalmanSIMD(IStrategy):
         length = len(model)
         return model[length-1]
     
+    def batch_model(self, windows: np.ndarray) -> np.ndarray:
+        # batch version of model(): smooths all of the supplied windows in one call
+
+        # init filter if needed (fitted to the first window, same as model())
+        if not self.filter_init_list[self.current_pair]:
+            self.filter_init_list[self.current_pair] = True
+            scaled, _, _ = rm.kalman_scale(windows[0])
+            self.filter_list[self.current_pair] = self.filter_list[self.current_pair].em(scaled[0], n_iter=6)
+
+        return rm.kalman_model(windows, self.kalman_filter)
+
     def scaledModel(self, a: np.ndarray) -> float:
 
         # scale the data
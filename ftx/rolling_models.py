@@ -0,0 +1,359 @@
+"""
+Batched Rolling Models
+
+The DWT/FFT/Kalman strategies all calculate a model over a rolling window of prices and keep only the last value of
+each window (as do the Gaussian smoothers used by the LSTM/NNPredict strategies). Doing that with rolling().apply() means one Python call (and one transform) per candle, which dominates
+backtest and hyperopt time.
+The functions here build all of the windows at once as a (strided, zero-copy) view of the data, and then run the
+transforms over the whole window matrix (in chunks, to bound memory)
+"""
+import functools
+
+import numpy as np
+import pywt
+import scipy.fft
+from scipy.ndimage import gaussian_filter1d
+
+import pandas as pd
+from pandas import Series
+
+
+"""
+Window Helpers
+"""
+
+def sliding_windows(data: np.ndarray, window: int) -> np.ndarray:
+    """
+    Returns a read-only view of shape (len(data)-window+1, window), where row i is data[i:i+window]
+    No data is copied
+    """
+    return np.lib.stride_tricks.sliding_window_view(np.asarray(data, dtype=float), window)
+
+
+def normalise_windows(windows: np.ndarray, ddof: int = 1):
+    """
+    Normalises each row of the window matrix, i.e. (x - mean) / std
+    ddof=1 matches pandas Series.std(), which is what rolling().apply() sees by default (raw=False)
+    Returns the normalised matrix plus the per-row mean and std (as column vectors) so that results can be re-trended
+    """
+    w_mean = windows.mean(axis=1, keepdims=True)
+    w_std = windows.std(axis=1, ddof=ddof, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_notrend = (windows - w_mean) / w_std
+    return x_notrend, w_mean, w_std
+
+
+def rolling_last(series: Series, window: int, func, chunk_size: int = 4096) -> Series:
+    """
+    Applies func to the window matrix of series, chunk_size windows at a time.
+    func takes a (nwindows, window) array and returns one value per window (the 'last value' of that window's model)
+    Output is aligned the same way as rolling(window).apply(), i.e. the first window-1 entries are NaN
+    """
+    values = np.asarray(series, dtype=float)
+    result = np.full(len(values), np.nan)
+
+    if len(values) < window:
+        return Series(result, index=series.index)
+
+    windows = sliding_windows(values, window)
+    for start in range(0, windows.shape[0], chunk_size):
+        end = min(start + chunk_size, windows.shape[0])
+        result[start + window - 1:end + window - 1] = func(windows[start:end])
+
+    # rolling() does not call the function for windows containing NaNs
+    result[nan_windows(values, window)] = np.nan
+
+    return Series(result, index=series.index)
+
+
+def nan_windows(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Returns a boolean array (same length as values) that is True where the window ending on that row contains a NaN
+    """
+    counts = np.concatenate(([0], np.cumsum(np.isnan(values))))
+    result = np.zeros(len(values), dtype=bool)
+    result[window - 1:] = (counts[window:] - counts[:-window]) > 0
+    return result
+
+
+"""
+DWT
+"""
+
+def madev(d: np.ndarray, axis=None, keepdims=False):
+    """ Mean absolute deviation of a signal """
+    return np.mean(np.absolute(d - np.mean(d, axis, keepdims=True)), axis, keepdims=keepdims)
+
+
+def dwt_denoise(data: np.ndarray, wavelet='haar', wmode='smooth', level=1) -> np.ndarray:
+    """
+    Batch version of the dwtModel() methods in the DWT strategies.
+    Each row of data is decomposed, the detail coefficients are hard thresholded (universal threshold, with noise
+    estimated from the 'level' detail coefficients of that row) and the row is then reconstructed
+    """
+    length = data.shape[1]
+
+    coeff = pywt.wavedec(data, wavelet, mode=wmode, axis=1)
+
+    # remove higher harmonics (per-row threshold)
+    sigma = (1 / 0.6745) * madev(coeff[-level], axis=1, keepdims=True)
+    uthresh = sigma * np.sqrt(2 * np.log(length))
+    coeff[1:] = (pywt.threshold(i, value=uthresh, mode='hard') for i in coeff[1:])
+
+    # inverse transform. Note: for odd lengths, waverec returns an extra sample (same as the strategies)
+    model = pywt.waverec(coeff, wavelet, mode=wmode, axis=1)
+
+    return model
+
+
+def dwt_model(windows: np.ndarray, wavelet='haar', wmode='smooth', ddof: int = 1) -> np.ndarray:
+    """
+    Batch version of the model() methods in the DWT strategies: de-trend each window, get the DWT model,
+    re-trend and return the last value of each window
+    """
+    x_notrend, w_mean, w_std = normalise_windows(windows, ddof=ddof)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        restored_sig = dwt_denoise(x_notrend, wavelet=wavelet, wmode=wmode)
+    model = (restored_sig[:, -1:] * w_std) + w_mean
+    return model[:, 0]
+
+
+def rolling_dwt(series: Series, window: int, wavelet='haar', wmode='smooth', chunk_size: int = 4096) -> Series:
+    """
+    Equivalent to series.rolling(window=window).apply(self.model) in the DWT strategies
+    """
+    return rolling_last(series, window,
+                        lambda w: dwt_model(w, wavelet=wavelet, wmode=wmode),
+                        chunk_size=chunk_size)
+
+
+"""
+FFT
+"""
+
+def fft_denoise(data: np.ndarray, threshold: float = 20.0) -> np.ndarray:
+    """
+    Batch version of the (PSD threshold) fourierModel() methods in the FFT strategies.
+    The input is real, so a real FFT is used along each row (the full FFT is symmetric, so thresholding half of it
+    and inverting with irfft gives the same result as the complex fft/ifft)
+    """
+    n = data.shape[1]
+    fft = scipy.fft.rfft(data, axis=1)
+
+    # power spectrum density (squared magnitude of each fft coefficient). Remove anything below threshold
+    psd = (fft.real ** 2 + fft.imag ** 2) / n
+    fft[psd < threshold] = 0
+
+    return scipy.fft.irfft(fft, n=n, axis=1)
+
+
+def fft_model(windows: np.ndarray, threshold: float = 20.0, retrend: bool = True) -> np.ndarray:
+    """
+    Batch version of the model() methods in the FFT strategies: scale each window, denoise by PSD threshold and
+    return the last value of each window.
+    If retrend is False, the result is left scaled (same as the scaledModel() methods)
+    """
+    scaled, w_mean, w_std = normalise_windows(windows, ddof=0)
+    if not retrend:
+        # scaledModel() fills flat windows (zero std) with 0, model() returns NaN for them
+        scaled[np.isnan(scaled)] = 0.0
+    restored_sig = fft_denoise(scaled, threshold=threshold)[:, -1:]
+    if retrend:
+        restored_sig = (restored_sig * w_std) + w_mean
+    return restored_sig[:, 0]
+
+
+def fft_lowpass_model(windows: np.ndarray, cutoff: float) -> np.ndarray:
+    """
+    Batch version of the (low pass) fourierModel() used in FBB_FFT: remove the linear trend of each window, zero out
+    frequencies beyond cutoff (a fraction of the spectrum), then restore the trend. Returns the last value of each
+    window
+    """
+    n = windows.shape[1]
+    t = np.arange(0, n)
+
+    # slope of the least squares linear fit of each row (same as np.polyfit(t, x, 1)[0])
+    t_dev = t - t.mean()
+    slope = ((windows - windows.mean(axis=1, keepdims=True)) @ t_dev) / (t_dev @ t_dev)
+    x_notrend = windows - slope[:, None] * t
+    yf = scipy.fft.rfft(x_notrend, axis=1)
+
+    # zero out frequencies beyond 'cutoff'
+    ncutoff = int(yf.shape[1] * cutoff)
+    yf[:, (ncutoff - 1):] = 0
+
+    # inverse transform (last value only)
+    restored_sig = scipy.fft.irfft(yf, n=n, axis=1)
+    return restored_sig[:, -1] + slope * t[-1]
+
+
+def rolling_fft(series: Series, window: int, threshold: float = 20.0, chunk_size: int = 4096) -> Series:
+    """
+    Equivalent to series.rolling(window=window).apply(self.model) in the FFT strategies
+    """
+    return rolling_last(series, window,
+                        lambda w: fft_model(w, threshold=threshold),
+                        chunk_size=chunk_size)
+
+
+def scaled_last(windows: np.ndarray) -> np.ndarray:
+    """
+    Batch version of the scaledData() methods, i.e. the last value of each window, scaled by the window mean and std
+    """
+    w_mean = windows.mean(axis=1)
+    w_std = windows.std(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled = (windows[:, -1] - w_mean) / w_std
+    scaled[np.isnan(scaled)] = 0.0
+    return scaled
+
+
+"""
+Kalman
+"""
+
+def kalman_scale(windows: np.ndarray) -> np.ndarray:
+    """
+    Scales windows the same way as the model() methods in the KalmanSIMD strategies (np.std and fillna(0)).
+    Returns the scaled windows plus the per-row mean and std
+    """
+    scaled, w_mean, w_std = normalise_windows(np.atleast_2d(windows), ddof=0)
+    scaled[np.isnan(scaled)] = 0.0
+    return scaled, w_mean, w_std
+
+
+def kalman_model(windows: np.ndarray, kfilter) -> np.ndarray:
+    """
+    Batch version of the model() methods in the KalmanSIMD strategies. All windows are smoothed in a single
+    simdkalman call (each row is treated as a separate series), then re-trended. Returns the last value of each window
+    kfilter is a simdkalman.KalmanFilter
+    """
+    scaled, w_mean, w_std = kalman_scale(windows)
+    smoothed = kfilter.smooth(scaled)
+    restored_sig = np.reshape(smoothed.observations.mean, scaled.shape)
+    model = (restored_sig[:, -1:] * w_std) + w_mean
+    return model[:, 0]
+
+
+"""
+Gaussian smoothing
+"""
+
+@functools.lru_cache(maxsize=64)
+def gaussian_weights(window: int, sigma: float, mode: str = 'reflect', truncate: float = 4.0) -> np.ndarray:
+    """
+    Returns the weights w such that gaussian_filter1d(x, sigma, mode=mode, truncate=truncate)[-1] == w @ x, for any x
+    of length window.
+    The filter is linear, so the weights are found by filtering each unit vector (rows of the identity matrix). This
+    includes the effect of the boundary mode (reflected samples past the end of the window just add to the weights
+    of the samples they copy), so the results match scipy for any window size and sigma
+    """
+    weights = gaussian_filter1d(np.eye(window), sigma, axis=1, mode=mode, truncate=truncate)[:, -1]
+    weights.setflags(write=False)
+    return weights
+
+
+def gaussian_last(windows: np.ndarray, sigma: float, mode: str = 'reflect') -> np.ndarray:
+    """
+    Batch version of the roll_smooth() methods in the strategies, i.e. the last value of gaussian_filter1d() applied
+    to each window. windows can be a single window (returns a scalar) or a window matrix (returns one value per row)
+    """
+    windows = np.asarray(windows, dtype=float)
+    return windows @ gaussian_weights(windows.shape[-1], sigma, mode)
+
+
+def rolling_gaussian(series: Series, window: int, sigma: float, mode: str = 'reflect') -> Series:
+    """
+    Equivalent to series.rolling(window=window).apply(self.roll_smooth) (sigma=4), roll_strong_smooth (sigma=24) etc.
+    Every window uses the same weights, so the whole column is a single correlation with the weight vector
+    """
+    values = np.asarray(series, dtype=float)
+    result = np.full(len(values), np.nan)
+
+    if len(values) >= window:
+        result[window - 1:] = np.correlate(values, gaussian_weights(window, sigma, mode), mode='valid')
+        result[nan_windows(values, window)] = np.nan
+
+    return Series(result, index=series.index)
+
+
+"""
+Per-window (legacy) models
+"""
+
+def per_window(func):
+    """
+    Wraps a per-window function (i.e. one written for rolling().apply()) so that it can be used wherever a batch
+    function is expected. The function is still called once per window, with a Series (same as rolling().apply()),
+    and windows containing NaNs are skipped
+    """
+    def batch_func(windows: np.ndarray) -> np.ndarray:
+        result = np.full(windows.shape[0], np.nan)
+        for i, w in enumerate(windows):
+            if not np.isnan(w).any():
+                result[i] = func(Series(w))
+        return result
+
+    return batch_func
+
+
+"""
+Incremental Updates
+"""
+
+class RollingModelCache:
+    """
+    Cache of rolling model results, keyed by (pair, timeframe, name, window).
+    In live and dry-run modes the informative dataframe only gains a candle or two between calls to
+    populate_indicators(), so only the windows ending on a candle that has not been seen before are calculated.
+    Results for candles already in the cache are re-used (candles are matched by date, so the dataframe
+    can also drop old candles off the front)
+    """
+
+    def __init__(self):
+        self.cache = {}
+
+    def rolling(self, pair: str, timeframe: str, name: str, dates: Series, data: Series, window: int,
+                func, chunk_size: int = 4096) -> Series:
+        """
+        Returns the same result as rolling_last(data, window, func), but only calculates the windows that are not
+        already in the cache
+        func takes a (nwindows, window) array and returns one value per window (see rolling_last())
+        """
+        key = (pair, timeframe, name, window)
+        dates = np.asarray(dates)
+        values = np.asarray(data, dtype=float)
+        result = np.full(len(values), np.nan)
+
+        found = np.zeros(len(values), dtype=bool)
+        if key in self.cache:
+            cached_dates, cached_values = self.cache[key]
+            index = pd.Index(cached_dates).get_indexer(dates)
+            found = index >= 0
+            result[found] = cached_values[index[found]]
+
+        # the first (window-1) rows do not have a full window in this dataframe, so stay NaN (same as rolling())
+        result[:window - 1] = np.nan
+
+        # anything not in the cache needs to be calculated, if there is a full window
+        missing = np.flatnonzero(~found)
+        missing = missing[missing >= window - 1]
+
+        if len(missing) > 0:
+            windows = sliding_windows(values, window)
+            for start in range(0, len(missing), chunk_size):
+                rows = missing[start:start + chunk_size]
+                result[rows] = func(windows[rows - window + 1])
+
+            result[nan_windows(values, window)] = np.nan
+
+        self.cache[key] = (dates, result.copy())
+
+        return Series(result, index=data.index)
+
+    def clear(self, pair: str = None):
+        """ clears the cache for a pair, or all pairs if pair is None """
+        if pair is None:
+            self.cache = {}
+        else:
+            self.cache = {k: v for k, v in self.cache.items() if k[0] != pair}
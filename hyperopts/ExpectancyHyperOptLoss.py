@@ -16,6 +16,12 @@ from freqtrade.optimize.hyperopt import IHyperOptLoss
 from datetime import datetime
 import numpy as np
 from typing import Any, Dict
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from loss_stats import get_trade_stats, get_expectancy
 
 # Contstants to allow evaluation in cases where thre is insufficient (or nonexistent) info in the configuration
 EXPECTED_TRADES_PER_DAY = 3  # used to set target goals
@@ -61,34 +67,19 @@ class ExpectancyHyperOptLoss(IHyperOptLoss):
         #         print(" \tTrade count too low:{:.0f}".format(trade_count))
         #     return UNDESIRED_SOLUTION
 
+        # profits are used as a fraction of the stake
         stake = backtest_stats['stake_amount']
-        total_profit_pct = results["profit_abs"] / stake
+        stats = get_trade_stats(results, days_period, scale=stake)
 
         # Winning trades
-        results['upside_returns'] = 0
-        results.loc[total_profit_pct > 0.0001, 'upside_returns'] = 1.0
-
         if backtest_stats['wins']:
             winning_count = backtest_stats['wins']
         else:
-            winning_count = results['upside_returns'].sum()
-
-        # Losing trades
-        results['downside_returns'] = 0
-        results.loc[total_profit_pct < 0, 'downside_returns'] = 1.0
+            winning_count = stats['wins']
 
         # Expectancy (refer to freqtrade edge page for info)
-        w = winning_count / trade_count
-        l = 1.0 - w
-        results['net_gain'] = total_profit_pct * results['upside_returns']
-        results['net_loss'] = total_profit_pct * results['downside_returns']
-        ave_profit = results['net_gain'].sum() / trade_count
-        ave_loss = results['net_loss'].sum() / trade_count
-
-        if abs(ave_loss) < 0.01:
-            ave_loss = 0.01  # set min loss = 1%, otherwise results can be wildly skewed
-        r = ave_profit / abs(ave_loss)
-        e = r * w - l
+        # min loss = 1%, otherwise results can be wildly skewed
+        e, ave_profit, ave_loss = get_expectancy(winning_count, trade_count, stats['gain_sum'], stats['loss_sum'], 0.01)
 
         # expectancy_loss = 1.0 - e  # goal is <1.0
         expectancy_loss = -e
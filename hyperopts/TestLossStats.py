@@ -0,0 +1,165 @@
+
+# Checks that loss_stats.py gives the same statistics as the original (column based) code in the loss functions, and
+# compares the per-call latency of each. Hyperopt calls the loss function once per epoch, so this is overhead on every
+# epoch
+# If freqtrade is installed, the per-call latency of each of the loss functions is also shown
+#
+# Usage: python TestLossStats.py [num_trades] [num_calls]
+
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from loss_stats import get_trade_stats, get_expectancy
+
+
+# reference implementation, copied from the original loss functions (PEDHyperOptLoss etc.)
+def reference_stats(results: DataFrame, days_period: int, trade_count: int) -> dict:
+    total_profit = results["profit_abs"]
+    profit_sum = results["profit_abs"].sum()
+    stake_mean = results['stake_amount'].mean()
+    trade_duration = results['trade_duration'].mean()
+
+    results['upside_returns'] = 0
+    results.loc[total_profit > 0.0001, 'upside_returns'] = 1.0
+    winning_count = results['upside_returns'].sum()
+
+    results['downside_returns'] = 0
+    results.loc[total_profit < 0, 'downside_returns'] = 1.0
+    act_losing_count = results['downside_returns'].sum()
+
+    w = winning_count / trade_count
+    l = 1.0 - w
+    results['net_gain'] = results['profit_abs'] * results['upside_returns']
+    results['net_loss'] = results['profit_abs'] * results['downside_returns']
+    ave_profit = results['net_gain'].sum() / trade_count
+    ave_loss = results['net_loss'].sum() / trade_count
+    if abs(ave_loss) < 0.001:
+        ave_loss = 0.001
+    r = ave_profit / abs(ave_loss)
+    e = r * w - l
+
+    expected_returns_mean = total_profit.sum() / days_period
+    up_stdev = np.std(total_profit)
+    sharpe = expected_returns_mean / up_stdev * np.sqrt(365)
+    down_stdev = np.std(results['downside_returns'])
+    sortino = expected_returns_mean / down_stdev * np.sqrt(365)
+
+    return {
+        'profit_sum': profit_sum,
+        'stake_mean': stake_mean,
+        'duration_mean': trade_duration,
+        'wins': winning_count,
+        'losses': act_losing_count,
+        'expectancy': e,
+        'sharpe': sharpe,
+        'sortino': sortino
+    }
+
+
+def new_stats(results: DataFrame, days_period: int, trade_count: int) -> dict:
+    stats = get_trade_stats(results, days_period)
+    e, _, _ = get_expectancy(stats['wins'], trade_count, stats['gain_sum'], stats['loss_sum'], 0.001)
+    stats['expectancy'] = e
+    return stats
+
+
+def get_results(num_trades: int) -> DataFrame:
+    # random trades, with some 'draws' (zero profit)
+    rng = np.random.default_rng(42)
+    stake = 100.0
+    ratio = rng.normal(0.005, 0.03, num_trades)
+    ratio[rng.uniform(size=num_trades) < 0.05] = 0.0
+    return DataFrame({
+        'pair': rng.choice(['BTC/USD', 'ETH/USD', 'SOL/USD'], num_trades),
+        'profit_ratio': ratio,
+        'profit_abs': ratio * stake,
+        'stake_amount': np.full(num_trades, stake),
+        'trade_duration': rng.integers(5, 2000, num_trades),
+        'open_date': pd.date_range("2022-01-01", periods=num_trades, freq="h", tz='UTC'),
+        'exit_reason': 'exit_signal'
+    })
+
+
+def time_call(func, results: DataFrame, num_calls: int) -> float:
+    # copy each time, so that the reference version does not re-use the columns added by the previous call
+    frames = [results.copy() for _ in range(num_calls)]
+    start = time.perf_counter()
+    for frame in frames:
+        func(frame)
+    return (time.perf_counter() - start) / num_calls
+
+
+def time_losses(results: DataFrame, num_calls: int, min_date, max_date):
+    try:
+        from ExpectancyHyperOptLoss import ExpectancyHyperOptLoss
+        from MedianProfitHyperOptLoss import WeightedProfitHyperOptLoss as MedianProfitHyperOptLoss
+        from OnlyExpectancyHyperOptLoss import OnlyExpectancyHyperOptLoss
+        from PEDHyperOptLoss import PEDHyperOptLoss
+        from QuickProfitHyperOptLoss import QuickHyperOptLoss
+        from WeightedProfitHyperOptLoss import WeightedProfitHyperOptLoss
+    except ImportError as e:
+        print("Skipping loss functions ({})".format(e))
+        return
+
+    losses = [ExpectancyHyperOptLoss, MedianProfitHyperOptLoss, OnlyExpectancyHyperOptLoss, PEDHyperOptLoss,
+              QuickHyperOptLoss, WeightedProfitHyperOptLoss]
+
+    trade_count = results.shape[0]
+    # zero values make the losses fall back to their own calculations (i.e. the statistics), so that is what's timed
+    config = {'max_open_trades': 3, 'exchange': {'name': 'binanceus'}, 'dry_run_wallet': 0, 'stake_amount': 100.0}
+    backtest_stats = {
+        'profit_total_abs': 0.0, 'profit_total': results['profit_ratio'].sum(), 'profit_mean': 0.0, 'wins': 0,
+        'losses': 0, 'starting_balance': 0.0, 'stake_amount': 100.0, 'max_drawdown': 0.1, 'stoploss': -0.1
+    }
+
+    print("")
+    print("{:<32} {:>12} {:>12}".format("loss", "loss", "time(ms)"))
+    for loss in losses:
+        value = loss.hyperopt_loss_function(results.copy(), trade_count, min_date, max_date, config, {},
+                                            backtest_stats)
+        elapsed = time_call(lambda df: loss.hyperopt_loss_function(df, trade_count, min_date, max_date, config, {},
+                                                                    backtest_stats),
+                            results, num_calls)
+        print("{:<32} {:>12.4f} {:>12.3f}".format(loss.__name__, value, 1000.0 * elapsed))
+
+
+def main():
+    num_trades = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    num_calls = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    results = get_results(num_trades)
+    min_date = datetime(2022, 1, 1)
+    max_date = min_date + timedelta(days=max(1, num_trades // 24))
+    days_period = (max_date - min_date).days
+
+    expected = reference_stats(results.copy(), days_period, num_trades)
+    actual = new_stats(results.copy(), days_period, num_trades)
+
+    print("{} trades, {} days".format(num_trades, days_period))
+    print("")
+    print("{:<16} {:>18} {:>18} {:>6}".format("statistic", "original", "new", "match"))
+    all_ok = True
+    for key, value in expected.items():
+        ok = bool(np.isclose(value, actual[key], rtol=1e-9, atol=1e-12))
+        all_ok = all_ok and ok
+        print("{:<16} {:>18.6f} {:>18.6f} {:>6}".format(key, value, actual[key], "OK" if ok else "FAIL"))
+
+    t_orig = time_call(lambda df: reference_stats(df, days_period, num_trades), results, num_calls)
+    t_new = time_call(lambda df: new_stats(df, days_period, num_trades), results, num_calls)
+    print("")
+    print("per call: original {:.3f}ms, new {:.3f}ms ({:.1f}x)".format(1000.0 * t_orig, 1000.0 * t_new,
+                                                                       t_orig / t_new))
+
+    time_losses(results, num_calls, min_date, max_date)
+
+    print("")
+    print("PASSED" if all_ok else "FAILED")
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,12 @@ from freqtrade.optimize.hyperopt import IHyperOptLoss
 from datetime import datetime
 import numpy as np
 from typing import Any, Dict
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from loss_stats import get_trade_stats, get_expectancy
 
 # Constants to allow evaluation in cases where there is insufficient (or nonexistent) info in the configuration
 
@@ -96,12 +102,15 @@ class WeightedProfitHyperOptLoss(IHyperOptLoss):
                 print(" \tTrade count too low:{:.0f}".format(trade_count))
             return UNDESIRED_SOLUTION
 
+        # statistics used by the various metrics below
+        stats = get_trade_stats(results, days_period)
+
         # Absolute Profit
         num_months = max((days_period / 30.0), 1.0)
         if backtest_stats['profit_total_abs']:
             profit_sum = backtest_stats['profit_total_abs']
         else:
-            profit_sum = results["profit_abs"].sum()
+            profit_sum = stats['profit_sum']
 
         if profit_sum < 0.0:
             if debug_level > 2:
@@ -146,13 +155,11 @@ class WeightedProfitHyperOptLoss(IHyperOptLoss):
         # note that we don't have enough info to calculate profit % because we don't know the original investment
         # so, we approximate
         stake = backtest_stats['stake_amount']
-        total_profit_pct = results["profit_abs"] / (stake)
-        total_profit = results["profit_abs"]
 
         if backtest_stats['starting_balance']:
             expected_sum = backtest_stats['starting_balance'] * (1.0 + EXPECTED_MONTHLY_PROFIT * num_months)
         else:
-            expected_sum = results['stake_amount'].mean() * trade_count * EXPECTED_PROFIT_PER_TRADE
+            expected_sum = stats['stake_mean'] * trade_count * EXPECTED_PROFIT_PER_TRADE
         exp_profit_loss = (expected_sum - profit_sum) / expected_sum
 
         # if num_trades_loss < 0.0:
@@ -160,7 +167,7 @@ class WeightedProfitHyperOptLoss(IHyperOptLoss):
         #           .format(profit_sum, expected_sum, ave_profit_loss, exp_profit_loss))
 
         # trade duration (taken from default loss function)
-        trade_duration = results['trade_duration'].mean()
+        trade_duration = stats['duration_mean']
         duration_loss = (trade_duration-EXPECTED_TRADE_DURATION)/EXPECTED_TRADE_DURATION
 
         # punish if below goal
@@ -170,18 +177,13 @@ class WeightedProfitHyperOptLoss(IHyperOptLoss):
             return UNDESIRED_SOLUTION
 
         # Winning trades
-        results['upside_returns'] = 0
-        results.loc[total_profit > 0.0001, 'upside_returns'] = 1.0
-
         if backtest_stats['wins']:
             winning_count = backtest_stats['wins']
         else:
-            winning_count = results['upside_returns'].sum()
+            winning_count = stats['wins']
 
 
         # Losing trades
-        results['downside_returns'] = 0
-        results.loc[total_profit < 0, 'downside_returns'] = 1.0
         losing_count = trade_count - winning_count
 
         # if winning_count < (2.0 * losing_count):
@@ -191,16 +193,8 @@ class WeightedProfitHyperOptLoss(IHyperOptLoss):
             return UNDESIRED_SOLUTION
 
         # Expectancy (refer to freqtrade edge page for info)
-        w = winning_count / trade_count
-        l = 1.0 - w
-        results['net_gain'] = total_profit_pct * results['upside_returns']
-        results['net_loss'] = total_profit_pct * results['downside_returns']
-        ave_profit = results['net_gain'].sum() / trade_count
-        ave_loss = results['net_loss'].sum() / trade_count
-        if abs(ave_loss) < 0.01:
-            ave_loss = 0.01
-        r = ave_profit / abs(ave_loss)
-        e = r*w - l
+        e, ave_profit, ave_loss = get_expectancy(winning_count, trade_count,
+                                                 stats['gain_sum'] / stake, stats['loss_sum'] / stake, 0.01)
 
 
         expectancy_loss = -e
@@ -222,20 +216,17 @@ class WeightedProfitHyperOptLoss(IHyperOptLoss):
         #     return UNDESIRED_SOLUTION
 
         # Sharpe Ratio
-        expected_returns_mean = total_profit.sum() / days_period
-        up_stdev = np.std(total_profit)
-        if up_stdev != 0:
+        if stats['profit_std'] != 0:
             # calculate Sharpe ratio, but scale down to match other parameters
-            sharp_ratio_loss = 0.01 - (expected_returns_mean / up_stdev * np.sqrt(365)) / 100.0
+            sharp_ratio_loss = 0.01 - stats['sharpe'] / 100.0
         else:
             if debug_level > 1:
                 print(" \tSharp ratio below goal")
             return UNDESIRED_SOLUTION
 
         # Sortino Ratio
-        down_stdev = np.std(results['downside_returns'])
-        if down_stdev != 0:
-            sortino_ratio_loss = -1.0 * (expected_returns_mean / down_stdev * np.sqrt(365)) / 10000.0
+        if stats['downside_std'] != 0:
+            sortino_ratio_loss = -1.0 * stats['sortino'] / 10000.0
         else:
             if debug_level > 1:
                 print(" \tSortino ratio below goal")
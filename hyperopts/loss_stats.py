@@ -0,0 +1,116 @@
+"""
+loss_stats
+
+Shared trade statistics for the custom HyperoptLoss classes in this directory
+
+Hyperopt calls the loss function once per epoch (thousands of times per run), and each loss used to build its
+statistics by adding columns to the results frame (upside_returns, downside_returns, net_gain etc.) and then summing
+them. Here, everything is calculated in a single pass over the numpy arrays of the results frame, without adding
+anything to the frame, and the loss functions just apply their own weightings to the results.
+
+To deploy, copy this file to the <freqtrade>/user_data/hyperopts directory, along with the loss files that use it
+"""
+
+import numpy as np
+from pandas import DataFrame
+
+
+def get_trade_stats(results: DataFrame, days_period: int, scale: float = 1.0,
+                    win_threshold: float = 0.0001) -> dict:
+    """
+    Statistics for one epoch, from the backtest results frame
+    Trades count as wins if profit_abs / scale > win_threshold, and as losses if profit_abs < 0 (so 'draws' are
+    neither). scale is the stake amount for losses that work with profit as a fraction of the stake, 1.0 otherwise
+    gain_sum and loss_sum are the total profit of the winning and losing trades, divided by scale
+    """
+
+    profit = results['profit_abs'].to_numpy(dtype=float)
+    duration = results['trade_duration'].to_numpy(dtype=float) if 'trade_duration' in results.columns else None
+    ratio = results['profit_ratio'].to_numpy(dtype=float) if 'profit_ratio' in results.columns else None
+    stake = results['stake_amount'].to_numpy(dtype=float) if 'stake_amount' in results.columns else None
+
+    return get_array_stats(profit, days_period, duration=duration, ratio=ratio, stake=stake, scale=scale,
+                           win_threshold=win_threshold)
+
+
+def get_array_stats(profit: np.ndarray, days_period: int, duration: np.ndarray = None, ratio: np.ndarray = None,
+                    stake: np.ndarray = None, scale: float = 1.0, win_threshold: float = 0.0001) -> dict:
+    """
+    Same as get_trade_stats(), with the columns supplied as arrays
+    """
+
+    trade_count = profit.shape[0]
+    stats = {
+        'trade_count': trade_count,
+        'profit_sum': 0.0,
+        'wins': 0,
+        'losses': 0,
+        'gain_sum': 0.0,
+        'loss_sum': 0.0,
+        'profit_std': 0.0,
+        'downside_std': 0.0,
+        'sharpe': np.nan,
+        'sortino': np.nan,
+        'duration_mean': np.nan,
+        'stake_mean': np.nan,
+        'max_drawdown': 0.0
+    }
+
+    if trade_count == 0:
+        return stats
+
+    win_mask = profit > (win_threshold * scale)
+    loss_mask = profit < 0.0
+
+    profit_sum = profit.sum()
+    wins = int(np.count_nonzero(win_mask))
+    losses = int(np.count_nonzero(loss_mask))
+
+    stats['profit_sum'] = profit_sum
+    stats['wins'] = wins
+    stats['losses'] = losses
+    stats['gain_sum'] = np.sum(profit, where=win_mask) / scale
+    stats['loss_sum'] = np.sum(profit, where=loss_mask) / scale
+
+    # Sharpe uses the std of the profits. Sortino (as implemented in the losses) uses the std of the 0/1 'downside'
+    # indicator, which only depends on the fraction of losing trades
+    expected_returns_mean = profit_sum / days_period if days_period > 0 else np.nan
+    loss_fraction = losses / trade_count
+    stats['profit_std'] = profit.std()
+    stats['downside_std'] = np.sqrt(loss_fraction * (1.0 - loss_fraction))
+    if stats['profit_std'] != 0:
+        stats['sharpe'] = expected_returns_mean / stats['profit_std'] * np.sqrt(365)
+    if stats['downside_std'] != 0:
+        stats['sortino'] = expected_returns_mean / stats['downside_std'] * np.sqrt(365)
+
+    if duration is not None:
+        stats['duration_mean'] = duration.mean()
+
+    if stake is not None:
+        stats['stake_mean'] = stake.mean()
+
+    # max drawdown of the cumulative profit ratio (same basis as backtest_stats['max_drawdown'])
+    if ratio is not None:
+        csum = np.cumsum(ratio)
+        high = np.maximum.accumulate(csum)
+        np.subtract(high, csum, out=high)
+        stats['max_drawdown'] = high.max()
+
+    return stats
+
+
+def get_expectancy(winning_count: float, trade_count: int, gain_sum: float, loss_sum: float, min_loss: float):
+    """
+    Expectancy (refer to the freqtrade edge page for info): e = r * w - l, where w is the win rate, l = 1 - w, and r is
+    the ratio of the average profit to the average loss (per trade). The average loss is floored at min_loss, otherwise
+    results can be wildly skewed
+    Returns expectancy, ave_profit, ave_loss
+    """
+    w = winning_count / trade_count
+    l = 1.0 - w
+    ave_profit = gain_sum / trade_count
+    ave_loss = loss_sum / trade_count
+    if abs(ave_loss) < min_loss:
+        ave_loss = min_loss
+    r = ave_profit / abs(ave_loss)
+    return r * w - l, ave_profit, ave_loss
@@ -29,6 +29,7 @@ import re
 
 
 import custom_indicators as cta
+import rolling_models as rm
 
 import pywt
 
@@ -171,7 +172,7 @@ class DWT_Leveraged2(IStrategy):
             if (self.isBull(curr_pair)) or (self.isBear(curr_pair)):
                 # DWT
 
-                informative['dwt_model'] = informative['close'].rolling(window=self.dwt_window).apply(self.model)
+                informative['dwt_model'] = rm.rolling_dwt(informative['close'], self.dwt_window)
                 # informative['dwt_predict'] = informative['dwt_model'].rolling(window=self.dwt_window).apply(self.predict)
                 # informative['stddev'] = informative['close'].rolling(window=self.dwt_window).std()
 
@@ -29,6 +29,7 @@ import re
 
 
 import custom_indicators as cta
+import rolling_models as rm
 
 import pywt
 
@@ -185,7 +186,7 @@ class DWT_Leveraged_recent(IStrategy):
 
             # DWT
 
-            inf_slow['dwt_model'] = inf_slow['close'].rolling(window=self.dwt_window).apply(self.model)
+            inf_slow['dwt_model'] = rm.rolling_dwt(inf_slow['close'], self.dwt_window)
 
             # trend (in informative)
             inf_fast['candle-up'] = np.where(inf_fast['close'] >= inf_fast['open'], 1, 0)
@@ -33,6 +33,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 import pywt
 import scipy
@@ -190,7 +191,7 @@ class DWT_LongShort(IStrategy):
 
         # DWT
 
-        informative['dwt_model'] = informative['close'].rolling(window=self.dwt_window).apply(self.model)
+        informative['dwt_model'] = rm.rolling_dwt(informative['close'], self.dwt_window)
 
         # merge into normal timeframe
         dataframe = merge_informative_pair(dataframe, informative, self.timeframe, self.inf_timeframe, ffill=True)
@@ -33,6 +33,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 import re
 
@@ -155,7 +156,7 @@ class DWT_lev_short(IStrategy):
 
             # DWT
 
-            informative['dwt_model'] = informative['close'].rolling(window=self.dwt_window).apply(self.model)
+            informative['dwt_model'] = rm.rolling_dwt(informative['close'], self.dwt_window)
             # informative['dwt_predict'] = informative['dwt_model'].rolling(window=self.dwt_window).apply(self.predict)
             # informative['stddev'] = informative['close'].rolling(window=self.dwt_window).std()
 
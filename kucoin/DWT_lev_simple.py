@@ -33,6 +33,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 import pywt
 import scipy
@@ -147,7 +148,7 @@ class DWT_lev_simple(IStrategy):
         if (self.isBull(curr_pair)) or (self.isBear(curr_pair)):
             # DWT
 
-            informative['dwt_model'] = informative['close'].rolling(window=self.dwt_window).apply(self.model)
+            informative['dwt_model'] = rm.rolling_dwt(informative['close'], self.dwt_window)
             # informative['dwt_predict'] = informative['dwt_model'].rolling(window=self.dwt_window).apply(self.predict)
             # informative['stddev'] = informative['close'].rolling(window=self.dwt_window).std()
 
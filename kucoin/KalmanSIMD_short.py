@@ -33,6 +33,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 from  simdkalman import KalmanFilter
 import scipy
@@ -103,6 +104,9 @@ class KalmanSIMD_short(IStrategy):
             )
     current_pair = ""
 
+    # smooth all of the rolling windows in (chunked) batches, rather than one simdkalman call per candle
+    kf_batch = True
+
     # Kalman  hyperparams
     entry_long_kf_diff = DecimalParameter(0.0, 5.0, decimals=1, default=2.0, space='buy', load=True, optimize=True)
     entry_short_kf_diff = DecimalParameter(-5.0, 0.0, decimals=1, default=-2.0, space='buy', load=True, optimize=True)
@@ -179,7 +183,10 @@ class KalmanSIMD_short(IStrategy):
         # set current filter (can't pass parameter to apply())
         self.kalman_filter = self.filter_list[curr_pair]
 
-        informative['kf_model'] = informative['close'].rolling(window=self.kf_window).apply(self.model)
+        if self.kf_batch:
+            informative['kf_model'] = rm.rolling_last(informative['close'], self.kf_window, self.batch_model)
+        else:
+            informative['kf_model'] = informative['close'].rolling(window=self.kf_window).apply(self.model)
         # informative['kf_predict'] = informative['kf_model'].rolling(window=self.kf_window).apply(self.predict)
         # informative['stddev'] = informative['close'].rolling(window=self.kf_window).std()
 
@@ -261,6 +268,17 @@ class KalmanSIMD_short(IStrategy):
         length = len(model)
         return model[length-1]
 
+    def batch_model(self, windows: np.ndarray) -> np.ndarray:
+        # batch version of model(): smooths all of the supplied windows in one call
+
+        # init filter if needed (fitted to the first window, same as model())
+        if not self.filter_init_list[self.current_pair]:
+            self.filter_init_list[self.current_pair] = True
+            scaled, _, _ = rm.kalman_scale(windows[0])
+            self.filter_list[self.current_pair] = self.filter_list[self.current_pair].em(scaled[0], n_iter=6)
+
+        return rm.kalman_model(windows, self.kalman_filter)
+
     def scaledModel(self, a: np.ndarray) -> float:
         #must return scalar, so just calculate prediction and take last value
         # model = self.KalmanModel(np.array(a))
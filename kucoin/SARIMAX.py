@@ -33,6 +33,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 import custom_indicators as cta
+import rolling_models as rm
 
 import statsmodels.api as sm
 
@@ -78,6 +79,9 @@ class SARIMAX(IStrategy):
 
     custom_trade_info = {}
 
+    # cache of rolling model results (live/dry-run only)
+    model_cache = rm.RollingModelCache()
+
     ###################################
 
     # Strategy Specific Variable Storage
@@ -153,7 +157,13 @@ class SARIMAX(IStrategy):
         if not curr_pair in self.filter_list:
             self.filter_init_list[curr_pair] = False
 
-        informative['smax_predict'] = informative['close'].rolling(window=self.smax_window).apply(self.model)
+        if self.dp.runmode.value in ('live', 'dry_run'):
+            # only calculate the model for new candles
+            informative['smax_predict'] = self.model_cache.rolling(curr_pair, self.inf_timeframe, 'smax_predict',
+                                                                   informative['date'], informative['close'],
+                                                                   self.smax_window, rm.per_window(self.model))
+        else:
+            informative['smax_predict'] = informative['close'].rolling(window=self.smax_window).apply(self.model)
 
         # merge into normal timeframe
         dataframe = merge_informative_pair(dataframe, informative, self.timeframe, self.inf_timeframe, ffill=True)
@@ -2,6 +2,7 @@
 Solipsis Custom Indicators and Maths
 """
 import numpy as np
+import talib
 import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
@@ -14,6 +15,32 @@ Misc. Helper Functions
 def same_length(bigger, shorter):
     return np.concatenate((np.full((bigger.shape[0] - shorter.shape[0]), np.nan), shorter))
 
+def values(col) -> np.ndarray:
+    """
+    Returns the data of a column (Series or array) as a float64 array, which is what talib needs.
+    Only copies if the column is some other type (e.g. float32)
+    """
+    return np.asarray(col, dtype=np.float64)
+
+def shift(arr: np.ndarray, periods: int = 1) -> np.ndarray:
+    """ Same as Series.shift(periods), for periods >= 0 """
+    result = np.full(arr.shape[0], np.nan)
+    if periods == 0:
+        result[:] = arr
+    elif periods < arr.shape[0]:
+        result[periods:] = arr[:-periods]
+    return result
+
+def ffill(arr: np.ndarray) -> np.ndarray:
+    """ Same as Series.ffill() """
+    idx = np.where(np.isnan(arr), 0, np.arange(arr.shape[0]))
+    np.maximum.accumulate(idx, out=idx)
+    return arr[idx]
+
+def rolling_mean(arr: np.ndarray, length: int) -> np.ndarray:
+    """ Same as Series.rolling(length).mean(). Uses the pandas implementation (no copy), so results are identical """
+    return Series(arr, copy=False).rolling(length).mean().to_numpy()
+
 """
 Maths
 """
@@ -35,6 +62,92 @@ def linear_decay(start: float, end: float, start_time: int, end_time: int, trade
 
     return max(end, start - (rate * time))
 
+"""
+TA Kernels
+These take and return numpy arrays (just the columns that are needed), and do not create any intermediate columns.
+The DataFrame versions below are wrappers around these
+"""
+
+def zema_np(data: np.ndarray, period: int) -> np.ndarray:
+    ema1 = talib.EMA(data, timeperiod=period)
+    ema2 = talib.EMA(ema1, timeperiod=period)
+    return ema1 + (ema1 - ema2)
+
+def rmi_np(close: np.ndarray, length: int = 20, mom: int = 5) -> np.ndarray:
+    prev = shift(close, mom)
+    maxup = np.clip(close - prev, 0, None)
+    maxdown = np.clip(prev - close, 0, None)
+    maxup[np.isnan(maxup)] = 0
+    maxdown[np.isnan(maxdown)] = 0
+
+    ema_inc = talib.EMA(maxup, timeperiod=length)
+    ema_dec = talib.EMA(maxdown, timeperiod=length)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ema_dec == 0, 0, 100 - 100 / (1 + ema_inc / ema_dec))
+
+def mastreak_np(data: np.ndarray, period: int = 4) -> np.ndarray:
+    arr = np.diff(zema_np(data, period))
+    pos = np.clip(arr, 0, 1).astype(bool).cumsum()
+    neg = np.clip(arr, -1, 0).astype(bool).cumsum()
+    streak = np.where(arr >= 0, pos - np.maximum.accumulate(np.where(arr <= 0, pos, 0)),
+                      -neg + np.maximum.accumulate(np.where(arr >= 0, neg, 0)))
+
+    return same_length(data, streak)
+
+def pcc_np(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 20, mult: int = 2):
+    previous_close = shift(close)
+
+    close_change = (close - previous_close) / previous_close * 100
+    high_change = (high - close) / close * 100
+    low_change = (low - close) / close * 100
+
+    mid = zema_np(close_change, period)
+    rangema = zema_np(high_change - low_change, period)
+
+    return mid + rangema * mult, rangema, mid - rangema * mult
+
+def ssl_np(close: np.ndarray, sma_high: np.ndarray, sma_low: np.ndarray):
+    hlv = ffill(np.where(close > sma_high, 1, np.where(close < sma_low, -1, np.nan)))
+    ssl_down = np.where(hlv < 0, sma_high, sma_low)
+    ssl_up = np.where(hlv < 0, sma_low, sma_high)
+    return ssl_down, ssl_up
+
+def ssl_channels_np(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 10):
+    return ssl_np(close, rolling_mean(high, length), rolling_mean(low, length))
+
+def ssl_channels_atr_np(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 7):
+    atr = talib.ATR(high, low, close, timeperiod=14)
+    return ssl_np(close, rolling_mean(high, length) + atr, rolling_mean(low, length) - atr)
+
+def wavetrend_np(high: np.ndarray, low: np.ndarray, close: np.ndarray, chlen: int = 10, avg: int = 21,
+                 smalen: int = 4):
+    hlc3 = (high + low + close) / 3
+    esa = talib.EMA(hlc3, timeperiod=chlen)
+    d = talib.EMA(np.abs(hlc3 - esa), timeperiod=chlen)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ci = (hlc3 - esa) / (0.015 * d)
+    wt1 = talib.EMA(ci, timeperiod=avg)
+    wt2 = talib.SMA(wt1, timeperiod=smalen)
+    return wt1, wt2
+
+def t3_np(close: np.ndarray, length: int = 5) -> np.ndarray:
+    xe1 = talib.EMA(close, timeperiod=length)
+    xe2 = talib.EMA(xe1, timeperiod=length)
+    xe3 = talib.EMA(xe2, timeperiod=length)
+    xe4 = talib.EMA(xe3, timeperiod=length)
+    xe5 = talib.EMA(xe4, timeperiod=length)
+    xe6 = talib.EMA(xe5, timeperiod=length)
+    b = 0.7
+    c1 = -b*b*b
+    c2 = 3*b*b+3*b*b*b
+    c3 = -6*b*b-3*b-3*b*b*b
+    c4 = 1+3*b+b*b*b+3*b*b
+    return c1 * xe6 + c2 * xe5 + c3 * xe4 + c4 * xe3
+
+def sroc_np(close: np.ndarray, emalen: int = 13, smooth: int = 21) -> np.ndarray:
+    return talib.ROC(talib.EMA(close, timeperiod=emalen), timeperiod=smooth)
+
 """
 TA Indicators
 """
@@ -44,51 +157,21 @@ def zema(dataframe, period, field='close'):
     Source: https://github.com/freqtrade/technical/blob/master/technical/indicators/overlap_studies.py#L79
     Modified slightly to use ta.EMA instead of technical ema
     """
-    df = dataframe.copy()
-
-    df['ema1'] = ta.EMA(df[field], timeperiod=period)
-    df['ema2'] = ta.EMA(df['ema1'], timeperiod=period)
-    df['d'] = df['ema1'] - df['ema2']
-    df['zema'] = df['ema1'] + df['d']
-
-    return df['zema']
+    return Series(zema_np(values(dataframe[field]), period), index=dataframe.index, name='zema')
 
 def RMI(dataframe, *, length=20, mom=5):
     """
     Source: https://github.com/freqtrade/technical/blob/master/technical/indicators/indicators.py#L912
     """
-    df = dataframe.copy()
-
-    df['maxup'] = (df['close'] - df['close'].shift(mom)).clip(lower=0)
-    df['maxdown'] = (df['close'].shift(mom) - df['close']).clip(lower=0)
-
-    df.fillna(0, inplace=True)
-
-    df["emaInc"] = ta.EMA(df, price='maxup', timeperiod=length)
-    df["emaDec"] = ta.EMA(df, price='maxdown', timeperiod=length)
-
-    df['RMI'] = np.where(df['emaDec'] == 0, 0, 100 - 100 / (1 + df["emaInc"] / df["emaDec"]))
-
-    return df["RMI"]
+    return Series(rmi_np(values(dataframe['close']), length=length, mom=mom), index=dataframe.index, name='RMI')
 
 def mastreak(dataframe: DataFrame, period: int = 4, field='close') -> Series:
     """
     MA Streak
     Port of: https://www.tradingview.com/script/Yq1z7cIv-MA-Streak-Can-Show-When-a-Run-Is-Getting-Long-in-the-Tooth/
+    Note: returns an array, not a Series
     """
-    df = dataframe.copy()
-
-    avgval = zema(df, period, field)
-
-    arr = np.diff(avgval)
-    pos = np.clip(arr, 0, 1).astype(bool).cumsum()
-    neg = np.clip(arr, -1, 0).astype(bool).cumsum()
-    streak = np.where(arr >= 0, pos - np.maximum.accumulate(np.where(arr <= 0, pos, 0)),
-                    -neg + np.maximum.accumulate(np.where(arr >= 0, neg, 0)))
-
-    res = same_length(df['close'], streak)
-
-    return res
+    return mastreak_np(values(dataframe[field]), period)
 
 def pcc(dataframe: DataFrame, period: int = 20, mult: int = 2):
     """
@@ -96,23 +179,10 @@ def pcc(dataframe: DataFrame, period: int = 20, mult: int = 2):
     PCC is like KC unless it uses percentage changes in price to set channel distance.
     https://www.tradingview.com/script/6wwAWXA1-MA-Streak-Change-Channel/
     """
-    df = dataframe.copy()
-
-    df['previous_close'] = df['close'].shift()
-
-    df['close_change'] = (df['close'] - df['previous_close']) / df['previous_close'] * 100
-    df['high_change'] = (df['high'] - df['close']) / df['close'] * 100
-    df['low_change'] = (df['low'] - df['close']) / df['close'] * 100
-
-    df['delta'] = df['high_change'] - df['low_change']
-
-    mid = zema(df, period, 'close_change')
-    rangema = zema(df, period, 'delta')
-
-    upper = mid + rangema * mult
-    lower = mid - rangema * mult
-
-    return upper, rangema, lower
+    upper, rangema, lower = pcc_np(values(dataframe['high']), values(dataframe['low']), values(dataframe['close']),
+                                   period, mult)
+    index = dataframe.index
+    return Series(upper, index=index), Series(rangema, index=index), Series(lower, index=index)
 
 def SSLChannels(dataframe, length=10, mode='sma'):
     """
@@ -124,85 +194,39 @@ def SSLChannels(dataframe, length=10, mode='sma'):
     if mode not in ('sma'):
         raise ValueError(f"Mode {mode} not supported yet")
 
-    df = dataframe.copy()
-
-    if mode == 'sma':
-        df['smaHigh'] = df['high'].rolling(length).mean()
-        df['smaLow'] = df['low'].rolling(length).mean()
+    ssl_down, ssl_up = ssl_channels_np(values(dataframe['high']), values(dataframe['low']),
+                                       values(dataframe['close']), length)
 
-    df['hlv'] = np.where(df['close'] > df['smaHigh'], 1,
-                         np.where(df['close'] < df['smaLow'], -1, np.NAN))
-    df['hlv'] = df['hlv'].ffill()
-
-    df['sslDown'] = np.where(df['hlv'] < 0, df['smaHigh'], df['smaLow'])
-    df['sslUp'] = np.where(df['hlv'] < 0, df['smaLow'], df['smaHigh'])
-
-    return df['sslDown'], df['sslUp']
+    return Series(ssl_down, index=dataframe.index, name='sslDown'), Series(ssl_up, index=dataframe.index, name='sslUp')
 
 def SSLChannels_ATR(dataframe, length=7):
     """
     SSL Channels with ATR: https://www.tradingview.com/script/SKHqWzql-SSL-ATR-channel/
     Credit to @JimmyNixx for python
     """
-    df = dataframe.copy()
+    ssl_down, ssl_up = ssl_channels_atr_np(values(dataframe['high']), values(dataframe['low']),
+                                           values(dataframe['close']), length)
 
-    df['ATR'] = ta.ATR(df, timeperiod=14)
-    df['smaHigh'] = df['high'].rolling(length).mean() + df['ATR']
-    df['smaLow'] = df['low'].rolling(length).mean() - df['ATR']
-    df['hlv'] = np.where(df['close'] > df['smaHigh'], 1, np.where(df['close'] < df['smaLow'], -1, np.NAN))
-    df['hlv'] = df['hlv'].ffill()
-    df['sslDown'] = np.where(df['hlv'] < 0, df['smaHigh'], df['smaLow'])
-    df['sslUp'] = np.where(df['hlv'] < 0, df['smaLow'], df['smaHigh'])
-
-    return df['sslDown'], df['sslUp']
+    return Series(ssl_down, index=dataframe.index, name='sslDown'), Series(ssl_up, index=dataframe.index, name='sslUp')
 
 def WaveTrend(dataframe, chlen=10, avg=21, smalen=4):
     """
     WaveTrend Ocillator by LazyBear
     https://www.tradingview.com/script/2KE8wTuF-Indicator-WaveTrend-Oscillator-WT/
     """
-    df = dataframe.copy()
-
-    df['hlc3'] = (df['high'] + df['low'] + df['close']) / 3
-    df['esa'] = ta.EMA(df['hlc3'], timeperiod=chlen)
-    df['d'] = ta.EMA((df['hlc3'] - df['esa']).abs(), timeperiod=chlen)
-    df['ci'] = (df['hlc3'] - df['esa']) / (0.015 * df['d'])
-    df['tci'] = ta.EMA(df['ci'], timeperiod=avg)
+    wt1, wt2 = wavetrend_np(values(dataframe['high']), values(dataframe['low']), values(dataframe['close']),
+                            chlen, avg, smalen)
 
-    df['wt1'] = df['tci']
-    df['wt2'] = ta.SMA(df['wt1'], timeperiod=smalen)
-    df['wt1-wt2'] = df['wt1'] - df['wt2']
-
-    return df['wt1'], df['wt2']
+    return Series(wt1, index=dataframe.index, name='wt1'), Series(wt2, index=dataframe.index, name='wt2')
 
 def T3(dataframe, length=5):
     """
     T3 Average by HPotter on Tradingview
     https://www.tradingview.com/script/qzoC9H1I-T3-Average/
     """
-    df = dataframe.copy()
-
-    df['xe1'] = ta.EMA(df['close'], timeperiod=length)
-    df['xe2'] = ta.EMA(df['xe1'], timeperiod=length)
-    df['xe3'] = ta.EMA(df['xe2'], timeperiod=length)
-    df['xe4'] = ta.EMA(df['xe3'], timeperiod=length)
-    df['xe5'] = ta.EMA(df['xe4'], timeperiod=length)
-    df['xe6'] = ta.EMA(df['xe5'], timeperiod=length)
-    b = 0.7
-    c1 = -b*b*b
-    c2 = 3*b*b+3*b*b*b
-    c3 = -6*b*b-3*b-3*b*b*b
-    c4 = 1+3*b+b*b*b+3*b*b
-    df['T3Average'] = c1 * df['xe6'] + c2 * df['xe5'] + c3 * df['xe4'] + c4 * df['xe3']
-
-    return df['T3Average']
+    return Series(t3_np(values(dataframe['close']), length), index=dataframe.index, name='T3Average')
 
 
 def SROC(dataframe, roclen=21, emalen=13, smooth=21):
-    df = dataframe.copy()
-
-    roc = ta.ROC(df, timeperiod=roclen)
-    ema = ta.EMA(df, timeperiod=emalen)
-    sroc = ta.ROC(ema, timeperiod=smooth)
-
-    return sroc
\ No newline at end of file
+    # Note: roclen is not used (the original calculated a ROC of that length, but then ignored it)
+    return Series(sroc_np(values(dataframe['close']), emalen, smooth), index=dataframe.index)
@@ -0,0 +1,274 @@
+# Streaming parsers for the logs produced by test_exchange.sh, hyp_exchange.sh and test_monthly.sh (used by the
+# Summarise*.py scripts)
+#
+# Each parser is a state machine that reads the log in a single pass, one line at a time, and collects the results
+# into a ColumnTable (one list per field). Only the extracted values are kept, so memory use depends on the number of
+# results, not the size of the log. Sections of the log that the scripts show are passed to echo() as they are read.
+#
+# The tables can be converted to a DataFrame, and saved as Parquet (requires pyarrow or fastparquet)
+
+
+import argparse
+import os
+import sys
+
+import pandas
+
+
+class ColumnTable():
+    """
+    Append-only table, stored as one list per column
+    """
+
+    def __init__(self, columns):
+        super().__init__()
+        self.columns = {col: [] for col in columns}
+
+    def append(self, row: dict):
+        for col, values in self.columns.items():
+            values.append(row[col])
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), []))
+
+    def to_dataframe(self) -> pandas.DataFrame:
+        return pandas.DataFrame(self.columns)
+
+
+def _no_echo(line):
+    return
+
+
+def read_lines(file_name, buffer_size=1024 * 1024):
+    """
+    Returns the lines of the file, one at a time. Undecodable characters are replaced, since logs sometimes contain
+    partial output from a killed process
+    """
+    with open(file_name, errors='replace', buffering=buffer_size) as f:
+        for line in f:
+            yield line
+
+
+def starts_with(line: str, pattern: str) -> bool:
+    return line.lstrip().startswith(pattern)
+
+
+"""
+Backtest logs (test_exchange.sh)
+For each 'Result for strategy' section, shows the report up to the end of the summary metrics, and extracts the
+TOTAL line of the first table
+"""
+
+# states
+TEST_FIND_RESULT = 0
+TEST_COPY_TO_TOTAL = 1
+TEST_COPY_TO_SUMMARY = 2
+TEST_COPY_TO_END = 3
+
+
+def parse_test_totals(strategy: str, line: str) -> dict:
+    # format of line:
+    # | TOTAL | Entries | Avg Profit % | Cum Profit % |  Tot Profit USD | Tot Profit % | Avg Duration | Win  Draw  Loss  Win% |
+    cols = line.strip().split("|")[1:-1]
+
+    return {
+        'strategy': strategy,
+        'entries': int(cols[1]),
+        'ave_profit': float(cols[2]),
+        'tot_profit': float(cols[5]),
+        'win_pct': float(cols[7].strip().split(" ")[-1])
+    }
+
+
+def parse_test_log(lines, echo=None) -> ColumnTable:
+    echo = echo or _no_echo
+    table = ColumnTable(['strategy', 'entries', 'ave_profit', 'tot_profit', 'win_pct'])
+    state = TEST_FIND_RESULT
+    strategy = ""
+
+    for line in lines:
+        # 'continue' re-processes the current line in the new state
+        while True:
+            if state == TEST_FIND_RESULT:
+                if "Result for strategy " in line:
+                    strategy = line.rstrip().split(" ")[-1]
+                    echo("")
+                    echo("------------")
+                    echo(strategy)
+                    echo("------------")
+                    echo("")
+                    state = TEST_COPY_TO_TOTAL
+                    continue
+
+            elif state == TEST_COPY_TO_TOTAL:
+                if 'TOTAL' in line:
+                    table.append(parse_test_totals(strategy, line))
+                    state = TEST_COPY_TO_SUMMARY
+                    continue
+                echo(line.rstrip())
+
+            elif state == TEST_COPY_TO_SUMMARY:
+                if '================== SUMMARY METRICS' in line:
+                    state = TEST_COPY_TO_END
+                    continue
+                echo(line.rstrip())
+
+            elif state == TEST_COPY_TO_END:
+                echo(line.rstrip())
+                if starts_with(line, '==============================='):
+                    echo("")
+                    state = TEST_FIND_RESULT
+
+            break
+
+    return table
+
+
+"""
+Hyperopt logs (hyp_exchange.sh)
+For each run (header is a line of dashes, followed by the strategy name), shows the command and the results up to the
+ROI table, and extracts the 'best' result line
+"""
+
+# states
+HYP_FIND_HEADER = 0
+HYP_READ_STRATEGY = 1
+HYP_COPY_TO_COMMAND = 2
+HYP_SKIP_TO_TABLE = 3
+HYP_COPY_TO_RESULT = 4
+HYP_COPY_TO_ROI = 5
+
+
+def parse_hyperopt_totals(strategy: str, line: str) -> dict:
+    # format of line:
+    # 97/100:     94 trades. 63/0/31 Wins/Draws/Losses. Avg profit   0.59%. Median profit   1.15%. Total profit 1658.03907912 USD (  16.58%). Avg duration 22:16:00 min. Objective: -30.83651
+    cols = line.split()
+
+    entries = int(cols[1])
+    wins, draws, losses = cols[3].strip().split("/")
+    return {
+        'strategy': strategy,
+        'entries': entries,
+        'ave_profit': float(cols[7].split('%')[0]),
+        'tot_profit': float(cols[16].split('%')[0]),
+        'win_pct': float(wins) / float(entries)
+    }
+
+
+def parse_hyperopt_log(lines, echo=None) -> ColumnTable:
+    echo = echo or _no_echo
+    table = ColumnTable(['strategy', 'entries', 'ave_profit', 'tot_profit', 'win_pct'])
+    state = HYP_FIND_HEADER
+    strategy = ""
+
+    for line in lines:
+        # 'continue' re-processes the current line in the new state
+        while True:
+            if state == HYP_FIND_HEADER:
+                if starts_with(line, "-----------"):
+                    echo("")
+                    echo(line.rstrip())
+                    state = HYP_READ_STRATEGY
+
+            elif state == HYP_READ_STRATEGY:
+                strategy = line.strip()
+                state = HYP_COPY_TO_COMMAND
+                continue
+
+            elif state == HYP_COPY_TO_COMMAND:
+                echo(line.rstrip())
+                if starts_with(line, 'freqtrade hyperopt'):
+                    state = HYP_SKIP_TO_TABLE
+
+            elif state == HYP_SKIP_TO_TABLE:
+                # skip anything between header & results
+                if starts_with(line, '+--------'):
+                    state = HYP_COPY_TO_RESULT
+                    continue
+
+            elif state == HYP_COPY_TO_RESULT:
+                if 'Wins/Draws/Losses' in line:
+                    table.append(parse_hyperopt_totals(strategy, line.strip()))
+                    state = HYP_COPY_TO_ROI
+                    continue
+                echo(line.rstrip())
+
+            elif state == HYP_COPY_TO_ROI:
+                # copy everything up to end of results (assuming we don't need anything past ROI table)
+                if starts_with(line, '# ROI table:'):
+                    state = HYP_FIND_HEADER
+                else:
+                    echo(line.rstrip())
+
+            break
+
+    return table
+
+
+"""
+Monthly summaries (test_monthly.sh)
+Extracts every row of each STRATEGY SUMMARY table. 'period' is the index of the table in the file
+"""
+
+# states
+MONTHLY_FIND_HEADER = 0
+MONTHLY_SKIP_HEADER = 1
+MONTHLY_READ_DATA = 2
+
+
+def parse_monthly_row(period: int, line: str) -> dict:
+    items = line.split("|")
+    return {
+        'period': period,
+        'strategy': items[1].strip(),
+        'profit': float(items[6].strip()),
+        'win_pct': float(items[8].split()[3].strip()),
+        'drawdown': float(items[9].split()[2].strip().replace("%", ""))
+    }
+
+
+def parse_monthly_log(lines) -> ColumnTable:
+    table = ColumnTable(['period', 'strategy', 'profit', 'win_pct', 'drawdown'])
+    state = MONTHLY_FIND_HEADER
+    period = -1
+
+    for line in lines:
+        if state == MONTHLY_FIND_HEADER:
+            if "STRATEGY SUMMARY" in line:
+                period += 1
+                state = MONTHLY_SKIP_HEADER
+        elif state == MONTHLY_SKIP_HEADER:
+            state = MONTHLY_READ_DATA
+        elif state == MONTHLY_READ_DATA:
+            if "===================" in line:
+                state = MONTHLY_FIND_HEADER
+            else:
+                table.append(parse_monthly_row(period, line))
+
+    return table
+
+
+"""
+Command line & output
+"""
+
+
+def get_args(description: str):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('file_name', help="log file to process")
+    parser.add_argument('--parquet', metavar='FILE', help="also save the parsed results to FILE (Parquet format)")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.file_name):
+        print("File {} does not exist. Exiting...".format(args.file_name))
+        sys.exit()
+
+    return args
+
+
+def write_parquet(df: pandas.DataFrame, file_name: str):
+    try:
+        df.to_parquet(file_name, index=False)
+    except ImportError as e:
+        # stdout is usually redirected to a summary file, so report this on stderr
+        print("Could not save {} ({})".format(file_name, str(e).splitlines()[0]), file=sys.stderr)
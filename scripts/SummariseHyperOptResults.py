@@ -1,108 +1,22 @@
-
 # Script to process hyperopt log and summarise results. Useful for multiple hyperopts in one file (e.g. from hyp_exchange.sh)
+# Usage: python SummariseHyperOptResults.py [--parquet <file>] <log file>
 
 
-import sys
-import os
-from re import search
-import statistics
 import pandas
-import numpy
 from tabulate import tabulate
 
-infile = None
-curr_line = ""
-strat_results = {}
-strat_summary = {}
-
-# routine to skip to requested pattern
-def skipto(pattern, anywhere=False) -> bool:
-    global curr_line
-    global infile
-
-    if infile is None:
-        print("ERR: file not open")
-        return False
-
-    curr_line = infile.readline()
-
-    while curr_line:
-        if anywhere:
-            found = (pattern in curr_line) # pattern is anywhere in the string
-        else:
-            found = curr_line.lstrip().startswith(pattern) # string starts with pattern (ignoring whitespace)
-        if found:
-            break
-        curr_line = infile.readline()
-
-    if curr_line:
-        return True
-    else:
-        return False
-
-# copies the input file and prints each line until pattern is found.
-# Note: prints current line but not the final line
-def copyto(pattern, anywhere=False):
-    global curr_line
-    global infile
-
-    while curr_line:
-        if anywhere:
-            found = (pattern in curr_line) # pattern is anywhere in the string
-        else:
-            found = curr_line.lstrip().startswith(pattern) # string starts with pattern (ignoring whitespace)
-        if found:
-            break
-        print(curr_line.rstrip())
-        curr_line = infile.readline()
-
-    if curr_line:
-        return True
-    else:
-        return False
-
-def process_totals(strat, line):
-    global strat_summary
-    global strat_results
-
-    # format of line:
-    # 97/100:     94 trades. 63/0/31 Wins/Draws/Losses. Avg profit   0.59%. Median profit   1.15%. Total profit 1658.03907912 USD (  16.58%). Avg duration 22:16:00 min. Objective: -30.83651
-    cols = " ".join(line.split()) # get rid of multiple spaces
-    cols = cols.strip().split(" ")
+from LogParser import get_args, parse_hyperopt_log, read_lines, write_parquet
 
-    # print("cols: ", cols)
 
-    entry = {}
-    entry['entries'] = int(cols[1])
-    wins, draws, losses = cols[3].strip().split("/")
-    entry['ave_profit'] = float(cols[7].split('%')[0])
-    entry['tot_profit'] = float(cols[16].split('%')[0])
-    entry['win_pct'] = float(wins) / float(entry['entries'])
-
-    strat_summary[strat] = entry
-
-    return
-
-def print_results():
-
-    global strat_summary
-    global strat_results
+def print_results(results: pandas.DataFrame):
 
     print("")
     print("Summary:")
 
-    # convert associative array into 'plain' array
-    strat_stats = []
-    # calculate stats for each strategy
-    for strategy in strat_summary:
-        strat_stats.append([strategy,
-                            strat_summary[strategy]['entries'], strat_summary[strategy]['ave_profit'],
-                            strat_summary[strategy]['tot_profit'], strat_summary[strategy]['win_pct'],
-                           0.0])
-
-    # create dataframe
-    df = pandas.DataFrame(strat_stats,
-                          columns=["Strategy", "Trades", "Ave\nProfit(%)", "Tot\nProfit(%)", "Win%", "Rank"])
+    # latest results for each strategy (in order of first appearance)
+    df = results.groupby('strategy', sort=False).last().reset_index()
+    df = df[['strategy', 'entries', 'ave_profit', 'tot_profit', 'win_pct']]
+    df.columns = ["Strategy", "Trades", "Ave\nProfit(%)", "Tot\nProfit(%)", "Win%"]
 
     df["Rank"] = df["Win%"].rank(ascending=False, method='min')
 
@@ -119,37 +33,15 @@ def print_results():
     return
 
 def main():
-    global curr_line
-    global infile
-
-    args = sys.argv[1:]
-
-    file_name = args[0]
-    if not os.path.isfile(file_name):
-        print("File {} does not exist. Exiting...".format(file_name))
-        sys.exit()
-
-    infile = open(file_name)
-
-    # repeatedly scan file and find header of new run, then print results
-    while skipto("-----------"):
-        print("")
-        print(curr_line.rstrip())
-        curr_line = infile.readline()
-        strategy = curr_line.strip()
+    args = get_args("Summarise the results of a hyperopt log (e.g. from hyp_exchange.sh)")
 
-        copyto('freqtrade hyperopt')
-        print(curr_line.rstrip())
-        # skip anything between header & results
-        skipto('+--------')
-        # get the best results line
-        copyto('Wins/Draws/Losses', anywhere=True)
-        process_totals(strategy, curr_line.strip())
+    # scan the file, printing the results of each run as they are found
+    results = parse_hyperopt_log(read_lines(args.file_name), echo=print).to_dataframe()
 
-        # copy everything up to end of results (assuming we don't need anything past ROI table)
-        copyto('# ROI table:')
+    print_results(results)
 
-    print_results()
+    if args.parquet:
+        write_parquet(results, args.parquet)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
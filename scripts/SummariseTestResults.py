@@ -1,133 +1,23 @@
-# Script to process hyperopt log and summarise results. Useful for multiple hyperopts in one file (e.g. from hyp_exchange.sh)
+# Script to process backtest log and summarise results. Useful for multiple strategies in one file (e.g. from test_exchange.sh)
+# Usage: python SummariseTestResults.py [--parquet <file>] <log file>
 
 
-import sys
-import os
-from re import search
-import statistics
 import pandas
-import numpy
 from tabulate import tabulate
 
-infile = None
-curr_line = ""
-strat_results = {}
-strat_summary = {}
-
-
-# routine to skip to requested pattern
-def skipto(pattern, anywhere=False) -> bool:
-    global curr_line
-    global infile
-
-    if infile is None:
-        print("ERR: file not open")
-        return False
-
-    curr_line = infile.readline()
-
-    while curr_line:
-        if anywhere:
-            found = (pattern in curr_line) # pattern is anywhere in the string
-        else:
-            found = curr_line.lstrip().startswith(pattern) # string starts with pattern (ignoring whitespace)
-        if found:
-            break
-        curr_line = infile.readline()
-
-    if curr_line:
-        return True
-    else:
-        return False
-
-# copies the input file and prints each line until pattern is found.
-# Note: prints current line but not the final line
-def copyto(pattern, anywhere=False):
-    global curr_line
-    global infile
-
-    while curr_line:
-        if anywhere:
-            found = (pattern in curr_line) # pattern is anywhere in the string
-        else:
-            found = curr_line.lstrip().startswith(pattern) # string starts with pattern (ignoring whitespace)
-        if found:
-            break
-        print(curr_line.rstrip())
-        curr_line = infile.readline()
-
-    if curr_line:
-        return True
-    else:
-        return False
-
-
-def rank_simple(vector):
-    return sorted(range(len(vector)), key=vector.__getitem__)
-
-
-def rankdata(a):
-    n = len(a)
-    ivec = rank_simple(a)
-    svec = [a[rank] for rank in ivec]
-    sumranks = 0
-    dupcount = 0
-    newarray = [0] * n
-    for i in xrange(n):
-        sumranks += i
-        dupcount += 1
-        if i == n - 1 or svec[i] != svec[i + 1]:
-            averank = sumranks / float(dupcount) + 1
-            for j in xrange(i - dupcount + 1, i + 1):
-                newarray[ivec[j]] = averank
-            sumranks = 0
-            dupcount = 0
-    return newarray
-
-
-def process_totals(strat, line):
-    global strat_summary
-    global strat_results
-
-    # format of line:
-    # | TOTAL | Entries | Avg Profit % | Cum Profit % |  Tot Profit USD | Tot Profit % | Avg Duration | Win  Draw  Loss  Win% |
-    cols = line.strip().split("|")
-
-    cols.pop(0)
-    cols.pop(len(cols) - 1)
-
-    entry = {}
-    entry['entries'] = int(cols[1])
-    entry['ave_profit'] = float(cols[2])
-    entry['tot_profit'] = float(cols[5])
-    entry['win_pct'] = float(cols[7].strip().split(" ")[-1])
-
-    strat_summary[strat] = entry
-
-    return
+from LogParser import get_args, parse_test_log, read_lines, write_parquet
 
 
-def print_results():
-    global strat_summary
-    global strat_results
+def print_results(results: pandas.DataFrame):
 
     print("")
     print("Summary:")
 
-    # convert associative array into 'plain' array
-    strat_stats = []
-    if strat_summary:
-        # calculate stats for each strategy
-        for strategy in strat_summary:
-            strat_stats.append([strategy,
-                                strat_summary[strategy]['entries'], strat_summary[strategy]['ave_profit'],
-                                strat_summary[strategy]['tot_profit'], strat_summary[strategy]['win_pct'],
-                                0.0])
-
-        # create dataframe
-        df = pandas.DataFrame(strat_stats,
-                              columns=["Strategy", "Trades", "Average \nProfit(%)",
-                                       "Total  \nProfit(%)", "Win%", "Rank"])
+    if len(results) > 0:
+        # latest results for each strategy (in order of first appearance)
+        df = results.groupby('strategy', sort=False).last().reset_index()
+        df = df[['strategy', 'entries', 'ave_profit', 'tot_profit', 'win_pct']]
+        df.columns = ["Strategy", "Trades", "Average \nProfit(%)", "Total  \nProfit(%)", "Win%"]
 
         df["Rank"] = df["Win%"].rank(ascending=False, method='min')
 
@@ -140,34 +30,15 @@ def print_results():
 
 
 def main():
-    global curr_line
-    global infile
-
-    args = sys.argv[1:]
-
-    file_name = args[0]
-    if not os.path.isfile(file_name):
-        print("File {} does not exist. Exiting...".format(file_name))
-        sys.exit()
+    args = get_args("Summarise the results of a backtest log (e.g. from test_exchange.sh)")
 
-    infile = open(file_name)
+    # scan the file, printing the results for each strategy as they are found
+    results = parse_test_log(read_lines(args.file_name), echo=print).to_dataframe()
 
-    # repeatedly scan file and find header of new run, then print results
-    while skipto("Result for strategy ", anywhere=True):
-        strat = curr_line.rstrip().split(" ")[-1]
-        print("")
-        print("------------")
-        print(strat)
-        print("------------")
-        print("")
-        copyto('TOTAL', anywhere=True)
-        process_totals(strat, curr_line.rstrip())
-        copyto('================== SUMMARY METRICS', anywhere=True)
-        copyto('===============================')
-        print(curr_line.rstrip())
-        print("")
+    print_results(results)
 
-    print_results()
+    if args.parquet:
+        write_parquet(results, args.parquet)
 
 
 if __name__ == '__main__':